@@ -0,0 +1,80 @@
+"""
+Batch search benchmark: N single `retrieve_glossary_rag` calls vs one `retrieve_glossary_rag_batch`.
+
+Runs the real retrieval code offline (SQLite + in-memory BM25, local vector index, fake embedder
+with a per-request latency standing in for the OpenAI round-trip). Result caching is disabled
+so both paths do the full work.
+
+Run: python -m benchmarks.batch_search --terms 5000 --batch-size 100
+"""
+import argparse
+import logging
+import random
+import time
+
+from benchmarks.fixtures import (
+    FakeEmbeddingClient, create_offline_database, install_fake_embeddings, load_glossary,
+    setup_offline_environment, synthetic_glossary,
+)
+
+
+def make_queries(glossary: list, n_queries: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    templates = ["What is {}?", "{} explained", "how does {} affect returns", "{}"]
+    return [rng.choice(templates).format(rng.choice(glossary)[0].lower()) for _ in range(n_queries)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--embed-latency", type=float, default=0.08, help="seconds per embedding request")
+    args = parser.parse_args()
+
+    setup_offline_environment()
+    logging.getLogger("fin_intelligence_hub").setLevel(logging.WARNING)
+    session_factory = create_offline_database()
+    client = FakeEmbeddingClient(latency=0)
+    install_fake_embeddings(client)
+
+    from services.embedding_cache import embedding_cache
+    from services.rag_service import retrieve_glossary_rag, retrieve_glossary_rag_batch
+
+    glossary = synthetic_glossary(args.terms)
+    load_glossary(session_factory, glossary)
+    queries = make_queries(glossary, args.batch_size)
+
+    # Warm the lexical and vector indexes outside the measurement
+    with session_factory() as db:
+        retrieve_glossary_rag("warm up", args.top_k, db, use_cache=False)
+    client.latency = args.embed_latency
+    client.per_input_latency = args.embed_latency / 500
+
+    def run(name, func):
+        embedding_cache.clear()
+        requests_before = client.requests
+        with session_factory() as db:
+            start = time.perf_counter()
+            results = func(db)
+            elapsed = time.perf_counter() - start
+        print(
+            f"  {name:<7} {elapsed:7.2f}s total   {elapsed * 1000 / len(queries):8.1f} ms/query   "
+            f"{client.requests - requests_before:4d} embedding requests"
+        )
+        return elapsed, results
+
+    print(f"{args.terms} glossary terms, {len(queries)} queries, top_k={args.top_k}, {args.embed_latency * 1000:.0f} ms per embedding request")
+    single_elapsed, single = run("single", lambda db: [retrieve_glossary_rag(query, args.top_k, db, use_cache=False) for query in queries])
+    batch_elapsed, batch = run("batch", lambda db: retrieve_glossary_rag_batch(queries, args.top_k, db, use_cache=False))
+
+    same_terms = sum(
+        sorted(result['term'] for result in a) == sorted(result['term'] for result in b)
+        for a, b in zip(single, batch)
+    )
+    print(f"  batch per-query latency is {batch_elapsed / single_elapsed:.1%} of the single path")
+    print(f"  {same_terms}/{len(queries)} queries returned the same terms on both paths")
+
+
+if __name__ == "__main__":
+    main()
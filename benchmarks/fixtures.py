@@ -0,0 +1,219 @@
+"""
+Offline fixtures shared by the benchmarks: no Postgres, OpenAI or Pinecone needed.
+- `setup_offline_environment` + `create_offline_database` point the app at SQLite and the local vector index
+- `FakeEmbeddingClient` stands in for the OpenAI client: deterministic hashed bag-of-words vectors
+  with a configurable per-request latency
+- `FakeChatClient` does the same for chat completions (summaries)
+- `synthetic_glossary` generates a glossary of finance-like terms, up to millions of them
+Call `setup_offline_environment` before importing anything from `services`.
+"""
+import asyncio
+import hashlib
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+import numpy as np
+
+WORDS = [
+    "asset", "bond", "yield", "equity", "option", "swap", "credit", "default", "rate", "interest",
+    "margin", "capital", "market", "risk", "hedge", "fund", "dividend", "inflation", "liquidity",
+    "leverage", "futures", "spread", "volatility", "arbitrage", "portfolio", "debt", "coupon",
+    "duration", "convexity", "index", "premium", "collateral", "derivative", "exchange", "currency",
+    "treasury", "municipal", "callable", "convertible", "preferred", "stock", "share", "earnings",
+    "revenue", "cash", "flow", "ratio", "valuation", "growth", "value", "momentum", "beta", "alpha",
+]
+# The finance words combine into ~140k distinct terms at most, larger glossaries mix in pseudo-words
+WORDS_MAX_TERMS = 20000
+SYLLABLES = [c + v for c in "bdfgklmnprstvz" for v in "aeiou"]
+
+
+class _Embeddings:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, input, model):
+        return self.client.create(input)
+
+
+class _AsyncEmbeddings:
+    def __init__(self, client):
+        self.client = client
+
+    async def create(self, input, model):
+        await asyncio.sleep(self.client.request_latency(len(input)))
+        return self.client.response(input)
+
+
+class FakeEmbeddingClient:
+    """OpenAI embeddings stand-in, `latency` seconds per request plus `per_input_latency` per text."""
+
+    def __init__(self, dim: int = 1536, latency: float = 0.0, per_input_latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.per_input_latency = per_input_latency
+        self.requests = 0
+        self.inputs = 0
+        self.embeddings = _Embeddings(self)
+
+    def async_client(self):
+        client = type("FakeAsyncOpenAI", (), {})()
+        client.embeddings = _AsyncEmbeddings(self)
+        return client
+
+    def request_latency(self, n_inputs: int) -> float:
+        return self.latency + self.per_input_latency * n_inputs
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            digest = hashlib.md5(word.strip("?.,!").encode()).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0
+        return vector
+
+    def response(self, texts: list):
+        self.requests += 1
+        self.inputs += len(texts)
+        data = [type("Embedding", (), {"index": i, "embedding": self.embed(text).tolist()}) for i, text in enumerate(texts)]
+        return type("EmbeddingResponse", (), {"data": data})
+
+    def create(self, texts: list):
+        time.sleep(self.request_latency(len(texts)))
+        return self.response(texts)
+
+
+class _ChatCompletions:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, model, messages, max_tokens=None):
+        return self.client.create(messages[-1]["content"])
+
+
+class FakeChatClient:
+    """OpenAI chat completions stand-in: the first sentences of the prompt after `latency` seconds."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _ChatCompletions(self)
+
+    def create(self, prompt: str):
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency)
+        content = " ".join(prompt.split(". ")[1:3])
+        usage = type("Usage", (), {"total_tokens": len(prompt) // 4 + len(content) // 4})
+        message = type("Message", (), {"content": content})
+        return type("ChatCompletion", (), {"choices": [type("Choice", (), {"message": message})], "usage": usage})
+
+
+def setup_offline_environment(work_dir: str = None, embedding_dim: int = None) -> str:
+    """
+    Local vector index and scratch vector store, must run before `services` is imported.
+    `embedding_dim` shrinks the vectors (ada-002 has 1536) so million-term glossaries fit in memory.
+    """
+    work_dir = work_dir or tempfile.mkdtemp(prefix="fin_bench_")
+    os.environ["VECTOR_INDEX_BACKEND"] = "local"
+    os.environ["TERM_VECTOR_STORE_DIR"] = os.path.join(work_dir, "vector_store")
+    os.environ["EMBED_CHECKPOINT_FILE"] = os.path.join(work_dir, "embed_checkpoint.json")
+    os.environ["GLOSSARY_SNAPSHOT_DIR"] = os.path.join(work_dir, "glossary_snapshot")
+    os.environ.setdefault("OPENAI_API_KEY", "offline")
+    if embedding_dim:
+        # Read by the term vector store when it is first imported
+        import services.embedding_service as embedding_service
+        embedding_service.EMBEDDING_DIM = embedding_dim
+    return work_dir
+
+
+def create_offline_database(path: str = None):
+    """
+    SQLite with the glossary schema, installed as the app's session factory:
+    - In memory by default, one connection shared by every session
+    - With `path`, a database file: concurrent threads get their own connections, and an aiosqlite
+      engine is installed as `AsyncSessionLocal` for the async endpoints (dispose `database.async_engine`)
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.dialects.postgresql import UUID
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    import core.database as database
+    from models.glossary import Base
+
+    # A column declared UUID gets NUMERIC affinity, SQLite would store ids like "1234e567..." as floats
+    compiles(UUID, "sqlite")(lambda type_, compiler, **kw: "CHAR(32)")
+    if path:
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}, pool_size=64)
+        database.async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=64)
+        database.AsyncSessionLocal = async_sessionmaker(bind=database.async_engine, autoflush=False, expire_on_commit=False)
+    else:
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    database.engine = engine
+    database.SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    return database.SessionLocal
+
+
+def install_fake_embeddings(client: FakeEmbeddingClient):
+    import services.embedding_service as embedding_service
+    embedding_service._openai_client = client
+    embedding_service._async_openai_client = client.async_client()
+
+
+def install_fake_chat(client: FakeChatClient):
+    import services.embedding_service as embedding_service
+    embedding_service._openai_client = client
+
+
+def vocabulary(n_terms: int) -> list:
+    """WORDS, plus two-syllable pseudo-words ("bako", "tizu") once `n_terms` outgrows them."""
+    if n_terms <= WORDS_MAX_TERMS:
+        return WORDS
+    n_pseudo = min(len(SYLLABLES) ** 2, 2 * int(n_terms ** 0.5))
+    return WORDS + [SYLLABLES[i // len(SYLLABLES)] + SYLLABLES[i % len(SYLLABLES)] for i in range(n_pseudo)]
+
+
+def synthetic_glossary(n_terms: int, seed: int = 0) -> list:
+    """`n_terms` distinct (term, definition, simplified_explanation) tuples."""
+    rng = random.Random(seed)
+    words_pool = vocabulary(n_terms)
+    terms = set()
+    glossary = []
+    while len(glossary) < n_terms:
+        term = " ".join(rng.sample(words_pool, rng.choice([1, 2, 2, 3]))).title()
+        if term in terms:
+            continue
+        terms.add(term)
+        words = term.lower().split()
+        definition = " ".join(words + rng.sample(words_pool, 8))
+        glossary.append((term, f"{definition}.", f"A simple take on {term.lower()}."))
+    return glossary
+
+
+def load_glossary(session_factory, glossary: list, chunk_size: int = 10000, seed: int = 0):
+    """
+    Bulk inserts the glossary and embeds it through the real embedding job.
+    Ids are seeded, ties between equally scored terms break the same way on every run.
+    """
+    from sqlalchemy import insert
+    from models.glossary import GlossaryTerm
+    from services.embed_glossary import embed_and_store_glossary
+
+    rng = random.Random(seed)
+    with session_factory() as db:
+        for start in range(0, len(glossary), chunk_size):
+            db.execute(insert(GlossaryTerm), [
+                {
+                    "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+                    "term": term, "definition": definition, "simplified_explanation": simplified,
+                }
+                for term, definition, simplified in glossary[start:start + chunk_size]
+            ])
+        db.commit()
+    embed_and_store_glossary(resume=False)
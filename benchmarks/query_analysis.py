@@ -0,0 +1,104 @@
+"""
+Microbenchmarks for query preprocessing (utils/nlp_preprocessors).
+
+Replays a Zipf-distributed stream of finance queries through:
+- legacy: stopword set rebuilt and a new `Rake()` per query (the previous implementation)
+- analyzer: `QueryAnalyzer` without memoization (cache_size=0)
+- memoized: `QueryAnalyzer` with its per-query cache
+- batch: `QueryAnalyzer.analyze_many` over the whole stream
+It also checks that the analyzer's keywords match rake_nltk's on every distinct query.
+
+Run: python -m benchmarks.query_analysis --queries 20000
+"""
+import argparse
+import random
+import time
+
+from utils.nlp_preprocessors import QueryAnalyzer, load_nlp_resources
+
+TEMPLATES = [
+    "What is {}?",
+    "What is the meaning of {}?",
+    "How does {} work in practice",
+    "Explain {} vs. {} for a beginner",
+    "difference between {} and {}",
+    "Why does {} matter for investors?!",
+]
+TERMS = [
+    "hedging", "EBITDA", "interest rate swap", "call option", "put option", "yield curve inversion",
+    "quantitative easing", "short selling", "P/E ratio", "bond yields", "hedge fund", "mutual fund",
+    "market capitalization", "dividend yield", "credit default swap", "the Fed's balance-sheet run-off",
+    "free cash flow", "working capital", "leveraged buyout", "inflation-linked bonds",
+]
+
+
+def make_queries(n_distinct: int, n_queries: int, seed: int = 0) -> tuple:
+    rng = random.Random(seed)
+    distinct = []
+    for _ in range(n_distinct):
+        template = rng.choice(TEMPLATES)
+        distinct.append(template.format(*[rng.choice(TERMS) for _ in range(template.count("{}"))]))
+    # Zipf-like popularity: a few queries make up most of the traffic
+    weights = [1 / (rank + 1) for rank in range(n_distinct)]
+    return distinct, rng.choices(distinct, weights=weights, k=n_queries)
+
+
+def legacy_analyze(query: str):
+    from nltk.corpus import stopwords
+    from nltk.tokenize import word_tokenize
+    from rake_nltk import Rake
+
+    stop_words = set(stopwords.words('english'))
+    words = [word for word in word_tokenize(query.lower()) if word not in stop_words]
+    rake = Rake()
+    rake.extract_keywords_from_text(query)
+    return words, rake.get_ranked_phrases()
+
+
+def timed(name: str, func, n_queries: int):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<10} {elapsed * 1e6 / n_queries:9.1f} us/query   {n_queries / elapsed:12.0f} queries/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--distinct", type=int, default=500)
+    parser.add_argument("--legacy-queries", type=int, default=2000, help="the legacy path is slow, replay fewer queries")
+    args = parser.parse_args()
+
+    stop_words = load_nlp_resources()
+    distinct, stream = make_queries(args.distinct, args.queries)
+
+    from rake_nltk import Rake
+    mismatches = 0
+    for query in distinct:
+        rake = Rake()
+        rake.extract_keywords_from_text(query)
+        if list(QueryAnalyzer(stop_words, cache_size=0).analyze(query).keywords) != rake.get_ranked_phrases():
+            mismatches += 1
+    print(f"{len(distinct)} distinct queries, {mismatches} keyword mismatches against rake_nltk")
+
+    print(f"Replaying {args.queries} queries ({args.legacy_queries} for legacy):")
+    legacy_stream = stream[:args.legacy_queries]
+    legacy = timed("legacy", lambda: [legacy_analyze(query) for query in legacy_stream], len(legacy_stream))
+    legacy_per_query = legacy / len(legacy_stream)
+
+    uncached = QueryAnalyzer(stop_words, cache_size=0)
+    memoized = QueryAnalyzer(stop_words)
+    batch = QueryAnalyzer(stop_words)
+    results = {
+        "analyzer": timed("analyzer", lambda: [uncached.analyze(query) for query in stream], len(stream)),
+        "memoized": timed("memoized", lambda: [memoized.analyze(query) for query in stream], len(stream)),
+        "batch": timed("batch", lambda: batch.analyze_many(stream), len(stream)),
+    }
+    for name, elapsed in results.items():
+        print(f"  {name} speedup over legacy: {legacy_per_query / (elapsed / len(stream)):.1f}x")
+    print(f"  memoized cache: {memoized.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Retrieval benchmark and relevance-regression suite, fully offline.
+
+For each glossary size it loads a synthetic glossary into SQLite + the local vector index (fake
+deterministic embedder), runs a labeled query set through the real `compute_glossary_rag` and reports:
+- Latency per stage (p50 / p95): query analysis, SQL filter, embed, vector search, hydrate, rerank
+- End-to-end latency and sequential throughput
+- Relevance: recall@1, recall@k and MRR, overall and per query kind
+
+Each size runs in its own process so indexes and caches start cold. `--save` writes the metrics as
+JSON, `--baseline` compares against a saved run and exits with 1 on a relevance or latency regression.
+Queries that log an error or return no results are reported and also make it exit with 1.
+
+Run: python -m benchmarks.retrieval --terms 1000 10000 100000
+     python -m benchmarks.retrieval --terms 1000000 --dim 128 --queries 500
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import numpy as np
+
+from benchmarks.fixtures import (
+    FakeEmbeddingClient, create_offline_database, install_fake_embeddings, load_glossary,
+    setup_offline_environment, synthetic_glossary,
+)
+
+STAGES = ["query_analysis", "sql_filter", "embed", "vector_search", "hydrate", "rerank"]
+QUERY_KINDS = ["exact", "question", "typo", "partial"]
+TEMPLATES = ["What is {}?", "{} explained", "how does {} affect returns", "define {}"]
+
+
+def typo(word: str, rng: random.Random) -> str:
+    """Swaps two adjacent inner letters, "hedge" -> "hegde"."""
+    if len(word) < 4:
+        return word + word[-1]
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def labeled_queries(glossary: list, n_queries: int, seed: int = 1) -> list:
+    """
+    Deterministic queries labeled with the term they should retrieve, an equal share of each kind:
+    - exact: the term itself; question: the term in a question template
+    - typo: the term with a misspelled word; partial: one term word dropped, two definition words added
+    """
+    rng = random.Random(seed)
+    queries = []
+    for i in range(n_queries):
+        kind = QUERY_KINDS[i % len(QUERY_KINDS)]
+        term, definition, _ = rng.choice(glossary)
+        words = term.lower().split()
+        if kind == "exact":
+            text = term.lower()
+        elif kind == "question":
+            text = rng.choice(TEMPLATES).format(term.lower())
+        elif kind == "typo":
+            position = max(range(len(words)), key=lambda j: len(words[j]))
+            text = " ".join(typo(word, rng) if j == position else word for j, word in enumerate(words))
+        else:
+            context = [word for word in definition.rstrip(".").split() if word not in words]
+            kept = rng.sample(words, max(1, len(words) - 1))
+            text = " ".join(kept + rng.sample(context, min(2, len(context))))
+        queries.append({"query": text, "relevant": term, "kind": kind})
+    return queries
+
+
+class StageTimer:
+    """Times the stages of `compute_glossary_rag` by wrapping the functions it looks up in `rag_service`."""
+
+    def __init__(self):
+        self.current = defaultdict(float)
+
+    def wrap(self, func, stage: str):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.current[stage] += time.perf_counter() - start
+        return timed
+
+    def install(self, rag_service):
+        timer = self
+
+        class TimedIndex:
+            def __init__(self, index):
+                self.index = index
+
+            def query(self, *args, **kwargs):
+                return timer.wrap(self.index.query, "vector_search")(*args, **kwargs)
+
+            def __getattr__(self, name):
+                return getattr(self.index, name)
+
+        get_vector_index = rag_service.get_vector_index
+        rag_service.keyword_extraction = self.wrap(rag_service.keyword_extraction, "query_analysis")
+        rag_service.lexical_search = self.wrap(rag_service.lexical_search, "sql_filter")
+        rag_service.generate_embedding = self.wrap(rag_service.generate_embedding, "embed")
+        rag_service.get_vector_index = lambda: TimedIndex(get_vector_index())
+        rag_service.hydrate_candidates = self.wrap(rag_service.hydrate_candidates, "hydrate")
+        rag_service.rerank_results = self.wrap(rag_service.rerank_results, "rerank")
+
+    def take(self) -> dict:
+        stages, self.current = dict(self.current), defaultdict(float)
+        return stages
+
+
+class ErrorCounter(logging.Handler):
+    """Counts the errors logged while a query runs, `compute_glossary_rag` logs them and returns []."""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def percentiles(seconds: list) -> dict:
+    return {
+        "p50_ms": float(np.percentile(seconds, 50)) * 1000,
+        "p95_ms": float(np.percentile(seconds, 95)) * 1000,
+    }
+
+
+def relevance(ranked: list, top_k: int) -> dict:
+    """recall@1, recall@k and MRR of single-answer queries, from the 1-based rank of the answer (0 if missed)."""
+    return {
+        "recall@1": sum(rank == 1 for rank in ranked) / len(ranked),
+        f"recall@{top_k}": sum(0 < rank <= top_k for rank in ranked) / len(ranked),
+        "mrr": sum(1 / rank for rank in ranked if rank) / len(ranked),
+    }
+
+
+def run_scale(n_terms: int, n_queries: int, top_k: int, dim: int, embed_latency: float) -> dict:
+    """Loads `n_terms` terms and runs the query set, in a fresh process."""
+    # Every upsert rewrites the local store's id index, bulk loads go in large chunks
+    os.environ.setdefault("EMBED_CHUNK_SIZE", "20000")
+    os.environ.setdefault("UPSERT_BATCH_SIZE", "20000")
+    setup_offline_environment(embedding_dim=dim)
+    logging.getLogger("fin_intelligence_hub").setLevel(logging.WARNING)
+    session_factory = create_offline_database()
+    client = FakeEmbeddingClient(dim=dim)
+    install_fake_embeddings(client)
+
+    import services.rag_service as rag_service
+    from services.embedding_cache import embedding_cache
+    from services.glossary_snapshot import GLOSSARY_SNAPSHOT_ENABLED, glossary_snapshot
+
+    start = time.perf_counter()
+    glossary = synthetic_glossary(n_terms)
+    load_glossary(session_factory, glossary)
+    queries = labeled_queries(glossary, n_queries)
+    with session_factory() as db:
+        # Builds the lexical and vector indexes and the glossary snapshot outside the measurement
+        if GLOSSARY_SNAPSHOT_ENABLED:
+            glossary_snapshot.refresh(db)
+        rag_service.compute_glossary_rag("warm up", top_k, db)
+    load_seconds = time.perf_counter() - start
+
+    timer = StageTimer()
+    timer.install(rag_service)
+    embedding_cache.clear()
+    client.latency = embed_latency
+    stage_seconds = defaultdict(list)
+    totals = []
+    ranks = []
+    errors = ErrorCounter()
+    logging.getLogger("fin_intelligence_hub").addHandler(errors)
+    errored, empty = 0, 0
+    with session_factory() as db:
+        started = time.perf_counter()
+        for query in queries:
+            start = time.perf_counter()
+            logged_errors = errors.count
+            results = rag_service.compute_glossary_rag(query["query"], top_k, db)
+            totals.append(time.perf_counter() - start)
+            if errors.count > logged_errors:
+                errored += 1
+            elif not results:
+                empty += 1
+            for stage, seconds in timer.take().items():
+                stage_seconds[stage].append(seconds)
+            terms = [result['term'] for result in results[:top_k]]
+            ranks.append(terms.index(query["relevant"]) + 1 if query["relevant"] in terms else 0)
+        elapsed = time.perf_counter() - started
+
+    by_kind = defaultdict(list)
+    for query, rank in zip(queries, ranks):
+        by_kind[query["kind"]].append(rank)
+    return {
+        "terms": n_terms,
+        "queries": len(queries),
+        # Queries that logged an error / returned nothing, a broken pipeline shows up here and not as low recall
+        "errored": errored,
+        "empty": empty,
+        "load_seconds": load_seconds,
+        "throughput_qps": len(queries) / elapsed,
+        "latency": percentiles(totals),
+        # Stages a query skipped (e.g. no keywords) count as 0 so every stage has one sample per query
+        "stages": {
+            stage: percentiles(stage_seconds[stage] + [0.0] * (len(queries) - len(stage_seconds[stage])))
+            for stage in STAGES
+        },
+        "relevance": relevance(ranks, top_k),
+        "relevance_by_kind": {kind: relevance(by_kind[kind], top_k) for kind in QUERY_KINDS if by_kind[kind]},
+    }
+
+
+def report(result: dict, top_k: int):
+    print(
+        f"{result['terms']} terms: loaded in {result['load_seconds']:.1f}s, {result['queries']} queries, "
+        f"{result['throughput_qps']:.1f} queries/s, "
+        f"p50 {result['latency']['p50_ms']:.2f} ms, p95 {result['latency']['p95_ms']:.2f} ms"
+    )
+    if result['errored'] or result['empty']:
+        print(f"  FAILED QUERIES: {result['errored']} errored, {result['empty']} returned no results")
+    for stage in STAGES:
+        latency = result['stages'][stage]
+        print(f"  {stage:<15} p50 {latency['p50_ms']:8.2f} ms   p95 {latency['p95_ms']:8.2f} ms")
+    for kind, metrics in [("all", result['relevance'])] + list(result['relevance_by_kind'].items()):
+        print(
+            f"  {kind:<15} recall@1 {metrics['recall@1']:.3f}   recall@{top_k} {metrics[f'recall@{top_k}']:.3f}   "
+            f"MRR {metrics['mrr']:.3f}"
+        )
+
+
+def regressions(results: list, baseline: dict, max_quality_drop: float, max_latency_increase: float) -> list:
+    """Relevance metrics that dropped and p95 latencies that grew beyond the tolerances, per glossary size."""
+    failures = []
+    for result in results:
+        base = baseline.get(str(result['terms']))
+        if base is None:
+            continue
+        for metric, value in result['relevance'].items():
+            if metric in base['relevance'] and value < base['relevance'][metric] - max_quality_drop:
+                failures.append(f"{result['terms']} terms: {metric} {value:.3f} < baseline {base['relevance'][metric]:.3f}")
+        p95, base_p95 = result['latency']['p95_ms'], base['latency']['p95_ms']
+        if p95 > base_p95 * (1 + max_latency_increase):
+            failures.append(f"{result['terms']} terms: p95 latency {p95:.2f} ms > baseline {base_p95:.2f} ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, nargs="+", default=[1000, 10000, 100000], help="glossary sizes")
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=256, help="embedding dimension of the fake embedder")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="seconds per embedding request")
+    parser.add_argument("--save", help="write the metrics to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from --save to compare against")
+    parser.add_argument("--max-quality-drop", type=float, default=0.01, help="tolerated absolute drop of recall / MRR")
+    parser.add_argument("--max-latency-increase", type=float, default=0.25, help="tolerated relative p95 latency increase")
+    args = parser.parse_args()
+
+    results = []
+    for n_terms in args.terms:
+        # A fresh process per size: module-level indexes and caches would carry over otherwise
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            result = executor.submit(run_scale, n_terms, args.queries, args.top_k, args.dim, args.embed_latency).result()
+        report(result, args.top_k)
+        results.append(result)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({str(result['terms']): result for result in results}, f, indent=2)
+        print(f"Metrics saved to {args.save}")
+
+    failed = [result for result in results if result['errored'] or result['empty']]
+    for result in failed:
+        print(f"FAILED {result['terms']} terms: {result['errored']} queries errored, {result['empty']} returned no results")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        failures = regressions(results, baseline, args.max_quality_drop, args.max_latency_increase)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            sys.exit(1)
+        print(f"No regression against {args.baseline}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
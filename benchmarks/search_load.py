@@ -0,0 +1,141 @@
+"""
+Load benchmark for /glossary/search: sync threadpool handler vs the async endpoint.
+
+Both variants run the real retrieval code offline (SQLite file + in-memory BM25, local vector index,
+fake embedder whose `--embed-latency` stands in for the OpenAI round-trip), on the same queries:
+- sync: `retrieve_glossary_rag` with a session per request on a 40 thread pool, FastAPI's
+  default for sync handlers
+- async: the `search_glossary` route handler on one event loop, with a session from
+  `get_async_db` per request
+The result cache is off and the embedding cache is cleared before each variant, so every request does
+the full work. Both variants must return the same results.
+
+Run: python -m benchmarks.search_load --requests 1000 --concurrency 200
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fixtures import (
+    FakeEmbeddingClient, create_offline_database, install_fake_embeddings, load_glossary,
+    setup_offline_environment, synthetic_glossary,
+)
+
+# anyio's default thread limiter used by FastAPI for sync endpoints
+THREADPOOL_SIZE = 40
+TEMPLATES = ["What is {}?", "{} explained", "how does {} affect returns", "{}"]
+
+
+def make_queries(glossary: list, n_queries: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    return [rng.choice(TEMPLATES).format(rng.choice(glossary)[0].lower()) for _ in range(n_queries)]
+
+
+def run_sync(queries: list, top_k: int, concurrency: int):
+    from services.rag_service import retrieve_glossary_rag
+
+    # Requests beyond the pool size queue up exactly like they do in front of FastAPI's threadpool
+    latencies = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(concurrency, THREADPOOL_SIZE)) as pool:
+        submitted = [(time.perf_counter(), pool.submit(retrieve_glossary_rag, query, top_k)) for query in queries]
+        results = []
+        for submitted_at, future in submitted:
+            results.append(future.result())
+            latencies.append(time.perf_counter() - submitted_at)
+    return time.perf_counter() - start, latencies, results
+
+
+async def run_async(queries: list, top_k: int, concurrency: int):
+    from core.database import get_async_db
+    from router.glossary import search_glossary
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = [0.0] * len(queries)
+    results = [None] * len(queries)
+
+    async def request(i: int, query: str):
+        submitted_at = time.perf_counter()
+        async with semaphore:
+            async for db in get_async_db():
+                response = await search_glossary(query, top_k, db)
+        results[i] = response["results"]
+        latencies[i] = time.perf_counter() - submitted_at
+
+    start = time.perf_counter()
+    await asyncio.gather(*[request(i, query) for i, query in enumerate(queries)])
+    return time.perf_counter() - start, latencies, results
+
+
+def report(name: str, elapsed: float, latencies: list):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:>6}: {len(latencies) / elapsed:8.1f} req/s | "
+          f"mean {statistics.mean(latencies) * 1000:7.1f} ms | p50 {p50 * 1000:7.1f} ms | p99 {p99 * 1000:7.1f} ms")
+    return len(latencies) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--terms", type=int, default=5000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--embed-latency", type=float, default=0.12, help="seconds per embedding request")
+    args = parser.parse_args()
+
+    os.environ["RESULT_CACHE_ENABLED"] = "false"
+    work_dir = setup_offline_environment()
+    logging.getLogger("fin_intelligence_hub").setLevel(logging.WARNING)
+    session_factory = create_offline_database(os.path.join(work_dir, "glossary.db"))
+    client = FakeEmbeddingClient(latency=0)
+    install_fake_embeddings(client)
+
+    import core.database as database
+    from services.embedding_cache import embedding_cache
+    from services.glossary_snapshot import GLOSSARY_SNAPSHOT_ENABLED, glossary_snapshot
+    from services.rag_service import retrieve_glossary_rag
+
+    glossary = synthetic_glossary(args.terms)
+    load_glossary(session_factory, glossary)
+    queries = make_queries(glossary, args.requests)
+    # Builds the lexical and vector indexes and the glossary snapshot like the app's warm-up does
+    with session_factory() as db:
+        if GLOSSARY_SNAPSHOT_ENABLED:
+            glossary_snapshot.refresh(db)
+        retrieve_glossary_rag("warm up", args.top_k, db)
+    client.latency = args.embed_latency
+
+    print(f"{args.requests} requests, {args.concurrency} concurrent clients, {args.terms} terms, "
+          f"{args.embed_latency * 1000:.0f} ms per embedding request")
+    embedding_cache.clear()
+    sync_elapsed, sync_latencies, sync_results = run_sync(queries, args.top_k, args.concurrency)
+    sync_throughput = report("sync", sync_elapsed, sync_latencies)
+
+    async def run():
+        try:
+            return await run_async(queries, args.top_k, args.concurrency)
+        finally:
+            await database.async_engine.dispose()
+
+    embedding_cache.clear()
+    async_elapsed, async_latencies, async_results = asyncio.run(run())
+    async_throughput = report("async", async_elapsed, async_latencies)
+    print(f"async speedup: {async_throughput / sync_throughput:.1f}x")
+
+    mismatches = sum(
+        [result['term'] for result in sync] != [result['term'] for result in async_]
+        for sync, async_ in zip(sync_results, async_results)
+    )
+    if mismatches:
+        print(f"WARNING: {mismatches} queries returned different results from the sync and async paths")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Sentiment scoring throughput in texts/sec:
+- per-call: `analyze_sentiment` once per text (the previous path, still the pipeline's per-article call)
+- batch: `score_texts` across a process pool, with 1..N workers
+Texts are synthetic finance news summaries; labels of both paths are compared.
+
+Run: python -m benchmarks.sentiment --texts 20000 --workers 1 2 4
+"""
+import argparse
+import os
+import random
+import time
+
+from benchmarks.fixtures import WORDS
+
+PHRASES = [
+    "shares surged after earnings beat estimates", "the stock plunged on a downgrade", "analysts remain bullish",
+    "investors turned bearish amid recession fears", "the company announced layoffs", "a buyback lifted the shares",
+    "markets rallied on rate cut hopes", "the firm filed for bankruptcy", "revenue was flat", "guidance was unchanged",
+]
+
+
+def make_texts(n_texts: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [
+        ". ".join(f"{rng.choice(PHRASES)} as {' '.join(rng.sample(WORDS, 6))}" for _ in range(rng.randint(2, 5))).capitalize() + "."
+        for _ in range(n_texts)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    from services.sentiment_analysis_service import analyze_sentiment, create_sentiment_pool, get_analyzer, score_texts
+
+    texts = make_texts(args.texts)
+    get_analyzer()
+    print(f"{len(texts)} texts, {os.cpu_count()} CPUs")
+
+    start = time.perf_counter()
+    labels = [analyze_sentiment(text) for text in texts]
+    baseline = time.perf_counter() - start
+    print(f"  per-call     {len(texts) / baseline:10.0f} texts/s")
+
+    for workers in sorted(set(args.workers)):
+        if workers == 1:
+            start = time.perf_counter()
+            scores = score_texts(texts, workers=1)
+        else:
+            # Pool start-up is paid once per backfill, keep it out of the measurement
+            with create_sentiment_pool(workers) as pool:
+                score_texts(texts[:workers], executor=pool, chunk_size=1)
+                start = time.perf_counter()
+                scores = score_texts(texts, executor=pool)
+        elapsed = time.perf_counter() - start
+        mismatches = sum(label != score.label for label, score in zip(labels, scores))
+        print(f"  batch x{workers:<3}   {len(texts) / elapsed:10.0f} texts/s   {baseline / elapsed:5.1f}x   {mismatches} label mismatches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Startup benchmark: cold import time, lifespan warm-up and first-request latency of the API.
+
+Every run is a fresh interpreter, so module imports and client initialization are measured cold:
+- import: `import main`
+- startup: FastAPI lifespan (warm-up hook), skipped with --no-warmup
+- first / second request: GET / twice, or GET /glossary/search when --query is given
+--top-imports N also prints the N slowest imports (cumulative, from `python -X importtime`).
+
+Run: python -m benchmarks.startup --runs 5 --query "what is hedging"
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+path = sys.argv[1]
+timings = {"import": imported - start}
+with TestClient(main.app) as client:
+    timings["startup"] = time.perf_counter() - imported
+    for name in ("first_request", "second_request"):
+        request_start = time.perf_counter()
+        client.get(path)
+        timings[name] = time.perf_counter() - request_start
+print(json.dumps(timings))
+"""
+
+
+def run_once(path: str, warmup: bool) -> dict:
+    env = dict(os.environ, STARTUP_WARMUP="true" if warmup else "false")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, path],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def top_imports(n: int) -> list:
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, check=True
+    ).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        imports.append((int(cumulative), module.strip()))
+    # Only top-level modules, their cumulative time already includes submodules
+    imports = [(cumulative, module) for cumulative, module in imports if "." not in module and module != "main"]
+    return sorted(imports, reverse=True)[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--query", help="measure GET /glossary/search?query=... instead of GET /")
+    parser.add_argument("--no-warmup", action="store_true", help="disable the lifespan warm-up hook")
+    parser.add_argument("--top-imports", type=int, default=10)
+    args = parser.parse_args()
+
+    path = f"/glossary/search?query={args.query}" if args.query else "/"
+    runs = [run_once(path, not args.no_warmup) for _ in range(args.runs)]
+
+    print(f"{args.runs} cold starts, request: GET {path}, warm-up: {not args.no_warmup}")
+    for name in ("import", "startup", "first_request", "second_request"):
+        values = [run[name] for run in runs]
+        print(f"  {name:<15} median {statistics.median(values) * 1000:8.1f} ms   min {min(values) * 1000:8.1f} ms")
+
+    if args.top_imports:
+        print(f"Slowest imports of `import main`:")
+        for cumulative, module in top_imports(args.top_imports):
+            print(f"  {module:<30} {cumulative / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
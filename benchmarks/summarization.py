@@ -0,0 +1,86 @@
+"""
+Summarization benchmark over a synthetic news stream in which stories are syndicated: the same
+wire text arrives several times under different URLs, with a different dateline and footer.
+
+- legacy: one chat completion per article, one at a time (the previous `generate_summary`)
+- engine: `SummaryEngine.summarize_many`, content-hash + MinHash LSH cache and concurrent requests
+- textrank: the local extractive backend, no network
+The chat model is a fake with a fixed latency per request.
+
+Run: python -m benchmarks.summarization --stories 100 --copies 3
+"""
+import argparse
+import logging
+import random
+import time
+
+from benchmarks.fixtures import WORDS, FakeChatClient, install_fake_chat, setup_offline_environment
+
+OUTLETS = ["Reuters", "AP", "Bloomberg wire", "Dow Jones", "AFP"]
+
+
+def make_articles(n_stories: int, copies: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    articles = []
+    for _ in range(n_stories):
+        story = ". ".join(" ".join(rng.choices(WORDS, k=rng.randint(10, 20))).capitalize() for _ in range(rng.randint(8, 16))) + "."
+        for outlet in rng.sample(OUTLETS, copies):
+            articles.append(f"{outlet} - {story} Copyright {outlet}, all rights reserved.")
+    rng.shuffle(articles)
+    return articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=100)
+    parser.add_argument("--copies", type=int, default=3, help="syndicated copies per story")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per chat completion")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tokens-per-minute", type=int, default=10_000_000, help="token budget of the engine")
+    args = parser.parse_args()
+
+    setup_offline_environment()
+    logging.getLogger("fin_intelligence_hub").setLevel(logging.WARNING)
+    client = FakeChatClient(latency=args.latency)
+    install_fake_chat(client)
+
+    from services.summarization_service import (
+        SYSTEM_PROMPT, USER_PROMPT, OpenAISummaryBackend, SummaryEngine, TextRankSummaryBackend,
+    )
+    from services.summary_cache import SummaryCache
+    from utils.pipeline import TokenBudgetLimiter
+
+    articles = make_articles(args.stories, args.copies)
+    print(f"{len(articles)} articles ({args.stories} stories x {args.copies} copies), {args.latency * 1000:.0f} ms per completion")
+
+    def run(name, func):
+        requests_before = client.requests
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        print(
+            f"  {name:<9} {elapsed:7.2f}s   {elapsed * 1000 / len(articles):7.2f} ms/article   "
+            f"{client.requests - requests_before:5d} completions"
+        )
+        return elapsed
+
+    def legacy_summarize(article):
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": USER_PROMPT.format(content=article)}]
+        return client.chat.completions.create(model="gpt-3.5-turbo", messages=messages, max_tokens=512)
+
+    legacy = run("legacy", lambda: [legacy_summarize(article) for article in articles])
+    limiter = TokenBudgetLimiter(args.tokens_per_minute, 10_000)
+    engine = SummaryEngine(OpenAISummaryBackend(limiter=limiter), cache=SummaryCache(db_path=None))
+    cached = run("engine", lambda: engine.summarize_many(articles, args.concurrency))
+    textrank = TextRankSummaryBackend()
+    textrank.summarize(articles[0])
+    run("textrank", lambda: [textrank.summarize(article) for article in articles])
+
+    stats = engine.stats()
+    print(f"  engine: {legacy / cached:.1f}x faster than legacy, {stats['cache']['near_duplicate_hits']} near-duplicate hits, "
+          f"{stats['coalesced']} coalesced, {stats['backend_calls']} backend calls for {args.stories} stories, "
+          f"{limiter.waited_seconds:.1f}s waiting on the token budget")
+
+
+if __name__ == "__main__":
+    main()
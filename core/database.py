@@ -1,8 +1,13 @@
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 import os
 
 from core.logger import logger
+from core.metrics import counter, histogram
 
 PG_USER = os.getenv("PG_USER")
 PG_PASSWORD = os.getenv("PG_PASSWORD")
@@ -11,20 +16,119 @@ PG_PORT = os.getenv("PG_PORT")
 GLOSSARY_DB = os.getenv("GLOSSARY_DB")
 
 GLOSSARY_DB_URL = f"postgresql://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{GLOSSARY_DB}"
+GLOSSARY_ASYNC_DB_URL = f"postgresql+asyncpg://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{GLOSSARY_DB}"
+
+# Connection pool sizing, per engine and per worker process:
+# at most DB_POOL_SIZE + DB_MAX_OVERFLOW connections, checkouts wait DB_POOL_TIMEOUT seconds for one
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# Connections older than this are replaced, stays under typical server / proxy idle timeouts
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    # Tests connections on checkout, dropped connections are replaced instead of failing the request
+    "pool_pre_ping": True,
+}
+
+pool_counters = {
+    "sync": {"connects": 0, "checkouts": 0, "invalidated": 0},
+    "async": {"connects": 0, "checkouts": 0, "invalidated": 0},
+}
+
+def track_pool(engine, name: str):
+    """Counts new connections, checkouts and invalidated connections of `engine`'s pool."""
+    counters = pool_counters[name]
+
+    def on_connect(dbapi_connection, connection_record):
+        counters["connects"] += 1
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        counters["checkouts"] += 1
+
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        counters["invalidated"] += 1
+
+    event.listen(engine, "connect", on_connect)
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "invalidate", on_invalidate)
+
+DB_QUERIES = counter("fin_db_queries_total", "Statements sent to the database", ("dialect",))
+DB_QUERY_SECONDS = histogram("fin_db_query_duration_seconds", "Database round-trip time per statement", ("dialect",))
+
+# Every engine, sync or async (which runs a sync engine underneath), counts its round-trips
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    dialect = conn.dialect.name
+    DB_QUERIES.inc(dialect=dialect)
+    if started:
+        DB_QUERY_SECONDS.observe(time.perf_counter() - started.pop(), dialect=dialect)
+
+@event.listens_for(Engine, "handle_error")
+def _query_failed(context):
+    if context.connection is None:
+        return
+    DB_QUERIES.inc(dialect=context.connection.dialect.name)
+    started = context.connection.info.get("query_started")
+    if started:
+        started.pop()
 
 try:
     logger.info("Connecting to postgres..")
-    engine = create_engine(GLOSSARY_DB_URL)
+    engine = create_engine(GLOSSARY_DB_URL, **POOL_OPTIONS)
+    track_pool(engine, "sync")
     SessionLocal = sessionmaker(bind=engine, autoflush=False)
     logger.info("Connected to postgres")
 except Exception as e:
     logger.error("Connection to postgres failed")
 
+try:
+    async_engine = create_async_engine(GLOSSARY_ASYNC_DB_URL, **POOL_OPTIONS)
+    track_pool(async_engine.sync_engine, "async")
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+except Exception as e:
+    logger.error(f"Async postgres engine setup failed: {str(e)}")
+
 def get_db():
+    """Request-scoped session, its connection goes back to the pool when the request ends."""
     db = SessionLocal()
     try:
         logger.info("Creating a new DB session")
         yield db
-    except Exception as e:
-        logger.error("Closing db session")
-        db.close()
\ No newline at end of file
+    finally:
+        db.close()
+
+@contextmanager
+def db_session():
+    """`get_db` for scripts and background jobs: `with db_session() as db: ...`"""
+    yield from get_db()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def pool_stats() -> dict:
+    """Current state and lifetime counters of both connection pools."""
+    stats = {}
+    for name, pool_engine in (("sync", globals().get("engine")), ("async", globals().get("async_engine"))):
+        if pool_engine is None:
+            continue
+        pool = pool_engine.pool
+        stats[name] = {
+            "size": pool.size(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            **pool_counters[name],
+        }
+    return stats
@@ -1,23 +1,68 @@
+import atexit
 import logging
 import os
+import queue
+import random
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 
 LOG_DIR = 'fin_logs'
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Share of DEBUG records kept (verbose payloads: response headers, article text, stage traces)
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 0.1))
+# Records waiting for the writer thread, beyond that new records are dropped instead of blocking the caller
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
 
 os.makedirs(LOG_DIR, exist_ok=True)
 
 log_filename = os.path.join(LOG_DIR, f"app_{datetime.now().strftime('%Y-%m-%d')}.log")
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] - %(message)s",
-    handlers=[
-        logging.FileHandler(log_filename),   # Write logs to file
-        logging.StreamHandler()              # Print logs to console
-    ]
-)
+
+class DebugSampler(logging.Filter):
+    """Keeps every INFO+ record and a random `rate` share of DEBUG ones."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Hands records to the writer thread, never blocks: records that don't fit in the queue are counted and dropped."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+formatter = logging.Formatter("%(asctime)s [%(levelname)s] - %(message)s")
+output_handlers = [
+    logging.FileHandler(log_filename),   # Write logs to file
+    logging.StreamHandler()              # Print logs to console
+]
+for handler in output_handlers:
+    handler.setFormatter(formatter)
+
+# File and console writes happen on the listener's thread, logging calls only enqueue
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+queue_handler = DroppingQueueHandler(log_queue)
+# Records are rendered to their message before being queued, the output handlers add the prefix
+queue_handler.setFormatter(logging.Formatter("%(message)s"))
+queue_handler.addFilter(DebugSampler(LOG_DEBUG_SAMPLE_RATE))
+log_listener = QueueListener(log_queue, *output_handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+logging.basicConfig(level=LOG_LEVEL, handlers=[queue_handler])
 
 logger = logging.getLogger("fin_intelligence_hub")
 
 logger.info("Logger initialized successfully!")
-
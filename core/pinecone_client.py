@@ -1,5 +1,6 @@
 from pinecone import Pinecone, ServerlessSpec
 import os
+import threading
 from core.logger import logger
 
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
@@ -13,22 +14,41 @@ spec = ServerlessSpec(
     region=PINECONE_ENVIRONMENT
 )
 
-try:
-    logger.info("Initializing Pinecone connection...")
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    logger.info("Pinecone connected!")
-except Exception as e:
-    logger.error("Pinecone connection failed!!")
+_pc = None
+_glossary_index = None
+_glossary_index_lock = threading.RLock()
+
+def get_pinecone_client() -> Pinecone:
+    """Pinecone client, created on first use instead of at import."""
+    global _pc
+    if _pc is None:
+        with _glossary_index_lock:
+            if _pc is None:
+                logger.info("Initializing Pinecone connection...")
+                _pc = Pinecone(api_key=PINECONE_API_KEY)
+                logger.info("Pinecone connected!")
+    return _pc
 
 def get_glossary_index():
-    indexes = pc.list_indexes()
-    index_names = [index['name'] for index in indexes]
-    logger.info(f"List of pinecone indexes: {index_names}")
+    """
+    Returns the glossary index handle, created once per process.
+    The index listing (and creation if missing) only happens on the first call.
+    """
+    global _glossary_index
+    if _glossary_index is not None:
+        return _glossary_index
+
+    with _glossary_index_lock:
+        if _glossary_index is None:
+            pc = get_pinecone_client()
+            indexes = pc.list_indexes()
+            index_names = [index['name'] for index in indexes]
+            logger.info(f"List of pinecone indexes: {index_names}")
 
-    if PINECONE_INDEX_NAME not in index_names:
-        logger.warning(f"Index {PINECONE_INDEX_NAME} not found. Creating it...")
-        pc.create_index(PINECONE_INDEX_NAME, dimension=1536, metric="cosine", spec=spec)
+            if PINECONE_INDEX_NAME not in index_names:
+                logger.warning(f"Index {PINECONE_INDEX_NAME} not found. Creating it...")
+                pc.create_index(PINECONE_INDEX_NAME, dimension=1536, metric="cosine", spec=spec)
 
-    index = pc.Index(PINECONE_INDEX_NAME)
-    logger.info(f"Connected to pinecone index {PINECONE_INDEX_NAME}")
-    return index
\ No newline at end of file
+            _glossary_index = pc.Index(PINECONE_INDEX_NAME)
+            logger.info(f"Connected to pinecone index {PINECONE_INDEX_NAME}")
+    return _glossary_index
\ No newline at end of file
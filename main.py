@@ -1,17 +1,93 @@
-from fastapi import FastAPI
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from router.glossary import router as glossary_router
+from router.news import router as news_router
+from core.database import pool_stats
 from core.logger import logger
+from core.metrics import histogram, render_metrics
+from services.glossary_snapshot import GLOSSARY_SNAPSHOT_ENABLED, glossary_snapshot
 
-app = FastAPI()
+# Load NLP data and open clients before serving, instead of on the first request
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+
+def warm_up():
+    """
+    Initializes what the first search would otherwise pay for. Failures are logged, not raised,
+    the app still starts and each resource retries on first use.
+    """
+    from services.embedding_service import get_async_openai_client, get_openai_client
+    from services.lexical_index import get_stemmer
+    from services.vector_index import get_vector_index
+    from utils.nlp_preprocessors import get_query_analyzer
+
+    steps = [
+        ("query analyzer", get_query_analyzer),
+        ("stemmer", get_stemmer),
+        ("openai clients", lambda: (get_openai_client(), get_async_openai_client())),
+        ("vector index", get_vector_index),
+    ]
+    if GLOSSARY_SNAPSHOT_ENABLED:
+        # Maps the snapshot another worker published, builds it if the glossary changed since
+        steps.append(("glossary snapshot", glossary_snapshot.refresh))
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+            logger.info(f"Warm-up: {name} ready in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            logger.error(f"Warm-up: {name} failed: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if STARTUP_WARMUP:
+        start = time.perf_counter()
+        await asyncio.to_thread(warm_up)
+        logger.info(f"Warm-up completed in {time.perf_counter() - start:.2f}s")
+    if GLOSSARY_SNAPSHOT_ENABLED:
+        glossary_snapshot.start_refresher()
+    yield
+    from services.vector_index import close_vector_index
+    glossary_snapshot.stop_refresher()
+    await close_vector_index()
+
+app = FastAPI(lifespan=lifespan)
+
+HTTP_REQUEST_SECONDS = histogram("fin_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # The route template ("/glossary/{term_id}"), not the raw path, keeps label cardinality bounded
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method, route=route.path if route else "unmatched", status=response.status_code
+    )
+    return response
 
 app.include_router(glossary_router, prefix="/glossary")
+app.include_router(news_router, prefix="/news")
 
 @app.get("/")
 def root():
     logger.info("Root endpoint accessed.")
     return {"message": "Financial Intelligence Hub is running!"}
 
+@app.get("/db/pool")
+def db_pool_stats():
+    return pool_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of this worker's counters and histograms."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting the server...")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
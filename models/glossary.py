@@ -1,11 +1,14 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, String, Text, JSON, Boolean
+from sqlalchemy import Column, DateTime, String, Text, JSON, Boolean, Index, func, literal_column
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 import uuid
 
 Base = declarative_base()
 
+# Rendered inline (not as a bound parameter) so queries match the expression index
+TS_CONFIG = literal_column("'english'::regconfig")
+
 class GlossaryTerm(Base):
     __tablename__ = "glossary"
 
@@ -15,6 +18,24 @@ class GlossaryTerm(Base):
     simplified_explanation = Column(Text)
     contextual_examples = Column(JSON)
     embedded = Column(Boolean, nullable=False, default=False)
+    # sha256 of the embedded text and when it was embedded, see services/embed_glossary.py
+    content_hash = Column(String(64), nullable=True)
+    embedded_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
-    deleted_at = Column(DateTime, nullable=True)
\ No newline at end of file
+    deleted_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Lexical search indexes, see services/lexical_index.py
+        Index(
+            "ix_glossary_term_tsv",
+            func.to_tsvector(TS_CONFIG, term),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_glossary_term_trgm",
+            term,
+            postgresql_using="gin",
+            postgresql_ops={"term": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
\ No newline at end of file
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, Text, TIMESTAMP
+from sqlalchemy import Column, Date, Float, ForeignKey, Index, Integer, String, Text, TIMESTAMP, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -13,9 +13,63 @@ class NewsArticle(Base):
     title = Column(Text, nullable=False)
     source = Column(Text, nullable=False)
     url = Column(Text, nullable=False)
+    # sha256 hex of url, unique so bulk inserts can skip duplicates with ON CONFLICT DO NOTHING
+    url_hash = Column(String(64), nullable=False, unique=True)
     published_at = Column(TIMESTAMP, nullable=False)
     summary = Column(Text)
     sentiment = Column(Text)
+    # VADER scores behind the label, see services/sentiment_analysis_service.py
+    sentiment_compound = Column(Float, nullable=True)
+    sentiment_positive = Column(Float, nullable=True)
+    sentiment_neutral = Column(Float, nullable=True)
+    sentiment_negative = Column(Float, nullable=True)
     created_at = Column(TIMESTAMP, default=datetime.utcnow, nullable=False)
     updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
-    deleted_at = Column(TIMESTAMP, nullable=True)
\ No newline at end of file
+    deleted_at = Column(TIMESTAMP, nullable=True)
+
+    __table_args__ = (
+        # Keyset pagination of GET /news, newest first, optionally narrowed by source or sentiment
+        Index("ix_news_articles_published_at_id", published_at.desc(), id.desc(), postgresql_where=text("deleted_at IS NULL")),
+        Index("ix_news_articles_source_published_at_id", source, published_at.desc(), id.desc(), postgresql_where=text("deleted_at IS NULL")),
+        Index("ix_news_articles_sentiment_published_at_id", sentiment, published_at.desc(), id.desc(), postgresql_where=text("deleted_at IS NULL")),
+    )
+
+class NewsSentimentDaily(Base):
+    """Per-day, per-source article counts by sentiment, kept up to date by every insert, see services/news_query_service.py"""
+    __tablename__ = "news_sentiment_daily"
+
+    day = Column(Date, primary_key=True)
+    source = Column(Text, primary_key=True)
+    positive = Column(Integer, nullable=False, default=0)
+    neutral = Column(Integer, nullable=False, default=0)
+    negative = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+
+class NewsArticleTerm(Base):
+    """Glossary terms mentioned in an article's summary, see services/glossary_linker.py"""
+    __tablename__ = "news_article_terms"
+
+    article_id = Column(UUID(as_uuid=True), ForeignKey("news_articles.id", ondelete="CASCADE"), primary_key=True)
+    # glossary.id, the glossary table lives in a separate declarative base
+    term_id = Column(UUID(as_uuid=True), primary_key=True)
+    mentions = Column(Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        Index("ix_news_article_terms_term_id", "term_id"),
+    )
+
+class NewsFeed(Base):
+    """Polling state of one RSS feed, see services/feed_poller.py"""
+    __tablename__ = "news_feeds"
+
+    url = Column(Text, primary_key=True)
+    # Validators of the last 200 response, sent back as If-None-Match / If-Modified-Since
+    etag = Column(Text, nullable=True)
+    last_modified = Column(Text, nullable=True)
+    # Newest published_at emitted so far, older entries are skipped
+    high_water = Column(TIMESTAMP, nullable=True)
+    poll_interval = Column(Float, nullable=False)
+    next_poll_at = Column(TIMESTAMP, nullable=False)
+    last_polled_at = Column(TIMESTAMP, nullable=True)
+    last_status = Column(Integer, nullable=True)
+    failures = Column(Integer, nullable=False, default=0)
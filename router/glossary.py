@@ -1,16 +1,49 @@
-from fastapi import APIRouter
-from services.rag_service import retrieve_glossary_rag
+import os
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db
+from services.rag_service import retrieve_glossary_rag_async, retrieve_glossary_rag_batch_async
 from core.logger import logger
+from services.embedding_cache import embedding_cache
+from services.result_cache import result_cache
+
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", 500))
 
 router = APIRouter()
 
+class BatchSearchRequest(BaseModel):
+    queries: list[str] = Field(..., min_length=1, max_length=SEARCH_BATCH_MAX_QUERIES)
+    top_k: int = Field(5, ge=1, le=100)
+
 @router.get("/search")
-def search_glossary(query: str, top_k: int = 5):
+async def search_glossary(query: str, top_k: int = 5, db: AsyncSession = Depends(get_async_db)):
     logger.info(f"Received search query: {query}, top_k: {top_k}")
 
-    results = retrieve_glossary_rag(query, top_k)
+    results = await retrieve_glossary_rag_async(query, db, top_k)
 
     if results:
         return {"query": query, "results": results}
     else:
-        return {"query": query, "results": [], "message": "No matches found."}
\ No newline at end of file
+        return {"query": query, "results": [], "message": "No matches found."}
+
+@router.post("/search/batch")
+async def search_glossary_batch(request: BatchSearchRequest, db: AsyncSession = Depends(get_async_db)):
+    logger.info(f"Received batch search of {len(request.queries)} queries, top_k: {request.top_k}")
+
+    batch_results = await retrieve_glossary_rag_batch_async(request.queries, db, request.top_k)
+
+    return {
+        "results": [
+            {"query": query, "results": results}
+            for query, results in zip(request.queries, batch_results)
+        ]
+    }
+
+@router.get("/cache/stats")
+def embedding_cache_stats():
+    return embedding_cache.stats()
+
+@router.get("/cache/results/stats")
+def result_cache_stats():
+    return result_cache.stats()
@@ -0,0 +1,55 @@
+from datetime import date, datetime
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db
+from core.logger import logger
+from services.news_query_service import (
+    NEWS_PAGE_MAX_SIZE, NEWS_PAGE_SIZE, export_articles_ndjson, list_articles, sentiment_rollups,
+)
+
+router = APIRouter()
+
+Sentiment = Literal["positive", "neutral", "negative"]
+
+@router.get("")
+async def get_news(
+    limit: int = Query(NEWS_PAGE_SIZE, ge=1, le=NEWS_PAGE_MAX_SIZE),
+    cursor: str | None = None,
+    source: str | None = None,
+    sentiment: Sentiment | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Newest articles first, pass `next_cursor` back as `cursor` for the next page."""
+    try:
+        return await list_articles(db, limit, cursor, source=source, sentiment=sentiment, since=since, until=until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/export")
+async def export_news(
+    source: str | None = None,
+    sentiment: Sentiment | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+):
+    """Every matching article as newline-delimited JSON, streamed."""
+    logger.info(f"NDJSON export requested: source={source}, sentiment={sentiment}, since={since}, until={until}")
+    return StreamingResponse(
+        export_articles_ndjson(source=source, sentiment=sentiment, since=since, until=until),
+        media_type="application/x-ndjson",
+    )
+
+@router.get("/sentiment/daily")
+async def get_daily_sentiment(
+    since: date | None = None,
+    until: date | None = None,
+    source: str | None = None,
+    by_source: bool = True,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Precomputed per-day (and per-source) sentiment counts."""
+    return {"rollups": await sentiment_rollups(db, since, until, source, by_source)}
@@ -0,0 +1,226 @@
+import argparse
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from core.logger import logger
+from core.metrics import external_call
+
+# Common article container selectors, tried in order before falling back to all paragraphs
+ARTICLE_SELECTORS = ['article', '.article-body', '.article-content', '#article-body']
+
+# Static extraction shorter than this is treated as a JS-rendered page
+MIN_STATIC_CONTENT_CHARS = int(os.getenv("MIN_STATIC_CONTENT_CHARS", 200))
+FETCH_TIMEOUT = float(os.getenv("ARTICLE_FETCH_TIMEOUT", 10))
+# Headless browsers kept alive for JS rendering, each one is recycled after BROWSER_MAX_RENDERS pages
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", 2))
+BROWSER_MAX_RENDERS = int(os.getenv("BROWSER_MAX_RENDERS", 50))
+RENDER_TIMEOUT = 20
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0 Safari/537.36"
+
+http_session = requests.Session()
+http_session.headers.update({"User-Agent": USER_AGENT})
+http_session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+http_session.mount("http://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
+
+def parse_article_html(html: str) -> str:
+    """Extracts the article text from raw HTML using the container selectors, then paragraphs."""
+    soup = BeautifulSoup(html, "lxml")
+    for selector in ARTICLE_SELECTORS:
+        container = soup.select_one(selector)
+        if container:
+            text = container.get_text(" ", strip=True)
+            if text:
+                return text
+    return " ".join(p.get_text(" ", strip=True) for p in soup.find_all('p'))
+
+
+def fetch_static(url: str) -> str:
+    """Tier 1: plain HTTP GET + lxml parsing, no JavaScript."""
+    response = http_session.get(url, timeout=FETCH_TIMEOUT)
+    if response.status_code != 200:
+        logger.warning(f"Static fetch of {url} returned {response.status_code}")
+        return ""
+    return parse_article_html(response.text)
+
+
+class BrowserPool:
+    """
+    Long-lived pool of headless browsers for JS rendering:
+    - Each pool thread owns one `HTMLSession` (one Chromium) and its own event loop
+    - At most `size` pages render at a time, further requests wait for a free browser
+    - A browser is restarted after `max_renders` pages to cap memory growth
+    """
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE, max_renders: int = BROWSER_MAX_RENDERS):
+        self.size = size
+        self.max_renders = max_renders
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _init_thread(self):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self._local.session = None
+        self._local.renders = 0
+
+    def _session(self):
+        # Imported lazily, pulls in pyppeteer
+        from requests_html import HTMLSession
+
+        if self._local.session is not None and self._local.renders >= self.max_renders:
+            logger.info("Recycling headless browser")
+            self._close_session(self._local.session)
+            self._local.session = None
+
+        if self._local.session is None:
+            self._local.session = HTMLSession()
+            self._launch_browser(self._local.session)
+            self._local.renders = 0
+            with self._lock:
+                self._sessions.append(self._local.session)
+        return self._local.session
+
+    @staticmethod
+    def _launch_browser(session):
+        """
+        Starts the session's Chromium on this thread's loop. `HTMLSession` would launch it with pyppeteer's
+        default signal handlers, which can only be installed from the main thread, renders run on pool threads.
+        """
+        import pyppeteer
+
+        session.loop = asyncio.get_event_loop()
+        session._browser = session.loop.run_until_complete(pyppeteer.launch(
+            ignoreHTTPSErrors=not session.verify,
+            headless=True,
+            args=["--no-sandbox"],
+            handleSIGINT=False,
+            handleSIGTERM=False,
+            handleSIGHUP=False
+        ))
+
+    def _close_session(self, session):
+        try:
+            session.close()
+        except Exception as e:
+            logger.error(f"Failed to close headless browser: {str(e)}")
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+
+    def _render(self, url: str) -> str:
+        session = self._session()
+        response = session.get(url, timeout=FETCH_TIMEOUT)
+        response.html.render(timeout=RENDER_TIMEOUT)
+        self._local.renders += 1
+        return response.html.html
+
+    def render(self, url: str) -> str:
+        """Returns the HTML of `url` after JavaScript ran, blocking until a browser is free."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.size,
+                    thread_name_prefix="browser",
+                    initializer=self._init_thread
+                )
+            executor = self._executor
+        return executor.submit(self._render, url).result()
+
+    def close(self):
+        """Shuts the browsers down, the pool starts new ones on the next render."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            sessions = list(self._sessions)
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for session in sessions:
+            self._close_session(session)
+
+
+browser_pool = BrowserPool()
+
+
+def extract_content(url: str) -> str:
+    """
+    Tiered extraction:
+    - Plain HTTP fetch parsed with lxml
+    - Headless browser render through the shared pool, only if the static page had no article text
+    """
+    content = ""
+    try:
+        with external_call("http", "article"):
+            content = fetch_static(url)
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"Static fetch of {url} failed: {str(e)}")
+
+    if len(content.strip()) >= MIN_STATIC_CONTENT_CHARS:
+        logger.debug("Extracted %s without rendering", url)
+        return content
+
+    logger.info(f"Static extraction of {url} came up short, rendering it")
+    with external_call("browser", "render"):
+        html = browser_pool.render(url)
+    return parse_article_html(html)
+
+
+def check_render() -> bool:
+    """
+    Renders a local page whose article text is only written by JavaScript, from a worker thread like
+    the news pipeline's extract stage does, and checks the text came through.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    expected = "Rendered by JavaScript " * 20
+    page = (
+        "<html><body><article id='body'></article><script>"
+        f"document.getElementById('body').textContent = {expected!r};"
+        "</script></body></html>"
+    ).encode("utf-8")
+
+    class PageHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    try:
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="extract") as executor:
+            text = executor.submit(lambda: parse_article_html(browser_pool.render(url))).result()
+    except Exception as e:
+        logger.error(f"Render check failed: {str(e)}")
+        return False
+    finally:
+        server.shutdown()
+        browser_pool.close()
+    if text.strip() != expected.strip():
+        logger.error(f"Render check failed: got {text[:80]!r}")
+        return False
+    logger.info("Render check passed: JavaScript page rendered from a worker thread")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Article extraction")
+    parser.add_argument("--check-render", action="store_true", help="render a local JS page from a worker thread")
+    parser.add_argument("url", nargs="?", help="extract and print the text of this article")
+    args = parser.parse_args()
+    if args.check_render:
+        raise SystemExit(0 if check_render() else 1)
+    if args.url:
+        print(extract_content(args.url))
+    else:
+        parser.print_help()
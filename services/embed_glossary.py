@@ -1,37 +1,299 @@
-from core.database import get_db
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+import numpy as np
+from sqlalchemy import bindparam, or_, update
+from sqlalchemy.orm import Session
+from core.database import db_session
 from core.logger import logger
 from models.glossary import GlossaryTerm
-from services.embedding_service import store_embeddings_pinecone
+from services.embedding_service import generate_embeddings, glossary_content_hash, glossary_text
+from services.result_cache import result_cache
+from services.term_vector_store import term_vector_store
+from services.vector_index import LocalVectorIndex, get_vector_index
 
-def embed_and_store_glossary(limit: int = None, offset: int = None, include_ids: list = []):
+# Pinecone caps the number of ids per fetch request
+FETCH_BATCH_SIZE = 100
+# Terms read, embedded and committed together, a crash loses at most one chunk of work
+EMBED_CHUNK_SIZE = int(os.getenv("EMBED_CHUNK_SIZE", 500))
+# Vectors per index upsert request, keeps Pinecone requests under its 2MB limit
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", 100))
+# Last committed term id of an interrupted run
+EMBED_CHECKPOINT_FILE = os.getenv("EMBED_CHECKPOINT_FILE", "cache/embed_glossary_checkpoint.json")
+
+def load_checkpoint():
+    try:
+        with open(EMBED_CHECKPOINT_FILE) as f:
+            return uuid.UUID(json.load(f)["last_id"])
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Ignoring unreadable embedding checkpoint {EMBED_CHECKPOINT_FILE}: {str(e)}")
+        return None
+
+def save_checkpoint(last_id):
+    os.makedirs(os.path.dirname(EMBED_CHECKPOINT_FILE) or ".", exist_ok=True)
+    tmp_path = f"{EMBED_CHECKPOINT_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"last_id": str(last_id)}, f)
+    os.replace(tmp_path, EMBED_CHECKPOINT_FILE)
+
+def clear_checkpoint():
+    if os.path.exists(EMBED_CHECKPOINT_FILE):
+        os.remove(EMBED_CHECKPOINT_FILE)
+
+def upsert_vectors(term_ids: list, vectors: np.ndarray):
+    """Writes vectors to the vector index, UPSERT_BATCH_SIZE per request."""
+    index = get_vector_index()
+    for start in range(0, len(term_ids), UPSERT_BATCH_SIZE):
+        batch_ids = term_ids[start:start + UPSERT_BATCH_SIZE]
+        index.upsert(list(zip(batch_ids, vectors[start:start + UPSERT_BATCH_SIZE].tolist())))
+
+def embed_terms(terms: list) -> list:
+    """
+    Embeds `(id, term, definition, simplified_explanation, updated_at)` rows and stores the vectors,
+    returns the rows that were stored.
+    """
+    texts = [glossary_text(term, definition, simplified_explanation) for _, term, definition, simplified_explanation, _ in terms]
+    # Glossary documents are embedded once per change, keep them out of the query cache
+    vectors = generate_embeddings(texts, use_cache=False)
+    if len(vectors) != len(terms):
+        logger.error(f"Embedding failed for a chunk of {len(terms)} terms")
+        return []
+
+    term_ids = [str(row[0]) for row in terms]
+    try:
+        upsert_vectors(term_ids, vectors)
+    except Exception as e:
+        logger.error(f"Vector upsert failed for a chunk of {len(terms)} terms: {str(e)}")
+        return []
+
+    # Keep the local vector store in step with Pinecone so reranking never re-embeds,
+    # the local index already persisted its upserts there
+    if not isinstance(get_vector_index(), LocalVectorIndex):
+        term_vector_store.append(term_ids, vectors, [row[-1] for row in terms])
+    return terms
+
+_mark_embedded_statement = update(GlossaryTerm.__table__) \
+    .where(GlossaryTerm.id == bindparam("b_id"), GlossaryTerm.updated_at == bindparam("b_updated_at")) \
+    .values(
+        embedded=True,
+        content_hash=bindparam("b_content_hash"),
+        embedded_at=bindparam("b_embedded_at"),
+        # Keep updated_at as is, the stored vectors are tagged with it
+        updated_at=bindparam("b_updated_at"),
+    )
+
+def mark_embedded(db, terms: list):
     """
-    Batch process: Embed all glossary terms and store them in Pinecone.
+    Records the content hash and embedding time of the embedded rows in one executemany.
+    Rows edited since they were read don't match `updated_at` and stay pending for the next sync.
     """
+    embedded_at = datetime.utcnow()
+    db.execute(_mark_embedded_statement, [
+        {
+            "b_id": term_id,
+            "b_updated_at": updated_at,
+            "b_content_hash": glossary_content_hash(term, definition, simplified_explanation),
+            "b_embedded_at": embedded_at,
+        }
+        for term_id, term, definition, simplified_explanation, updated_at in terms
+    ])
+    db.commit()
+
+def embed_and_store_glossary(limit: int = None, include_ids: list = None, chunk_size: int = EMBED_CHUNK_SIZE,
+                             resume: bool = True, db: Session = None, include_embedded: bool = False):
+    """
+    Batch process: Embed all un-embedded glossary terms and store them in the vector index.
+    - Streams terms in keyset-paginated chunks of `chunk_size` (ordered by id), never the whole table
+    - One OpenAI request per EMBEDDING_BATCH_SIZE texts, one upsert per UPSERT_BATCH_SIZE vectors
+    - Each chunk is flagged `embedded` and committed before the next one is read, and the last id is
+      checkpointed so an interrupted run resumes after it (`resume=False` starts over)
+    - `include_ids` re-embeds the given terms even if they are already embedded, `include_embedded` all of them
+    - `limit` caps the number of terms processed by this run
+    """
+    if db is None:
+        with db_session() as db:
+            return embed_and_store_glossary(limit, include_ids, chunk_size, resume, db, include_embedded)
+
     logger.info(f"Starting glossary embedding process...")
 
-    db = next(get_db())
-    if limit and offset:
-        glossary_terms = db.query(GlossaryTerm).limit(limit).offset(offset).all()
-    else:
-        glossary_terms = db.query(GlossaryTerm).filter(GlossaryTerm.embedded == False).all()
-    
-    if len(include_ids) > 0:
-        extra_terms = db.query(GlossaryTerm).filter(GlossaryTerm.id.in_(include_ids)).all()
-        glossary_terms.extend(extra_terms)
-
-    logger.info(f"Fetched {len(glossary_terms)} terms from DB")
-
-    embedded_ids = []
-    for term in glossary_terms:
-        logger.info(f"Processing term: {term}")
-        combined_text = f"{term.term} - {term.definition} - {term.simplified_explanation}"
-        store_embeddings_pinecone(str(term.id), combined_text)
-        embedded_ids.append(term.id)
-    
-    logger.info("Glossary batch embedding process completed")
-    db.query(GlossaryTerm).filter(GlossaryTerm.id.in_(embedded_ids)).update({GlossaryTerm.embedded: True}, synchronize_session='fetch')
-    db.commit() 
-    logger.info("Updated embedding status in DB")
+    columns = (GlossaryTerm.id, GlossaryTerm.term, GlossaryTerm.definition, GlossaryTerm.simplified_explanation, GlossaryTerm.updated_at)
+    started = time.perf_counter()
+    processed = 0
+    embedded = 0
+
+    def process(terms):
+        nonlocal processed, embedded
+        embedded_terms = embed_terms(terms)
+        if embedded_terms:
+            mark_embedded(db, embedded_terms)
+        processed += len(terms)
+        embedded += len(embedded_terms)
+        rate = processed / (time.perf_counter() - started)
+        logger.info(f"Embedded {embedded}/{processed} terms ({rate:.1f} terms/sec)")
+
+    if include_ids:
+        include_ids = [uuid.UUID(str(term_id)) for term_id in include_ids]
+        for start in range(0, len(include_ids), chunk_size):
+            terms = db.query(*columns).filter(GlossaryTerm.id.in_(include_ids[start:start + chunk_size])).all()
+            if terms:
+                process(terms)
+
+    last_id = load_checkpoint() if resume else None
+    if last_id is not None:
+        logger.info(f"Resuming glossary embedding after term {last_id}")
+
+    while limit is None or processed < limit:
+        query = db.query(*columns).filter(GlossaryTerm.deleted_at == None)
+        if not include_embedded:
+            query = query.filter(GlossaryTerm.embedded == False)
+        if last_id is not None:
+            query = query.filter(GlossaryTerm.id > last_id)
+        size = chunk_size if limit is None else min(chunk_size, limit - processed)
+        terms = query.order_by(GlossaryTerm.id).limit(size).all()
+        if not terms:
+            clear_checkpoint()
+            break
+
+        process(terms)
+        last_id = terms[-1][0]
+        save_checkpoint(last_id)
+
+    if embedded:
+        result_cache.invalidate()
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Glossary batch embedding process completed: {embedded} of {processed} terms embedded "
+        f"in {elapsed:.1f}s ({processed / elapsed if elapsed else 0.0:.1f} terms/sec)"
+    )
+
+def delete_term_vectors(term_ids: list):
+    """Removes vectors from the vector index and the local term vector store."""
+    index = get_vector_index()
+    for start in range(0, len(term_ids), FETCH_BATCH_SIZE):
+        index.delete([str(term_id) for term_id in term_ids[start:start + FETCH_BATCH_SIZE]])
+    if not isinstance(index, LocalVectorIndex):
+        term_vector_store.remove([str(term_id) for term_id in term_ids])
+
+def sync_glossary_embeddings(chunk_size: int = EMBED_CHUNK_SIZE, db: Session = None):
+    """
+    Incremental sync, work is proportional to the rows changed since the last run:
+    - Only looks at live rows never embedded or updated after `embedded_at`
+    - Re-embeds those whose content hash changed, rows with an unchanged hash (e.g. only
+      contextual_examples edited) just get `embedded_at` and their local vector's `updated_at` bumped
+    - Deletes the vectors of soft-deleted rows that are still flagged `embedded`
+    """
+    if db is None:
+        with db_session() as db:
+            return sync_glossary_embeddings(chunk_size, db)
+
+    logger.info("Starting incremental glossary embedding sync...")
+
+    started = time.perf_counter()
+    columns = (GlossaryTerm.id, GlossaryTerm.term, GlossaryTerm.definition, GlossaryTerm.simplified_explanation, GlossaryTerm.updated_at)
+    pending = db.query(*columns, GlossaryTerm.content_hash, GlossaryTerm.embedded).filter(
+        GlossaryTerm.deleted_at == None,
+        or_(GlossaryTerm.embedded == False, GlossaryTerm.embedded_at == None, GlossaryTerm.updated_at > GlossaryTerm.embedded_at)
+    )
+
+    checked = 0
+    reembedded = 0
+    last_id = None
+    while True:
+        query = pending if last_id is None else pending.filter(GlossaryTerm.id > last_id)
+        rows = query.order_by(GlossaryTerm.id).limit(chunk_size).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        checked += len(rows)
+
+        changed, unchanged = [], []
+        for row in rows:
+            term_id, term, definition, simplified_explanation, updated_at, stored_hash, embedded = row
+            current = (term_id, term, definition, simplified_explanation, updated_at)
+            if embedded and stored_hash == glossary_content_hash(term, definition, simplified_explanation):
+                unchanged.append(current)
+            else:
+                changed.append(current)
+
+        embedded_terms = embed_terms(changed) if changed else []
+        reembedded += len(embedded_terms)
+        if unchanged:
+            # Same vector, newer updated_at: without it the local copy reads as stale to searches
+            term_vector_store.touch([row[0] for row in unchanged], [row[4] for row in unchanged])
+        if embedded_terms or unchanged:
+            mark_embedded(db, embedded_terms + unchanged)
+
+    deleted_ids = [term_id for (term_id,) in db.query(GlossaryTerm.id).filter(GlossaryTerm.deleted_at != None, GlossaryTerm.embedded == True)]
+    for start in range(0, len(deleted_ids), chunk_size):
+        batch = deleted_ids[start:start + chunk_size]
+        try:
+            delete_term_vectors(batch)
+        except Exception as e:
+            logger.error(f"Failed to delete vectors of {len(batch)} deleted terms: {str(e)}")
+            continue
+        db.query(GlossaryTerm).filter(GlossaryTerm.id.in_(batch)).update({
+            GlossaryTerm.embedded: False,
+            GlossaryTerm.content_hash: None,
+            GlossaryTerm.embedded_at: None,
+            GlossaryTerm.updated_at: GlossaryTerm.updated_at,
+        }, synchronize_session=False)
+        db.commit()
+
+    if reembedded or deleted_ids:
+        result_cache.invalidate()
+    logger.info(
+        f"Glossary embedding sync completed in {time.perf_counter() - started:.1f}s: {checked} changed rows checked, "
+        f"{reembedded} re-embedded, {len(deleted_ids)} deleted"
+    )
+
+def sync_term_vector_store(db: Session = None):
+    """
+    Reconciles the local term vector store with the glossary table:
+    - Pulls vectors from the vector index for embedded terms that are missing or older than `updated_at`
+    - Drops vectors of deleted or un-embedded terms
+    """
+    if db is None:
+        with db_session() as db:
+            return sync_term_vector_store(db)
+
+    logger.info("Syncing term vector store with glossary...")
+
+    embedded_terms = db.query(GlossaryTerm.id, GlossaryTerm.updated_at) \
+        .filter(GlossaryTerm.embedded == True, GlossaryTerm.deleted_at == None).all()
+
+    term_ids = [str(term_id) for term_id, _ in embedded_terms]
+    updated_ats = [updated_at for _, updated_at in embedded_terms]
+    _, found = term_vector_store.lookup(term_ids, updated_ats)
+    missing = [(term_ids[i], updated_ats[i]) for i in np.flatnonzero(~found)]
+    logger.info(f"{len(missing)} of {len(term_ids)} embedded terms missing from the term vector store")
+
+    for start in range(0, len(missing), FETCH_BATCH_SIZE):
+        batch = dict(missing[start:start + FETCH_BATCH_SIZE])
+        fetched = get_vector_index().fetch(list(batch.keys()))
+        fetched_ids = [term_id for term_id in batch if term_id in fetched]
+        if fetched_ids:
+            vectors = np.array([fetched[term_id] for term_id in fetched_ids], dtype=np.float32)
+            term_vector_store.append(fetched_ids, vectors, [batch[term_id] for term_id in fetched_ids])
+
+    stale_ids = set(term_vector_store.ids()) - set(term_ids)
+    if stale_ids:
+        term_vector_store.remove(list(stale_ids))
+    term_vector_store.compact()
+    logger.info("Term vector store sync completed")
 
 if __name__ == "__main__":
-    embed_and_store_glossary()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Embed glossary terms into the vector index")
+    parser.add_argument("--sync", action="store_true", help="re-embed changed terms and drop vectors of deleted ones")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of an interrupted run")
+    parser.add_argument("--all", action="store_true", help="re-embed and re-upsert every term, already embedded ones included")
+    args = parser.parse_args()
+
+    if args.sync:
+        sync_glossary_embeddings()
+    else:
+        embed_and_store_glossary(resume=not args.restart, include_embedded=args.all)
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from core.logger import logger
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", 24 * 60 * 60))
+# SQLite file for the on-disk tier, the tier is disabled when unset
+EMBEDDING_CACHE_DB = os.getenv("EMBEDDING_CACHE_DB")
+EMBEDDING_CACHE_DB_TTL = float(os.getenv("EMBEDDING_CACHE_DB_TTL", 30 * 24 * 60 * 60))
+
+
+def normalize_text(text: str) -> str:
+    """Casefold and collapse whitespace so trivially different queries share a cache entry."""
+    return " ".join(text.casefold().split())
+
+
+def cache_key(text: str, model: str) -> str:
+    """Content-addressed key on (model, normalized text)."""
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two tier embedding cache:
+    - In-process LRU bounded by `max_size` entries, entries expire after `ttl` seconds
+    - Optional SQLite tier (`db_path`) that survives restarts and is shared by workers on the same host
+    """
+
+    def __init__(self, max_size: int = EMBEDDING_CACHE_SIZE, ttl: float = EMBEDDING_CACHE_TTL,
+                 db_path: str = EMBEDDING_CACHE_DB, db_ttl: float = EMBEDDING_CACHE_DB_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.db_ttl = db_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = None
+
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+                )
+                logger.info(f"Embedding cache disk tier enabled at {db_path}")
+            except sqlite3.Error as e:
+                logger.error(f"Failed to open embedding cache db {db_path}: {str(e)}")
+                self._db = None
+
+    def _get_memory(self, key: str, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        vector, created_at = entry
+        if now - created_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return vector
+
+    def _put_memory(self, key: str, vector: np.ndarray, now: float):
+        self._entries[key] = (vector, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _get_disk(self, keys: list, now: float) -> dict:
+        if self._db is None or not keys:
+            return {}
+        vectors = {}
+        try:
+            # Stay under SQLite's bound parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders}) AND created_at >= ?",
+                    (*batch, now - self.db_ttl)
+                ).fetchall()
+                vectors.update({key: np.frombuffer(vector, dtype=np.float32) for key, vector in rows})
+        except sqlite3.Error as e:
+            logger.error(f"Embedding cache disk read failed: {str(e)}")
+        return vectors
+
+    def _put_disk(self, items: list, now: float):
+        if self._db is None or not items:
+            return
+        try:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                [(key, vector.tobytes(), now) for key, vector in items]
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Embedding cache disk write failed: {str(e)}")
+
+    def get_many(self, texts: list, model: str) -> list:
+        """Returns a list aligned with `texts` holding a float32 vector or None per text."""
+        now = time.time()
+        keys = [cache_key(text, model) for text in texts]
+        vectors = [None] * len(texts)
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vectors[i] = self._get_memory(key, now)
+
+            pending = [i for i, vector in enumerate(vectors) if vector is None]
+            self.hits += len(texts) - len(pending)
+
+            disk_vectors = self._get_disk(list({keys[i] for i in pending}), now)
+            for i in pending:
+                vector = disk_vectors.get(keys[i])
+                if vector is None:
+                    self.misses += 1
+                    continue
+                vectors[i] = vector
+                self.disk_hits += 1
+                self._put_memory(keys[i], vector, now)
+
+        return vectors
+
+    def get(self, text: str, model: str):
+        return self.get_many([text], model)[0]
+
+    def put_many(self, texts: list, vectors, model: str):
+        now = time.time()
+        items = [
+            (cache_key(text, model), np.asarray(vector, dtype=np.float32))
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            for key, vector in items:
+                self._put_memory(key, vector, now)
+            self._put_disk(items, now)
+
+    def put(self, text: str, vector, model: str):
+        self.put_many([text], [vector], model)
+
+    async def get_async(self, text: str, model: str):
+        """`get` for the event loop, the SQLite tier is read in a worker thread."""
+        if self._db is None:
+            return self.get(text, model)
+        key = cache_key(text, model)
+        with self._lock:
+            vector = self._get_memory(key, time.time())
+            if vector is not None:
+                self.hits += 1
+                return vector
+        return await asyncio.to_thread(self.get, text, model)
+
+    async def put_async(self, text: str, vector, model: str):
+        """`put` for the event loop, the SQLite tier is written in a worker thread."""
+        if self._db is None:
+            self.put(text, vector, model)
+        else:
+            await asyncio.to_thread(self.put, text, vector, model)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "disk_tier": self._db is not None,
+            }
+
+
+embedding_cache = EmbeddingCache()
@@ -1,36 +1,154 @@
-import openai
+import hashlib
 import os
+import threading
+import numpy as np
 from core.logger import logger
-from core.pinecone_client import get_glossary_index
+from core.metrics import external_call
+from services.embedding_cache import embedding_cache
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai.api_key = OPENAI_API_KEY
 
-index = get_glossary_index()
+EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_DIM = 1536
+# OpenAI accepts up to 2048 inputs per embeddings request
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 512))
+
+def glossary_text(term: str, definition: str, simplified_explanation: str) -> str:
+    """Text that gets embedded for a glossary term."""
+    return f"{term} - {definition} - {simplified_explanation}"
+
+def glossary_content_hash(term: str, definition: str, simplified_explanation: str) -> str:
+    """sha256 of `glossary_text`, changes exactly when the term needs a new embedding."""
+    return hashlib.sha256(glossary_text(term, definition, simplified_explanation).encode("utf-8")).hexdigest()
+
+def generate_embedding(text: str, use_cache: bool = True) -> list:
+    if use_cache:
+        cached = embedding_cache.get(text, EMBEDDING_MODEL)
+        if cached is not None:
+            logger.debug("Embedding cache hit for text: %s...", text[:50])
+            return cached.tolist()
+
+    try:
+        logger.debug("Generating embedding for text: %s...", text[:50])
+        with external_call("openai", "embeddings"):
+            response = get_openai_client().embeddings.create(
+                input=[text],
+                model=EMBEDDING_MODEL
+            )
+        embeddings = response.data[0].embedding
+        logger.info(f"Embeddings generated: {len(embeddings)} dimensions")
+        if use_cache:
+            embedding_cache.put(text, embeddings, EMBEDDING_MODEL)
+        return embeddings
+    except Exception as e:
+        logger.error(f"Failed to generate embeddings: {str(e)}")
+        return []
+
+# The openai package takes a few hundred ms to import, clients are created on first use
+_openai_client = None
+_async_openai_client = None
+_openai_client_lock = threading.Lock()
+
+def get_openai_client():
+    global _openai_client
+    if _openai_client is None:
+        with _openai_client_lock:
+            if _openai_client is None:
+                from openai import OpenAI
+                _openai_client = OpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
+
+def get_async_openai_client():
+    global _async_openai_client
+    if _async_openai_client is None:
+        with _openai_client_lock:
+            if _async_openai_client is None:
+                from openai import AsyncOpenAI
+                _async_openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return _async_openai_client
+
+async def generate_embedding_async(text: str, use_cache: bool = True) -> list:
+    """Non-blocking `generate_embedding` for the async search path."""
+    if use_cache:
+        cached = await embedding_cache.get_async(text, EMBEDDING_MODEL)
+        if cached is not None:
+            logger.debug("Embedding cache hit for text: %s...", text[:50])
+            return cached.tolist()
 
-def generate_embedding(text: str) -> list:
     try:
-        logger.info(f"Generating embedding for text: {text[:50]}...")
-        response = openai.embeddings.create(
-            input=[text],
-            model="text-embedding-ada-002"
-        )
+        logger.debug("Generating embedding for text: %s...", text[:50])
+        with external_call("openai", "embeddings"):
+            response = await get_async_openai_client().embeddings.create(
+                input=[text],
+                model=EMBEDDING_MODEL
+            )
         embeddings = response.data[0].embedding
         logger.info(f"Embeddings generated: {len(embeddings)} dimensions")
+        if use_cache:
+            await embedding_cache.put_async(text, embeddings, EMBEDDING_MODEL)
         return embeddings
     except Exception as e:
         logger.error(f"Failed to generate embeddings: {str(e)}")
         return []
 
+def generate_embeddings(texts: list, batch_size: int = EMBEDDING_BATCH_SIZE, use_cache: bool = True) -> np.ndarray:
+    """
+    Batch embedding:
+    - Serves cached texts from the embedding cache, only misses go to OpenAI
+    - Sends up to `batch_size` texts per OpenAI request
+    - Returns a float32 matrix of shape (len(texts), EMBEDDING_DIM), rows in input order
+    - Returns an empty (0, EMBEDDING_DIM) matrix on failure
+    """
+    if not texts:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
+    try:
+        matrix = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        pending = list(range(len(texts)))
+        if use_cache:
+            cached = embedding_cache.get_many(texts, EMBEDDING_MODEL)
+            pending = [i for i, vector in enumerate(cached) if vector is None]
+            for i, vector in enumerate(cached):
+                if vector is not None:
+                    matrix[i] = vector
+
+        logger.info(f"Generating embeddings for {len(pending)} of {len(texts)} texts in batches of {batch_size}...")
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            with external_call("openai", "embeddings"):
+                response = get_openai_client().embeddings.create(
+                    input=[texts[i] for i in batch],
+                    model=EMBEDDING_MODEL
+                )
+            # Response items carry their input position, don't rely on ordering
+            for item in response.data:
+                matrix[batch[item.index]] = item.embedding
+            if use_cache:
+                embedding_cache.put_many([texts[i] for i in batch], matrix[batch], EMBEDDING_MODEL)
+        logger.info(f"Embeddings generated: {matrix.shape}")
+        return matrix
+    except Exception as e:
+        logger.error(f"Failed to generate batch embeddings: {str(e)}")
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
 def store_embeddings_pinecone(id: str, text: str):
+    """
+    Embeds `text` and upserts it under `id`. Returns the embedding, or None on failure.
+    """
     try:
-        embeddings = generate_embedding(text)
+        # Glossary documents are embedded once per change, keep them out of the query cache
+        embeddings = generate_embedding(text, use_cache=False)
         if not embeddings:
             logger.error(f"Failed to generate embeddings for {id}")
-            return
+            return None
         
-        logger.info(f"Storing embedding for ID {id} in Pinecone...")
-        index.upsert(vectors=[(id, embeddings)])
+        # Imported here, the vector index depends on the term vector store which depends on this module
+        from services.vector_index import get_vector_index
+
+        logger.info(f"Storing embedding for ID {id} in the vector index...")
+        get_vector_index().upsert([(id, embeddings)])
         logger.info(f"Embedding stored successfully for ID {id}.")
+        return embeddings
     except Exception as e:
-        logger.error(f"Failed to store embedding in Pinecone: {str(e)}")
\ No newline at end of file
+        logger.error(f"Failed to store embedding in the vector index: {str(e)}")
+        return None
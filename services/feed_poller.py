@@ -0,0 +1,183 @@
+import os
+import statistics
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+import feedparser
+import requests
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from core.logger import logger
+from core.metrics import external_call
+from models.news import NewsFeed
+
+DEFAULT_RSS_FEEDS = [
+    # "https://feeds.finance.yahoo.com/rss/2.0/headline?s=^DJI,^GSPC,^IXIC&region=US&lang=en-US",    # Yahoo Finance
+    # "https://www.investing.com/rss/news.rss",                                                      # Investing.com
+    "https://news.google.com/rss/search?q=finance+news&hl=en-US&gl=US&ceid=US:en"                  # Google Finance
+]
+
+# Feeds to poll: a file with one URL per line (# comments allowed), else comma-separated RSS_FEEDS
+RSS_FEEDS_FILE = os.getenv("RSS_FEEDS_FILE")
+FEED_REQUEST_TIMEOUT = float(os.getenv("FEED_REQUEST_TIMEOUT", 15))
+# Entries read per feed response, feeds list the newest first
+FEED_MAX_ENTRIES = int(os.getenv("FEED_MAX_ENTRIES", 100))
+# Poll interval of a new feed and the bounds the adaptive interval stays within, in seconds
+FEED_DEFAULT_INTERVAL = float(os.getenv("FEED_DEFAULT_INTERVAL", 900))
+FEED_MIN_INTERVAL = float(os.getenv("FEED_MIN_INTERVAL", 300))
+FEED_MAX_INTERVAL = float(os.getenv("FEED_MAX_INTERVAL", 21600))
+# Interval growth after a poll without new entries (x2 after a failure)
+FEED_BACKOFF = 1.5
+# State `poll_feed` moves past the entries it returned, only worth saving once they are stored
+FEED_CURSOR_FIELDS = ("etag", "last_modified", "high_water")
+
+
+def load_feed_urls() -> list:
+    if RSS_FEEDS_FILE:
+        with open(RSS_FEEDS_FILE, encoding="utf-8") as f:
+            urls = [line.split("#", 1)[0].strip() for line in f]
+    elif os.getenv("RSS_FEEDS"):
+        urls = [url.strip() for url in os.getenv("RSS_FEEDS").split(",")]
+    else:
+        urls = DEFAULT_RSS_FEEDS
+    return list(dict.fromkeys(url for url in urls if url))
+
+
+RSS_FEEDS = load_feed_urls()
+
+
+def new_feed_state(url: str, now: datetime = None) -> dict:
+    return {
+        "url": url,
+        "etag": None,
+        "last_modified": None,
+        "high_water": None,
+        "poll_interval": FEED_DEFAULT_INTERVAL,
+        "next_poll_at": now or datetime.utcnow(),
+        "last_polled_at": None,
+        "last_status": None,
+        "failures": 0,
+    }
+
+
+def next_poll_interval(interval: float, published_times: list) -> float:
+    """
+    Adapts a feed's poll interval to how often it publishes:
+    - Two or more new entries: the median gap between them, the feed's current cadence
+    - One new entry: unchanged
+    - Nothing new: backs off by FEED_BACKOFF
+    Clamped to [FEED_MIN_INTERVAL, FEED_MAX_INTERVAL].
+    """
+    if len(published_times) >= 2:
+        times = sorted(published_times)
+        interval = statistics.median((b - a).total_seconds() for a, b in zip(times, times[1:]))
+    elif not published_times:
+        interval *= FEED_BACKOFF
+    return min(FEED_MAX_INTERVAL, max(FEED_MIN_INTERVAL, interval))
+
+
+def _schedule(feed: dict, interval: float, now: datetime):
+    feed['poll_interval'] = interval
+    feed['next_poll_at'] = now + timedelta(seconds=interval)
+
+
+def poll_feed(feed: dict) -> list:
+    """
+    Fetches one feed and returns its entries at or after the feed's high-water mark, updating `feed` in place:
+    - Conditional GET with the stored ETag / Last-Modified, an unchanged feed costs a 304 and no parsing
+    - Entries published at the high-water mark itself are emitted again, URL dedup drops the ones already stored
+    - Schedules the next poll with `next_poll_interval`, failures back off twice as fast
+    """
+    now = datetime.utcnow()
+    feed['last_polled_at'] = now
+    headers = {}
+    if feed['etag']:
+        headers["If-None-Match"] = feed['etag']
+    if feed['last_modified']:
+        headers["If-Modified-Since"] = feed['last_modified']
+
+    try:
+        with external_call("http", "feed"):
+            response = requests.get(feed['url'], headers=headers, timeout=FEED_REQUEST_TIMEOUT)
+        feed['last_status'] = response.status_code
+        if response.status_code == 304:
+            _schedule(feed, next_poll_interval(feed['poll_interval'], []), now)
+            logger.info(f"Feed not modified: {feed['url']}, next poll in {feed['poll_interval']:.0f}s")
+            return []
+        response.raise_for_status()
+        parsed = feedparser.parse(response.content)
+    except Exception as e:
+        feed['failures'] += 1
+        _schedule(feed, min(FEED_MAX_INTERVAL, max(FEED_MIN_INTERVAL, feed['poll_interval'] * 2)), now)
+        logger.error(f"Error polling the feed {feed['url']} ({feed['failures']} failures in a row): {str(e)}")
+        return []
+
+    feed['failures'] = 0
+    feed['etag'] = response.headers.get("ETag")
+    feed['last_modified'] = response.headers.get("Last-Modified")
+
+    high_water = feed['high_water']
+    source = urlparse(feed['url']).netloc
+    articles = []
+    fresh_times = []
+    for entry in parsed.entries[:FEED_MAX_ENTRIES]:
+        if not entry.get("link") or not entry.get("title"):
+            continue
+        published = entry.get("published_parsed") or entry.get("updated_parsed")
+        published_at = datetime(*published[:6]) if published else now
+        if high_water is not None and published_at < high_water:
+            continue
+        articles.append({
+            "title": entry.title,
+            "url": entry.link,
+            "source": source,
+            "published_at": published_at,
+        })
+        if published and (high_water is None or published_at > high_water):
+            fresh_times.append(published_at)
+
+    if fresh_times:
+        feed['high_water'] = max(fresh_times)
+    _schedule(feed, next_poll_interval(feed['poll_interval'], fresh_times), now)
+    logger.info(
+        f"Feed {feed['url']}: {len(fresh_times)} new of {len(parsed.entries)} entries, "
+        f"next poll in {feed['poll_interval']:.0f}s"
+    )
+    return articles
+
+
+def due_feeds(db: Session, urls: list = None, now: datetime = None, force: bool = False) -> list:
+    """
+    Polling state of the configured feeds whose next poll is due (all of them with `force`),
+    registering feeds seen for the first time.
+    """
+    urls = RSS_FEEDS if urls is None else urls
+    now = now or datetime.utcnow()
+    states = {feed.url: feed for feed in db.execute(select(NewsFeed).where(NewsFeed.url.in_(urls))).scalars()}
+
+    missing = [NewsFeed(**new_feed_state(url, now)) for url in urls if url not in states]
+    if missing:
+        db.add_all(missing)
+        db.commit()
+        states.update((feed.url, feed) for feed in missing)
+        logger.info(f"Registered {len(missing)} new feeds")
+
+    columns = [column.name for column in NewsFeed.__table__.columns]
+    feeds = [{column: getattr(states[url], column) for column in columns} for url in urls]
+    due = [feed for feed in feeds if force or feed['next_poll_at'] <= now]
+    logger.info(f"{len(due)} of {len(feeds)} feeds due for polling")
+    return due
+
+
+def save_feeds(db: Session, feeds: list):
+    """Writes back the state `poll_feed` updated, one executemany UPDATE by primary key."""
+    if feeds:
+        db.execute(update(NewsFeed), feeds)
+        db.commit()
+
+
+def seconds_until_next_poll(db: Session, urls: list = None) -> float:
+    urls = RSS_FEEDS if urls is None else urls
+    next_poll_at = db.execute(select(NewsFeed.next_poll_at).where(NewsFeed.url.in_(urls)).order_by(NewsFeed.next_poll_at).limit(1)).scalar()
+    if next_poll_at is None:
+        return 0.0
+    return max(0.0, (next_poll_at - datetime.utcnow()).total_seconds())
@@ -0,0 +1,174 @@
+import argparse
+import os
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from core.database import db_session
+from core.logger import logger
+from models.glossary import GlossaryTerm
+from models.news import NewsArticle, NewsArticleTerm
+from services.lexical_index import TOKEN_PATTERN, get_stemmer
+from utils.aho_corasick import TokenAutomaton
+
+# Articles per committed chunk when backfilling links (python -m services.glossary_linker --backfill)
+LINK_BACKFILL_CHUNK_SIZE = int(os.getenv("LINK_BACKFILL_CHUNK_SIZE", 500))
+# Removed patterns leave dead states behind, rebuild from scratch once they outnumber live ones
+LINK_REBUILD_RATIO = 1.0
+
+
+@lru_cache(maxsize=65536)
+def _stem(token: str) -> str:
+    return get_stemmer().stem(token)
+
+
+def link_tokens(text: str) -> list:
+    """Lowercased, stemmed word tokens, so "Hedge Funds" in a summary matches the term "hedge fund"."""
+    return [_stem(token) for token in TOKEN_PATTERN.findall(text.lower())]
+
+
+class GlossaryMatcher:
+    """
+    Finds glossary terms in free text with one pass of an Aho–Corasick automaton over the text's tokens:
+    - Patterns are the tokenized `GlossaryTerm.term`s, matches are whole words only
+    - `refresh(db)` is cheap when nothing changed (one aggregate query); otherwise it reads only rows
+      updated since the last refresh and patches a copy of the automaton, readers are never blocked
+    - A live-term count that doesn't add up (hard deletes) or too many dead states trigger a full rebuild
+    """
+
+    _version_statement = select(
+        func.count(GlossaryTerm.id).filter(GlossaryTerm.deleted_at == None), func.max(GlossaryTerm.updated_at)
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._automaton = TokenAutomaton()
+        self._patterns = {}
+        self._version = None
+        self._removed = 0
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def _apply(self, automaton: TokenAutomaton, patterns: dict, rows) -> int:
+        removed = 0
+        for term_id, term, deleted_at in rows:
+            old_tokens = patterns.pop(term_id, None)
+            if old_tokens is not None:
+                automaton.remove(old_tokens, term_id)
+                removed += 1
+            tokens = tuple(link_tokens(term)) if deleted_at is None else ()
+            if tokens:
+                automaton.add(tokens, term_id)
+                patterns[term_id] = tokens
+        return removed
+
+    def refresh(self, db: Session) -> bool:
+        """Brings the automaton up to date with the glossary table, returns whether it changed."""
+        version = tuple(db.execute(self._version_statement).one())
+        if version == self._version:
+            return False
+
+        with self._lock:
+            if version == self._version:
+                return False
+            start = time.perf_counter()
+            columns = select(GlossaryTerm.id, GlossaryTerm.term, GlossaryTerm.deleted_at)
+            incremental = self._version is not None and self._removed <= LINK_REBUILD_RATIO * len(self._patterns)
+
+            if incremental:
+                # >= rather than >: rows written within the same timestamp as the last refresh are re-applied, not missed
+                rows = db.execute(columns.where(GlossaryTerm.updated_at >= self._version[1])).all()
+                automaton, patterns = self._automaton.copy(), dict(self._patterns)
+                removed = self._removed + self._apply(automaton, patterns, rows)
+                if len(patterns) != version[0]:
+                    logger.info(f"Glossary matcher out of step ({len(patterns)} patterns, {version[0]} live terms), rebuilding")
+                    incremental = False
+
+            if not incremental:
+                rows = db.execute(columns.where(GlossaryTerm.deleted_at == None)).all()
+                automaton, patterns, removed = TokenAutomaton(), {}, 0
+                self._apply(automaton, patterns, rows)
+
+            automaton.finalize()
+            self._automaton, self._patterns, self._removed = automaton, patterns, removed
+            self._version = version
+            logger.info(
+                f"Glossary matcher {'updated' if incremental else 'built'}: {len(rows)} terms applied, "
+                f"{len(patterns)} patterns, {len(automaton)} states in {time.perf_counter() - start:.3f}s"
+            )
+            return True
+
+    def find(self, text: str) -> dict:
+        """{term_id: mentions} for every glossary term found in `text`, overlapping terms included."""
+        if not text:
+            return {}
+        return dict(Counter(term_id for _, term_id in self._automaton.search(link_tokens(text))))
+
+
+glossary_matcher = GlossaryMatcher()
+
+
+def link_rows(article_id, text: str) -> list:
+    return [
+        {"article_id": article_id, "term_id": term_id, "mentions": mentions}
+        for term_id, mentions in glossary_matcher.find(text).items()
+    ]
+
+
+def backfill_article_terms(chunk_size: int = LINK_BACKFILL_CHUNK_SIZE, db: Session = None) -> int:
+    """
+    Re-links every stored article against the current glossary:
+    - Streams news_articles in keyset pages of `chunk_size` by id, so memory stays flat
+    - Each chunk replaces its articles' links and commits, an interrupted run just starts over
+    Returns the number of links written.
+    """
+    if db is None:
+        with db_session() as db:
+            return backfill_article_terms(chunk_size, db)
+
+    glossary_matcher.refresh(db)
+    if not len(glossary_matcher):
+        logger.warning("No glossary terms to link")
+        return 0
+
+    start = time.perf_counter()
+    last_id = None
+    articles = 0
+    links = 0
+    while True:
+        statement = select(NewsArticle.id, NewsArticle.summary) \
+            .where(NewsArticle.deleted_at == None, NewsArticle.summary != None)
+        if last_id is not None:
+            statement = statement.where(NewsArticle.id > last_id)
+        chunk = db.execute(statement.order_by(NewsArticle.id).limit(chunk_size)).all()
+        if not chunk:
+            break
+
+        rows = [row for article_id, summary in chunk for row in link_rows(article_id, summary)]
+        db.execute(delete(NewsArticleTerm).where(NewsArticleTerm.article_id.in_([article_id for article_id, _ in chunk])))
+        if rows:
+            db.execute(insert(NewsArticleTerm), rows)
+        db.commit()
+
+        last_id = chunk[-1][0]
+        articles += len(chunk)
+        links += len(rows)
+        logger.info(f"Linked {articles} articles so far ({links} links)")
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Glossary link backfill done: {articles} articles, {links} links in {elapsed:.1f}s ({articles / elapsed if elapsed else 0:.0f} articles/s)")
+    return links
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Glossary term links of news articles")
+    parser.add_argument("--backfill", action="store_true", help="re-link every stored article")
+    parser.add_argument("--chunk-size", type=int, default=LINK_BACKFILL_CHUNK_SIZE)
+    args = parser.parse_args()
+    if args.backfill:
+        backfill_article_terms(args.chunk_size)
+    else:
+        parser.print_help()
@@ -0,0 +1,375 @@
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from core.database import db_session
+from core.logger import logger
+from core.metrics import counter
+from models.glossary import GlossaryTerm
+from utils.file_lock import file_lock
+
+GLOSSARY_SNAPSHOT_ENABLED = os.getenv("GLOSSARY_SNAPSHOT_ENABLED", "true").lower() == "true"
+GLOSSARY_SNAPSHOT_DIR = os.getenv("GLOSSARY_SNAPSHOT_DIR", "glossary_snapshot")
+# Seconds between rebuild checks of the background refresher, a version change seen by a search wakes it earlier
+GLOSSARY_SNAPSHOT_REFRESH_INTERVAL = float(os.getenv("GLOSSARY_SNAPSHOT_REFRESH_INTERVAL", 60))
+# How long a glossary version read from the database is trusted by the search path, bounds staleness after writes
+GLOSSARY_SNAPSHOT_VERSION_TTL = float(os.getenv("GLOSSARY_SNAPSHOT_VERSION_TTL", 5))
+# Seconds between checks for a snapshot published by another worker
+SNAPSHOT_POINTER_CHECK_INTERVAL = 1.0
+
+CURRENT_FILE = "current.json"
+LOCK_FILE = "build.lock"
+TEXT_COLUMNS = ("term", "definition", "simplified_explanation", "contextual_examples")
+ID_DTYPE = "S36"
+EPOCH = datetime(1970, 1, 1)
+
+HYDRATED_TERMS = counter("fin_glossary_hydrated_terms_total", "Search candidates hydrated, by source", ("source",))
+
+
+class GlossaryRecord:
+    """One snapshot row, read like a `GlossaryTerm`."""
+
+    __slots__ = ("id", "term", "definition", "simplified_explanation", "contextual_examples", "updated_at")
+
+    def __init__(self, id, term, definition, simplified_explanation, contextual_examples, updated_at):
+        self.id = id
+        self.term = term
+        self.definition = definition
+        self.simplified_explanation = simplified_explanation
+        self.contextual_examples = contextual_examples
+        self.updated_at = updated_at
+
+
+def _text_column(values: list) -> tuple:
+    """Strings as one UTF-8 blob + (n + 1) offsets, None flagged in a null mask."""
+    encoded = [value.encode("utf-8") if value is not None else b"" for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    nulls = np.array([value is None for value in values], dtype=np.bool_)
+    return offsets, data, nulls
+
+
+def _write_snapshot(path: str, version: str, arrays: dict):
+    """Layout: 8-byte header length, JSON header (version, array offsets / dtypes / shapes), 8-byte aligned arrays."""
+    specs = {}
+    position = 0
+    for name, array in arrays.items():
+        specs[name] = {"offset": position, "dtype": array.dtype.str, "shape": list(array.shape)}
+        position += -(-array.nbytes // 8) * 8
+    header = json.dumps({"version": version, "arrays": specs}).encode("utf-8")
+    header += b" " * (-len(header) % 8)
+    base = 8 + len(header)
+
+    with open(path, "wb") as f:
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(base + specs[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class SnapshotView:
+    """
+    Read-only, memory-mapped glossary snapshot:
+    - Ids sorted as canonical uuid strings, id -> row is a binary search (no per-process dict to build)
+    - Text columns as UTF-8 blobs with offsets, rows are decoded only when read
+    - `term_order` sorts rows by lowercase term for exact term lookups
+    Every worker maps the same file, the OS page cache holds one copy.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            header_length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_length))
+        base = 8 + header_length
+        arrays = {
+            name: np.memmap(path, dtype=np.dtype(spec["dtype"]), mode="r", offset=base + spec["offset"], shape=tuple(spec["shape"]))
+            if spec["shape"][0] else np.empty(spec["shape"], dtype=np.dtype(spec["dtype"]))
+            for name, spec in header["arrays"].items()
+        }
+        self.path = path
+        self.version = header["version"]
+        self.ids = arrays["ids"]
+        self.updated_at = arrays["updated_at"]
+        self.term_order = arrays["term_order"]
+        self._columns = {
+            column: (arrays[f"{column}_offsets"], arrays[f"{column}_data"], arrays[f"{column}_nulls"])
+            for column in TEXT_COLUMNS
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _text(self, column: str, row: int):
+        offsets, data, nulls = self._columns[column]
+        if nulls[row]:
+            return None
+        return bytes(data[offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def record(self, row: int) -> GlossaryRecord:
+        examples = self._text("contextual_examples", row)
+        return GlossaryRecord(
+            id=self.ids[row].decode("ascii"),
+            term=self._text("term", row),
+            definition=self._text("definition", row),
+            simplified_explanation=self._text("simplified_explanation", row),
+            contextual_examples=json.loads(examples) if examples is not None else None,
+            updated_at=EPOCH + timedelta(microseconds=int(self.updated_at[row])),
+        )
+
+    def rows(self, term_ids: list) -> tuple:
+        """(row per id, found mask), one vectorized binary search for all ids."""
+        keys = np.array([str(term_id) for term_id in term_ids], dtype=ID_DTYPE)
+        if not len(self.ids):
+            return np.zeros(len(keys), dtype=np.int64), np.zeros(len(keys), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.ids, keys), len(self.ids) - 1)
+        return positions, self.ids[positions] == keys
+
+    def find_term(self, term: str):
+        """Record of the term spelled `term` in any case, None if there is none."""
+        target = term.lower()
+        low, high = 0, len(self.term_order)
+        while low < high:
+            middle = (low + high) // 2
+            if self._text("term", self.term_order[middle]).lower() < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.term_order) and self._text("term", self.term_order[low]).lower() == target:
+            return self.record(self.term_order[low])
+        return None
+
+
+version_statement = select(func.count(GlossaryTerm.id), func.max(GlossaryTerm.updated_at)).where(GlossaryTerm.deleted_at == None)
+
+
+def format_version(count: int, updated_at) -> str:
+    """(live term count, latest updated_at) of the glossary table, changes with every edit or delete."""
+    return f"{count}|{updated_at.isoformat() if updated_at else ''}"
+
+
+def snapshot_version(db: Session) -> str:
+    return format_version(*db.execute(version_statement).one())
+
+
+class GlossarySnapshot:
+    """
+    Glossary rows for the search read path, served from a `SnapshotView` instead of Postgres:
+    - `load()` maps the snapshot `current.json` points to, no database needed (worker start)
+    - `refresh(db)` rebuilds it when the glossary version changed: one worker builds under a file lock,
+      publishes by atomically replacing `current.json`, the others map the new file on their next read
+    - Readers hold a reference to one view, a refresh swaps the reference and never blocks them
+    - Reads are served only while the view's version matches the glossary version last read from the
+      database (`observe_version`, at most every `version_ttl` seconds), a stale snapshot falls back to
+      the database and wakes the refresher instead of returning edited or deleted rows
+    """
+
+    def __init__(
+        self, directory: str = GLOSSARY_SNAPSHOT_DIR, refresh_interval: float = GLOSSARY_SNAPSHOT_REFRESH_INTERVAL,
+        version_ttl: float = GLOSSARY_SNAPSHOT_VERSION_TTL
+    ):
+        self.directory = directory
+        self.refresh_interval = refresh_interval
+        self.version_ttl = version_ttl
+        self.pointer_path = os.path.join(directory, CURRENT_FILE)
+        self._view = None
+        self._pointer_mtime = None
+        self._pointer_checked_at = 0.0
+        self._lock = threading.Lock()
+        self._db_version = None
+        self._db_version_checked_at = 0.0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def version(self):
+        view = self._view
+        return view.version if view is not None else None
+
+    def observe_version(self, db_version: str):
+        """Records the glossary version just read from the database, wakes the refresher if the snapshot is behind."""
+        self._db_version = db_version
+        self._db_version_checked_at = time.monotonic()
+        if db_version != self.version:
+            self._wake.set()
+
+    def _db_version_is_fresh(self) -> bool:
+        return self._db_version is not None and time.monotonic() - self._db_version_checked_at <= self.version_ttl
+
+    def check_version(self, db: Session):
+        """Re-reads the glossary version if the last one is older than `version_ttl` (searches do it first)."""
+        if GLOSSARY_SNAPSHOT_ENABLED and not self._db_version_is_fresh():
+            self.observe_version(snapshot_version(db))
+
+    async def check_version_async(self, db):
+        if GLOSSARY_SNAPSHOT_ENABLED and not self._db_version_is_fresh():
+            self.observe_version(format_version(*(await db.execute(version_statement)).one()))
+
+    def load(self) -> bool:
+        """Maps the published snapshot if it changed since the last load, returns whether it did."""
+        try:
+            mtime = os.stat(self.pointer_path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._pointer_mtime:
+            return False
+        with self._lock:
+            if mtime == self._pointer_mtime:
+                return False
+            try:
+                with open(self.pointer_path, encoding="utf-8") as f:
+                    pointer = json.load(f)
+                view = SnapshotView(os.path.join(self.directory, pointer["file"]))
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Failed to load the glossary snapshot: {str(e)}")
+                return False
+            self._view, self._pointer_mtime = view, mtime
+        logger.info(f"Glossary snapshot loaded: {len(view)} terms, version {view.version}")
+        return True
+
+    def current(self):
+        """The latest view, None before the first snapshot exists."""
+        now = time.monotonic()
+        if now - self._pointer_checked_at >= SNAPSHOT_POINTER_CHECK_INTERVAL:
+            self._pointer_checked_at = now
+            self.load()
+        return self._view
+
+    def build(self, db: Session, version: str = None) -> str:
+        """Writes a snapshot of the live glossary and publishes it, returns its file name."""
+        start = time.perf_counter()
+        version = version or snapshot_version(db)
+        rows = db.execute(select(
+            GlossaryTerm.id, GlossaryTerm.term, GlossaryTerm.definition, GlossaryTerm.simplified_explanation,
+            GlossaryTerm.contextual_examples, GlossaryTerm.updated_at
+        ).where(GlossaryTerm.deleted_at == None)).all()
+
+        ids = np.array([str(row.id) for row in rows], dtype=ID_DTYPE)
+        order = np.argsort(ids, kind="stable")
+        rows = [rows[i] for i in order]
+        arrays = {
+            "ids": ids[order],
+            "updated_at": np.array([(row.updated_at - EPOCH) // timedelta(microseconds=1) for row in rows], dtype=np.int64),
+        }
+        for column in TEXT_COLUMNS:
+            values = [getattr(row, column) for row in rows]
+            if column == "contextual_examples":
+                values = [json.dumps(value) if value is not None else None for value in values]
+            arrays[f"{column}_offsets"], arrays[f"{column}_data"], arrays[f"{column}_nulls"] = _text_column(values)
+        lowered = [row.term.lower() for row in rows]
+        arrays["term_order"] = np.array(sorted(range(len(rows)), key=lowered.__getitem__), dtype=np.int64)
+
+        os.makedirs(self.directory, exist_ok=True)
+        file_name = f"snapshot-{time.time_ns()}.bin"
+        _write_snapshot(os.path.join(self.directory, file_name), version, arrays)
+        tmp_path = f"{self.pointer_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"file": file_name, "version": version, "terms": len(rows)}, f)
+        os.replace(tmp_path, self.pointer_path)
+        self._remove_old_files(keep=file_name)
+        logger.info(f"Glossary snapshot built: {len(rows)} terms in {time.perf_counter() - start:.2f}s")
+        return file_name
+
+    def _remove_old_files(self, keep: str):
+        # Workers still mapping a removed file keep reading it until they switch, unlinking is safe on POSIX.
+        # Windows refuses to remove a mapped file, it is left for the next build to clean up
+        for name in os.listdir(self.directory):
+            if name.startswith("snapshot-") and name != keep:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def refresh(self, db: Session = None, force: bool = False) -> bool:
+        """Rebuilds the snapshot if the glossary changed since it was built, returns whether it did."""
+        if db is None:
+            with db_session() as db:
+                return self.refresh(db, force)
+
+        self.load()
+        version = snapshot_version(db)
+        self.observe_version(version)
+        if version == self.version and not force:
+            return False
+
+        with file_lock(os.path.join(self.directory, LOCK_FILE)):
+            # Another worker may have published this version while we waited for the lock
+            self.load()
+            if version == self.version and not force:
+                return False
+            self.build(db, version)
+        self.load()
+        return True
+
+    def get_many(self, term_ids) -> tuple:
+        """
+        (records found in the snapshot in id order, ids it doesn't have). Every id is missing while the
+        snapshot doesn't match the observed glossary version.
+        """
+        term_ids = list(term_ids)
+        view = self.current() if GLOSSARY_SNAPSHOT_ENABLED else None
+        if view is None or view.version != self._db_version or not term_ids:
+            return [], term_ids
+        positions, found = view.rows(term_ids)
+        records = [view.record(int(row)) for row in np.unique(positions[found])]
+        missing = [term_id for term_id, hit in zip(term_ids, found) if not hit]
+        HYDRATED_TERMS.inc(len(records), source="snapshot")
+        return records, missing
+
+    def _refresh_loop(self):
+        while True:
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Glossary snapshot refresh failed: {str(e)}")
+
+    def start_refresher(self):
+        """Rebuilds the snapshot from a background thread, every `refresh_interval` seconds or when woken."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, name="glossary-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop_refresher(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        view = self._view
+        return {
+            "enabled": GLOSSARY_SNAPSHOT_ENABLED,
+            "terms": len(view) if view is not None else 0,
+            "version": view.version if view is not None else None,
+            "database_version": self._db_version,
+            "file": os.path.basename(view.path) if view is not None else None,
+        }
+
+
+glossary_snapshot = GlossarySnapshot()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-memory glossary snapshot of the search read path")
+    parser.add_argument("--build", action="store_true", help="(re)build and publish the snapshot now")
+    args = parser.parse_args()
+    if args.build:
+        glossary_snapshot.refresh(force=True)
+        print(json.dumps(glossary_snapshot.stats(), indent=2))
+    else:
+        parser.print_help()
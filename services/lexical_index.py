@@ -0,0 +1,217 @@
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from sqlalchemy import func, literal, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from core.logger import logger
+from models.glossary import GlossaryTerm, TS_CONFIG
+
+# Upper bound on lexical candidates returned per query
+LEXICAL_MAX_RESULTS = int(os.getenv("LEXICAL_MAX_RESULTS", 1000))
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"\w+")
+_stemmer = None
+
+
+def get_stemmer():
+    # Importing NLTK is slow, only the in-memory index needs it
+    global _stemmer
+    if _stemmer is None:
+        from nltk.stem import PorterStemmer
+        _stemmer = PorterStemmer()
+    return _stemmer
+
+
+def tokenize(text: str) -> list:
+    """Lowercase, split on non-word chars and stem, close to Postgres' english text search config."""
+    stemmer = get_stemmer()
+    return [stemmer.stem(token) for token in TOKEN_PATTERN.findall(text.lower())]
+
+
+def _normalize_scores(scored: list) -> dict:
+    """Scales scores into (0, 1] relative to the best match, keeps descending order."""
+    if not scored:
+        return {}
+    best = max(score for _, score in scored) or 1.0
+    return {str(term_id): score / best for term_id, score in sorted(scored, key=lambda x: x[1], reverse=True)}
+
+
+def _postgres_statement(keywords: list, limit: int):
+    """
+    Full-text + trigram search on `glossary.term`:
+    - `to_tsvector('english', term) @@ (plainto_tsquery(kw1) || ...)` served by a GIN index
+    - `kw <% term` (pg_trgm word similarity) for partial / misspelled words, served by a gin_trgm_ops index
+    - Ranked by the best of ts_rank_cd and word similarity
+    """
+    tsv = func.to_tsvector(TS_CONFIG, GlossaryTerm.term)
+    tsq = None
+    for kw in keywords:
+        kw_query = func.plainto_tsquery(TS_CONFIG, kw)
+        tsq = kw_query if tsq is None else tsq.op('||')(kw_query)
+
+    # Normalization 32 scales the rank into [0, 1)
+    rank = func.ts_rank_cd(tsv, tsq, 32)
+    similarity = func.greatest(*[func.word_similarity(kw, GlossaryTerm.term) for kw in keywords])
+    score = func.greatest(rank, similarity).label("score")
+
+    matches = [tsv.op('@@')(tsq)] + [literal(kw).op('<%')(GlossaryTerm.term) for kw in keywords]
+
+    return select(GlossaryTerm.id, score) \
+        .where(GlossaryTerm.deleted_at == None, or_(*matches)) \
+        .order_by(score.desc()) \
+        .limit(limit)
+
+
+def search_postgres(db: Session, keywords: list, limit: int = LEXICAL_MAX_RESULTS) -> dict:
+    rows = db.execute(_postgres_statement(keywords, limit)).all()
+    return _normalize_scores([(term_id, float(term_score)) for term_id, term_score in rows])
+
+
+async def search_postgres_async(db: AsyncSession, keywords: list, limit: int = LEXICAL_MAX_RESULTS) -> dict:
+    rows = (await db.execute(_postgres_statement(keywords, limit))).all()
+    return _normalize_scores([(term_id, float(term_score)) for term_id, term_score in rows])
+
+
+def _postgres_batch_statement(keyword_lists: list, limit: int):
+    """All searches of a batch as one UNION ALL, rows are tagged with the position of their keyword list."""
+    parts = []
+    for position, keywords in enumerate(keyword_lists):
+        if keywords:
+            search = _postgres_statement(keywords, limit).subquery()
+            parts.append(select(literal(position).label("position"), search.c.id, search.c.score))
+    return parts[0] if len(parts) == 1 else union_all(*parts)
+
+
+def _group_batch_rows(rows, n_lists: int) -> list:
+    grouped = [[] for _ in range(n_lists)]
+    for position, term_id, term_score in rows:
+        grouped[position].append((term_id, float(term_score)))
+    return [_normalize_scores(scored) for scored in grouped]
+
+
+class InMemoryLexicalIndex:
+    """
+    BM25 inverted index over glossary terms for databases without Postgres text search
+    (SQLite, tests). Rebuilt whenever the number of live terms or the latest `updated_at` changes.
+    """
+
+    _version_statement = select(func.count(GlossaryTerm.id), func.max(GlossaryTerm.updated_at)) \
+        .where(GlossaryTerm.deleted_at == None)
+    _rows_statement = select(GlossaryTerm.id, GlossaryTerm.term).where(GlossaryTerm.deleted_at == None)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._ids = []
+        self._doc_lengths = []
+        self._avg_doc_length = 0.0
+        self._postings = {}
+
+    def build(self, rows: list):
+        """Builds the index from `(id, term)` rows."""
+        postings = defaultdict(list)
+        doc_lengths = []
+        for position, (_, term) in enumerate(rows):
+            tokens = tokenize(term)
+            doc_lengths.append(len(tokens))
+            for token, tf in Counter(tokens).items():
+                postings[token].append((position, tf))
+
+        self._ids = [term_id for term_id, _ in rows]
+        self._doc_lengths = doc_lengths
+        self._avg_doc_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+        self._postings = dict(postings)
+        logger.info(f"Built in-memory lexical index over {len(rows)} terms")
+
+    def _refresh(self, db: Session):
+        version = tuple(db.execute(self._version_statement).one())
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            self.build(db.execute(self._rows_statement).all())
+            self._version = version
+
+    async def _refresh_async(self, db: AsyncSession):
+        version = tuple((await db.execute(self._version_statement)).one())
+        if version == self._version:
+            return
+        rows = (await db.execute(self._rows_statement)).all()
+        with self._lock:
+            self.build(rows)
+            self._version = version
+
+    def score(self, keywords: list, limit: int = LEXICAL_MAX_RESULTS) -> dict:
+        n_docs = len(self._ids)
+        scores = defaultdict(float)
+        for token in set(token for kw in keywords for token in tokenize(kw)):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, tf in postings:
+                length_norm = 1 - BM25_B + BM25_B * self._doc_lengths[position] / self._avg_doc_length
+                scores[position] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+
+        best = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:limit]
+        return _normalize_scores([(self._ids[position], score) for position, score in best])
+
+    def search(self, db: Session, keywords: list, limit: int = LEXICAL_MAX_RESULTS) -> dict:
+        self._refresh(db)
+        return self.score(keywords, limit)
+
+    async def search_async(self, db: AsyncSession, keywords: list, limit: int = LEXICAL_MAX_RESULTS) -> dict:
+        await self._refresh_async(db)
+        return self.score(keywords, limit)
+
+
+in_memory_lexical_index = InMemoryLexicalIndex()
+
+
+def lexical_search(db: Session, keywords: list, limit: int = LEXICAL_MAX_RESULTS) -> dict:
+    """
+    Returns {term_id: lexical score in (0, 1]} for terms matching any keyword, best first.
+    Uses Postgres text search when available and the in-memory BM25 index otherwise.
+    """
+    if not keywords:
+        return {}
+    if db.get_bind().dialect.name == "postgresql":
+        return search_postgres(db, keywords, limit)
+    return in_memory_lexical_index.search(db, keywords, limit)
+
+
+
+async def lexical_search_async(db: AsyncSession, keywords: list, limit: int = LEXICAL_MAX_RESULTS) -> dict:
+    """Async `lexical_search`."""
+    if not keywords:
+        return {}
+    if db.bind.dialect.name == "postgresql":
+        return await search_postgres_async(db, keywords, limit)
+    return await in_memory_lexical_index.search_async(db, keywords, limit)
+
+
+def lexical_search_many(db: Session, keyword_lists: list, limit: int = LEXICAL_MAX_RESULTS) -> list:
+    """`lexical_search` for many keyword lists in one round-trip, returns one score dict per list."""
+    if not any(keyword_lists):
+        return [{} for _ in keyword_lists]
+    if db.get_bind().dialect.name == "postgresql":
+        return _group_batch_rows(db.execute(_postgres_batch_statement(keyword_lists, limit)).all(), len(keyword_lists))
+    in_memory_lexical_index._refresh(db)
+    return [in_memory_lexical_index.score(keywords, limit) if keywords else {} for keywords in keyword_lists]
+
+
+async def lexical_search_many_async(db: AsyncSession, keyword_lists: list, limit: int = LEXICAL_MAX_RESULTS) -> list:
+    """Async `lexical_search_many`."""
+    if not any(keyword_lists):
+        return [{} for _ in keyword_lists]
+    if db.bind.dialect.name == "postgresql":
+        rows = (await db.execute(_postgres_batch_statement(keyword_lists, limit))).all()
+        return _group_batch_rows(rows, len(keyword_lists))
+    await in_memory_lexical_index._refresh_async(db)
+    return [in_memory_lexical_index.score(keywords, limit) if keywords else {} for keywords in keyword_lists]
\ No newline at end of file
@@ -1,53 +1,60 @@
+import argparse
+import hashlib
+import os
+import threading
 import time
-from urllib.parse import urlparse
-import feedparser
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from datetime import datetime
-from bs4 import BeautifulSoup
+from sqlalchemy import insert as sql_insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from requests_html import HTMLSession
 
-from core.database import get_db
-from models.news import NewsArticle
+from core.database import db_session, engine
+from models.news import NewsArticle, NewsArticleTerm
 from core.logger import logger
-from services.sentiment_analysis_service import analyze_sentiment
+from core.metrics import counter, external_call, trace
+from services.article_extractor import browser_pool, extract_content
+from services.feed_poller import FEED_CURSOR_FIELDS, FEED_MIN_INTERVAL, RSS_FEEDS, due_feeds, new_feed_state, poll_feed, save_feeds, seconds_until_next_poll
+from services.glossary_linker import glossary_matcher, link_rows
+from services.news_query_service import update_sentiment_rollups
+from services.sentiment_analysis_service import score_columns, score_text
 from services.summarization_service import generate_summary
-
-RSS_FEEDS = [
-    # "https://feeds.finance.yahoo.com/rss/2.0/headline?s=^DJI,^GSPC,^IXIC&region=US&lang=en-US",    # Yahoo Finance
-    # "https://www.investing.com/rss/news.rss",                                                      # Investing.com
-    "https://news.google.com/rss/search?q=finance+news&hl=en-US&gl=US&ceid=US:en"                  # Google Finance
-]
+from utils.pipeline import DomainRateLimiter, Pipeline, Stage
 
 MAX_RETRIES = 5
 BACKOFF_FACTOR = 2
 
+# Pipeline sizing: worker threads per stage and the size of the queues between stages
+NEWS_FETCH_WORKERS = int(os.getenv("NEWS_FETCH_WORKERS", 16))
+NEWS_EXTRACT_WORKERS = int(os.getenv("NEWS_EXTRACT_WORKERS", 8))
+NEWS_SUMMARY_WORKERS = int(os.getenv("NEWS_SUMMARY_WORKERS", 4))
+NEWS_SENTIMENT_WORKERS = int(os.getenv("NEWS_SENTIMENT_WORKERS", 1))
+NEWS_QUEUE_SIZE = int(os.getenv("NEWS_QUEUE_SIZE", 32))
+NEWS_INSERT_BATCH_SIZE = int(os.getenv("NEWS_INSERT_BATCH_SIZE", 50))
+# Politeness towards publishers: requests per second (and burst) per domain
+NEWS_DOMAIN_RATE = float(os.getenv("NEWS_DOMAIN_RATE", 1.0))
+NEWS_DOMAIN_BURST = int(os.getenv("NEWS_DOMAIN_BURST", 2))
+
+domain_rate_limiter = DomainRateLimiter(NEWS_DOMAIN_RATE, NEWS_DOMAIN_BURST)
+ARTICLES_STORED = counter("fin_news_articles_stored_total", "News articles inserted by the aggregator")
+_seen_hashes_lock = threading.Lock()
+
+def fetch_feed(feed_url: str) -> list:
+    """Fetch the latest articles of one RSS feed, without polling state (see services/feed_poller.py)."""
+    logger.info(f"Fetching feed: {feed_url}")
+    return poll_feed(new_feed_state(feed_url))
+
 def fetch_rss_feeds():
-    """Fetch articles from multiple RSS feeds."""
+    """Fetch articles from multiple RSS feeds concurrently."""
     logger.info("Fetching financial news from RSS feeds...")
     all_articles = []
 
-    for feed_url in RSS_FEEDS:
-        logger.info(f"Fetching feed: {feed_url}")
+    with ThreadPoolExecutor(max_workers=NEWS_FETCH_WORKERS) as pool:
+        for articles in pool.map(fetch_feed, RSS_FEEDS):
+            all_articles.extend(articles)
 
-        try:
-            feed = feedparser.parse(feed_url)
-            if not feed.entries:
-                logger.warning(f"No articles found in feed: {feed_url}")
-                continue
-
-            for entry in feed.entries[:5]:
-                logger.info(f"Entry: {entry}")
-                article = {
-                    "title": entry.title,
-                    "url": entry.link,
-                    "source": urlparse(feed_url).netloc,
-                    "published_at": datetime(*entry.published_parsed[:6])
-                }
-                all_articles.append(article)
-            
-        except Exception as e:
-            logger.error(f"Error processing the feed {feed_url}: {str(e)}")
     logger.info(f"Fetched total {len(all_articles)} articles")
     return all_articles
 
@@ -72,8 +79,9 @@ def retry_request(url, max_retries=MAX_RETRIES, backoff=BACKOFF_FACTOR, timeout=
 def resolve_google_news_redirect(url):
     try:
         session = requests.Session()
-        response = session.get(url, allow_redirects=False)
-        logger.info(f"Response headers: {response.headers}")
+        with external_call("http", "redirect"):
+            response = session.get(url, allow_redirects=False)
+        logger.debug("Response headers: %s", response.headers)
         if response.status_code in (301, 302):
             return response.headers['Location']
         return url
@@ -82,53 +90,26 @@ def resolve_google_news_redirect(url):
         return url
 
 def extract_article_content(article_url: str):
-    """Extracts the main content of the article using BeautifulSoup with retries and error handling."""
+    """
+    Extracts the main content of the article:
+    - Static fetch + lxml parsing first, headless rendering through the shared browser pool only as a fallback
+    """
     try:
-        logger.info(f"Extracting content from {article_url}")
+        logger.debug("Extracting content from %s", article_url)
 
-        # response = retry_request(article_url)
         if "news.google.com" in article_url:
+            domain_rate_limiter.acquire(article_url)
             article_url = resolve_google_news_redirect(article_url)
-            logger.info(f"Resolved to: {article_url}")
-
-        session = HTMLSession()
-        response = session.get(article_url)
-        response.html.render(timeout=20) 
-
-        if response is None:
-            logger.warning(f"Skipping the article due to failures: {article_url}")
-            return ""
-        
-        content = ""
-        
-        # Try common article container selectors
-        article_containers = response.html.find('article') or \
-                            response.html.find('.article-body') or \
-                            response.html.find('.article-content') or \
-                            response.html.find('#article-body')
-        
-        if article_containers:
-            content = article_containers[0].text
-        else:
-            # Fallback to paragraphs
-            paragraphs = response.html.find('p')
-            content = " ".join(p.text for p in paragraphs)
-
-        # logger.info(f"Content for {article_url}: {response.content}")
-        # soup = BeautifulSoup(response.content, "html.parser")
-
-        # paragraphs = soup.find_all('p')
-        # if not paragraphs:
-        #     logger.warning(f"No <p> tags found. Trying <div> extraction...")
-        #     paragraphs = soup.find_all('div')
+            logger.debug("Resolved to: %s", article_url)
 
-        # content = " ".join(p.get_text() for p in paragraphs)
+        domain_rate_limiter.acquire(article_url)
+        content = extract_content(article_url)
 
         if not content.strip():
             logger.warning(f"No content found for {article_url}.")
             return "No content available."
         
-        logger.info(f"Fetched content for {article_url}: {content[:30]}...")
+        logger.debug("Fetched content for %s: %s...", article_url, content[:30])
         content = content[:3000]
 
         return content
@@ -136,55 +117,227 @@ def extract_article_content(article_url: str):
         logger.error(f"Failed to extract content from {article_url}: {str(e)}")
         return ""
 
-def store_articles_db(articles: list, db: Session):
-    """Store the fetched articles in PostgreSQL"""
-    logger.info("Storing articles in PostgreSQL...")
+def hash_url(url: str) -> str:
+    """Key of the unique index on news_articles, same as encode(sha256(convert_to(url, 'UTF8')), 'hex')."""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
 
-    stored_count = 0
+def filter_new_articles(articles: list, seen_hashes: set = None) -> list:
+    """
+    Drops articles that are already stored (one query for the whole batch) or were already
+    seen in this run, so extraction and summarization only run for truly new URLs.
+    """
+    by_hash = {}
     for article in articles:
+        article['url_hash'] = hash_url(article['url'])
+        by_hash.setdefault(article['url_hash'], article)
+
+    if seen_hashes is not None:
+        with _seen_hashes_lock:
+            by_hash = {url_hash: article for url_hash, article in by_hash.items() if url_hash not in seen_hashes}
+            seen_hashes.update(by_hash)
+
+    if not by_hash:
+        return []
+
+    with engine.connect() as conn:
+        existing = set(conn.execute(
+            select(NewsArticle.url_hash).where(NewsArticle.url_hash.in_(list(by_hash)))
+        ).scalars())
+
+    new_articles = [article for url_hash, article in by_hash.items() if url_hash not in existing]
+    logger.info(f"{len(new_articles)} new of {len(articles)} fetched articles, skipping {len(articles) - len(new_articles)} duplicates")
+    return new_articles
+
+def bulk_insert_articles(db: Session, articles: list) -> int:
+    """
+    Inserts all articles with a single INSERT ... ON CONFLICT (url_hash) DO NOTHING, then the
+    glossary links and sentiment rollups of the rows actually inserted, in the same transaction.
+    Returns the number of articles inserted.
+    """
+    if not articles:
+        return 0
+
+    for article in articles:
+        # Ids are assigned up front so the glossary links can reference them
+        article.setdefault('id', uuid.uuid4())
+    rows = [
+        {
+            "id": article['id'],
+            "title": article['title'],
+            "source": article['source'],
+            "url": article['url'],
+            "url_hash": article['url_hash'],
+            "published_at": article['published_at'],
+            "summary": article['summary'],
+            **score_columns(article['sentiment_scores']),
+        }
+        for article in articles
+    ]
+    insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+    statement = insert(NewsArticle).values(rows) \
+        .on_conflict_do_nothing(index_elements=[NewsArticle.url_hash]) \
+        .returning(NewsArticle.id)
+    inserted = set(db.execute(statement).scalars())
+
+    inserted_articles = [article for article in articles if article['id'] in inserted]
+    links = [link for article in inserted_articles for link in article.get('glossary_links', [])]
+    if links:
+        db.execute(sql_insert(NewsArticleTerm), links)
+    update_sentiment_rollups(db, inserted_articles)
+    db.commit()
+    return len(inserted)
+
+def build_article_stages(db: Session, stats: dict) -> tuple:
+    """
+    Pipeline stages turning new RSS entries into stored articles:
+    extract -> summarize -> link -> score -> persist
+    Link tags the summary with the glossary terms it mentions (services/glossary_linker.py).
+    Persist buffers articles and writes them in bulk every NEWS_INSERT_BATCH_SIZE articles,
+    call the returned `flush` once the pipeline finished. A batch that fails to insert is rolled
+    back and dropped, counted in `stats['failed']`.
+    """
+    pending = []
+
+    try:
+        glossary_matcher.refresh(db)
+    except Exception as e:
+        logger.error(f"Glossary matcher refresh failed, linking against the previous glossary: {str(e)}")
+
+    def extract(article):
+        article['content'] = extract_article_content(article['url'])
+        return article
+
+    def summarize(article):
+        article['summary'] = generate_summary(article.pop('content'))
+        return article
+
+    def link(article):
+        article['glossary_links'] = []
+        try:
+            article.setdefault('id', uuid.uuid4())
+            article['glossary_links'] = link_rows(article['id'], article['summary'])
+        except Exception as e:
+            logger.error(f"Glossary linking failed for {article['url']}: {str(e)}")
+        return article
+
+    def score(article):
+        article['sentiment_scores'] = score_text(article['summary'])
+        article['sentiment'] = article['sentiment_scores'].label
+        return article
+
+    def flush():
+        batch = list(pending)
+        pending.clear()
         try:
-            existing_article = db.query(NewsArticle).filter(NewsArticle.url == article['url']).first()
-
-            if existing_article:
-                logger.info(f"Skipping duplicate: {article['title']}")
-                continue
-
-            content = extract_article_content(article['url'])
-            summary = generate_summary(content)
-            sentiment = analyze_sentiment(summary)
-
-            news_article = NewsArticle(
-                title=article['title'],
-                source=article['source'],
-                url=article['url'],
-                published_at=article['published_at'],
-                summary=summary,
-                sentiment=sentiment
-            )
-
-            db.add(news_article)
-            stored_count += 1
+            inserted = bulk_insert_articles(db, batch)
         except Exception as e:
-            logger.error(f"Failed to store article {article['title']}: {str(e)}")
+            # Leaves the session usable for the next batches and the feed state
+            db.rollback()
+            stats['failed'] += len(batch)
+            logger.error(f"Failed to store {len(batch)} articles, rolled back: {str(e)}")
+            return
+        ARTICLES_STORED.inc(inserted)
+        stats['inserted'] += inserted
+
+    def persist(article):
+        pending.append(article)
+        if len(pending) >= NEWS_INSERT_BATCH_SIZE:
+            flush()
+        return article
+
+    stages = [
+        Stage("extract", extract, workers=NEWS_EXTRACT_WORKERS),
+        Stage("summarize", summarize, workers=NEWS_SUMMARY_WORKERS),
+        Stage("link", link),
+        Stage("score", score, workers=NEWS_SENTIMENT_WORKERS),
+        Stage("persist", persist),
+    ]
+    return stages, flush
+
+def store_articles_db(articles: list, db: Session):
+    """Store the fetched articles in PostgreSQL"""
+    logger.info("Storing articles in PostgreSQL...")
+
+    stats = {"inserted": 0, "failed": 0}
+    new_articles = filter_new_articles(articles)
+    stages, flush = build_article_stages(db, stats)
+    try:
+        Pipeline(stages, queue_size=NEWS_QUEUE_SIZE, name="news").run(new_articles)
+        flush()
+    finally:
+        browser_pool.close()
     
-    db.commit()
-    logger.info(f"{stored_count} articles added to Postgres")
+    logger.info(f"{stats['inserted']} articles added to Postgres")
 
-def run_news_aggregator():
-    """Run the complete News aggregation flow"""
+def run_news_aggregator(force: bool = False):
+    """
+    Run the complete News aggregation flow as one pipeline:
+    poll + dedup -> extract -> summarize -> link -> score -> persist
+    Only feeds whose adaptive poll interval elapsed are polled (all of them with `force`),
+    articles start extracting as soon as their feed is fetched. High-water marks and conditional-GET
+    validators are only saved once every polled article was stored: after a failed batch or an
+    interrupted run the same entries are polled again.
+    """
     logger.info("Starting news aggregation")
     try:
-        articles = fetch_rss_feeds()
-        if not articles:
-            logger.warning(f"No new articles fetched. Exiting.")
-            return
-        
-        db = next(get_db())
-        store_articles_db(articles, db)
+        stats = {"inserted": 0, "failed": 0}
+        seen_hashes = set()
+
+        def fetch_new_articles(feed):
+            return filter_new_articles(poll_feed(feed), seen_hashes)
+
+        with trace("news", "run"), db_session() as db:
+            feeds = due_feeds(db, force=force)
+            cursors = [{field: feed[field] for field in FEED_CURSOR_FIELDS} for feed in feeds]
+            article_stages, flush = build_article_stages(db, stats)
+            stages = [Stage("fetch", fetch_new_articles, workers=NEWS_FETCH_WORKERS, fan_out=True)] + article_stages
+            completed = False
+            try:
+                Pipeline(stages, queue_size=NEWS_QUEUE_SIZE, name="news").run(feeds)
+                flush()
+                completed = not stats['failed']
+            finally:
+                if not completed:
+                    # Polled entries may not all be stored: keep the new schedule, but read them
+                    # again next time, URL dedup drops the ones that made it
+                    for feed, cursor in zip(feeds, cursors):
+                        feed.update(cursor)
+                    db.rollback()
+                try:
+                    save_feeds(db, feeds)
+                except Exception as e:
+                    logger.error(f"Failed to save the feed state: {str(e)}")
 
-        logger.info("News aggregation completed")
+        if not stats['inserted']:
+            logger.warning("No new articles stored.")
+        logger.info(
+            f"News aggregation completed, {stats['inserted']} articles added to Postgres, "
+            f"{stats['failed']} failed to store"
+        )
     except Exception as e:
         logger.error(f"News aggregation failed: {str(e)}")
+    finally:
+        browser_pool.close()
+
+def run_feed_poller():
+    """Keeps aggregating, sleeping until the next feed is due."""
+    while True:
+        run_news_aggregator()
+        try:
+            with db_session() as db:
+                delay = seconds_until_next_poll(db)
+        except Exception as e:
+            logger.error(f"Reading the feed schedule failed: {str(e)}")
+            delay = FEED_MIN_INTERVAL
+        logger.info(f"Next feed poll in {delay:.0f}s")
+        time.sleep(max(delay, 1.0))
 
 if __name__ == "__main__":
-    run_news_aggregator()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Financial news aggregation")
+    parser.add_argument("--loop", action="store_true", help="keep polling feeds on their adaptive schedule")
+    parser.add_argument("--all", action="store_true", help="poll every feed now, ignoring the schedule")
+    args = parser.parse_args()
+    if args.loop:
+        run_feed_poller()
+    else:
+        run_news_aggregator(force=args.all)
@@ -0,0 +1,209 @@
+import argparse
+import base64
+import json
+import os
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from sqlalchemy import case, delete, func, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from core import database
+from core.logger import logger
+from models.news import NewsArticle, NewsSentimentDaily
+
+NEWS_PAGE_SIZE = int(os.getenv("NEWS_PAGE_SIZE", 50))
+NEWS_PAGE_MAX_SIZE = int(os.getenv("NEWS_PAGE_MAX_SIZE", 500))
+# Rows per query while streaming an NDJSON export, each chunk is one keyset page
+NEWS_EXPORT_CHUNK_SIZE = int(os.getenv("NEWS_EXPORT_CHUNK_SIZE", 1000))
+
+SENTIMENTS = ("positive", "neutral", "negative")
+ARTICLE_COLUMNS = (
+    NewsArticle.id, NewsArticle.title, NewsArticle.source, NewsArticle.url,
+    NewsArticle.published_at, NewsArticle.summary, NewsArticle.sentiment, NewsArticle.sentiment_compound,
+    NewsArticle.sentiment_positive, NewsArticle.sentiment_neutral, NewsArticle.sentiment_negative,
+)
+
+
+def encode_cursor(published_at: datetime, article_id) -> str:
+    """Opaque cursor pointing after the article (published_at, id)."""
+    raw = json.dumps([published_at.isoformat(), str(article_id)])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Raises ValueError on cursors that weren't produced by `encode_cursor`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        published_at, article_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(published_at), uuid.UUID(article_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Timestamps are stored as naive UTC, aware bounds like `...Z` or `+02:00` are converted to match."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def articles_statement(limit: int, after: tuple = None, source: str = None, sentiment: str = None,
+                       since: datetime = None, until: datetime = None):
+    """
+    Newest-first page of live articles:
+    - Keyset pagination on (published_at, id), a page costs the same however deep it is
+    - Served by the (published_at, id) index, or the (source | sentiment, published_at, id) ones when filtered
+    """
+    since, until = naive_utc(since), naive_utc(until)
+    statement = select(*ARTICLE_COLUMNS).where(NewsArticle.deleted_at == None)
+    if source:
+        statement = statement.where(NewsArticle.source == source)
+    if sentiment:
+        statement = statement.where(NewsArticle.sentiment == sentiment)
+    if since:
+        statement = statement.where(NewsArticle.published_at >= since)
+    if until:
+        statement = statement.where(NewsArticle.published_at < until)
+    if after:
+        statement = statement.where(tuple_(NewsArticle.published_at, NewsArticle.id) < tuple_(*after))
+    return statement.order_by(NewsArticle.published_at.desc(), NewsArticle.id.desc()).limit(limit)
+
+
+def article_dict(row) -> dict:
+    return {
+        "id": str(row.id),
+        "title": row.title,
+        "source": row.source,
+        "url": row.url,
+        "published_at": row.published_at.isoformat(),
+        "summary": row.summary,
+        "sentiment": row.sentiment,
+        "sentiment_scores": {
+            "compound": row.sentiment_compound,
+            "positive": row.sentiment_positive,
+            "neutral": row.sentiment_neutral,
+            "negative": row.sentiment_negative,
+        } if row.sentiment_compound is not None else None,
+    }
+
+
+async def list_articles(db: AsyncSession, limit: int = NEWS_PAGE_SIZE, cursor: str = None, **filters) -> dict:
+    """One page of articles and the cursor of the next one, None on the last page."""
+    after = decode_cursor(cursor) if cursor else None
+    # One extra row tells whether there is a next page without a COUNT
+    rows = (await db.execute(articles_statement(limit + 1, after, **filters))).all()
+    next_cursor = encode_cursor(rows[limit - 1].published_at, rows[limit - 1].id) if len(rows) > limit else None
+    return {"articles": [article_dict(row) for row in rows[:limit]], "next_cursor": next_cursor}
+
+
+async def export_articles_ndjson(chunk_size: int = NEWS_EXPORT_CHUNK_SIZE, **filters):
+    """
+    Streams every matching article as newline-delimited JSON, newest first:
+    - Walks the range in keyset chunks, memory stays flat and no transaction is held between chunks
+    - Opens its own session, the response outlives the request's dependencies
+    """
+    async with database.AsyncSessionLocal() as db:
+        after = None
+        exported = 0
+        while True:
+            rows = (await db.execute(articles_statement(chunk_size, after, **filters))).all()
+            if not rows:
+                break
+            exported += len(rows)
+            yield "".join(json.dumps(article_dict(row)) + "\n" for row in rows)
+            if len(rows) < chunk_size:
+                break
+            after = (rows[-1].published_at, rows[-1].id)
+            # Ends the read transaction between chunks
+            await db.commit()
+        logger.info(f"Exported {exported} articles as NDJSON")
+
+
+def rollup_counts(articles: list) -> list:
+    """Sentiment counts per (day, source) of the given articles, as news_sentiment_daily rows."""
+    counts = defaultdict(lambda: dict.fromkeys(SENTIMENTS + ("total",), 0))
+    for article in articles:
+        row = counts[(article['published_at'].date(), article['source'])]
+        if article['sentiment'] in SENTIMENTS:
+            row[article['sentiment']] += 1
+        row["total"] += 1
+    return [{"day": day, "source": source, **row} for (day, source), row in counts.items()]
+
+
+def update_sentiment_rollups(db: Session, articles: list):
+    """
+    Adds newly inserted articles to news_sentiment_daily with one upsert incrementing the counters,
+    runs in the caller's transaction so counts and articles commit together.
+    """
+    rows = rollup_counts(articles)
+    if not rows:
+        return
+    insert_for_dialect = sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+    statement = insert_for_dialect(NewsSentimentDaily).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[NewsSentimentDaily.day, NewsSentimentDaily.source],
+        set_={
+            column: getattr(NewsSentimentDaily, column) + getattr(statement.excluded, column)
+            for column in SENTIMENTS + ("total",)
+        },
+    )
+    db.execute(statement)
+
+
+def rebuild_sentiment_rollups(db: Session = None) -> int:
+    """
+    Recomputes news_sentiment_daily from news_articles. Inserts keep it current, everything else doesn't:
+    run it for the initial migration and after soft-deleting or re-labeling articles outside the app
+    (the sentiment backfill rebuilds it itself).
+    """
+    if db is None:
+        with database.db_session() as db:
+            return rebuild_sentiment_rollups(db)
+
+    day = func.date(NewsArticle.published_at)
+    counts = [func.sum(case((NewsArticle.sentiment == sentiment, 1), else_=0)) for sentiment in SENTIMENTS]
+    source = select(day, NewsArticle.source, *counts, func.count()) \
+        .where(NewsArticle.deleted_at == None) \
+        .group_by(day, NewsArticle.source)
+
+    db.execute(delete(NewsSentimentDaily))
+    result = db.execute(insert(NewsSentimentDaily).from_select(["day", "source", *SENTIMENTS, "total"], source))
+    db.commit()
+    logger.info(f"Rebuilt {result.rowcount} sentiment rollup rows")
+    return result.rowcount
+
+
+async def sentiment_rollups(db: AsyncSession, since: date = None, until: date = None, source: str = None,
+                            by_source: bool = True) -> list:
+    """Daily sentiment counts from news_sentiment_daily, per source or summed over sources."""
+    columns = [func.sum(getattr(NewsSentimentDaily, column)).label(column) for column in SENTIMENTS + ("total",)]
+    keys = [NewsSentimentDaily.day, NewsSentimentDaily.source] if by_source else [NewsSentimentDaily.day]
+    statement = select(*keys, *columns).group_by(*keys).order_by(*keys)
+    if since:
+        statement = statement.where(NewsSentimentDaily.day >= since)
+    if until:
+        statement = statement.where(NewsSentimentDaily.day < until)
+    if source:
+        statement = statement.where(NewsSentimentDaily.source == source)
+
+    rollups = []
+    for row in (await db.execute(statement)).mappings():
+        rollup = {column: int(row[column] or 0) for column in SENTIMENTS + ("total",)}
+        rollup["day"] = str(row["day"])
+        if by_source:
+            rollup["source"] = row["source"]
+        rollups.append(rollup)
+    return rollups
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="News read path maintenance")
+    parser.add_argument("--rebuild-rollups", action="store_true", help="recompute news_sentiment_daily from news_articles")
+    args = parser.parse_args()
+    if args.rebuild_rollups:
+        rebuild_sentiment_rollups()
+    else:
+        parser.print_help()
@@ -1,77 +1,105 @@
-from collections import defaultdict
-from core.database import get_db
+import asyncio
+import os
+import uuid
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from core.database import db_session
 from core.logger import logger
-from core.pinecone_client import get_glossary_index
+from core.metrics import span, trace
 from models.glossary import GlossaryTerm
-from services.embedding_service import generate_embedding
-from utils.nlp_preprocessors import keyword_extraction, preprocess_user_query
+from services.embedding_cache import normalize_text
+from services.lexical_index import lexical_search, lexical_search_async, lexical_search_many, lexical_search_many_async
+from services.result_cache import RESULT_CACHE_ENABLED, result_cache
+from services.embedding_service import generate_embedding, generate_embedding_async, generate_embeddings, glossary_text
+from services.glossary_snapshot import HYDRATED_TERMS, glossary_snapshot
+from services.term_vector_store import term_vector_store
+from services.vector_index import get_vector_index
+from utils.nlp_preprocessors import get_query_analyzer, keyword_extraction
 import numpy as np
 
-def filter_sql(query: str):
+# Largest SQL candidate set passed to the vector index as an id filter
+HYBRID_FILTER_MAX_IDS = int(os.getenv("HYBRID_FILTER_MAX_IDS", 1000))
+# Share of the lexical score in the hybrid rerank score
+LEXICAL_WEIGHT = float(os.getenv("LEXICAL_WEIGHT", 0.3))
+
+def filter_sql(query: str, db: Session):
     """
     SQL Filtering with Query Expansion:
-    - Tokenizes the query & Removes stopwords
-    - Searches for individual keywords in PostgreSQL
+    - Extracts keyword phrases from the query
+    - Searches them in the lexical index (Postgres full-text/trigram, in-memory BM25 elsewhere)
+    - Returns {term_id: lexical score} best first, rows are hydrated once for all candidates
     """
 
-    db = next(get_db())
-    keywords = keyword_extraction(query)
+    with span("search", "query_analysis"):
+        keywords = keyword_extraction(query)
 
     if not keywords:
         logger.warning("No valid keywords found in user query")
-        return []
+        return {}
     
-    logger.info(f"Performing SQL filtering for keywords: {keywords}")
-
-    db_query = db.query(GlossaryTerm).filter(GlossaryTerm.deleted_at == None)
-
-    keyword_filters = [
-        (GlossaryTerm.term.ilike(f"%{kw}%"))
-        for kw in keywords
-    ]
-
-    # Combine filters with OR logic
-    final_filter = keyword_filters[0]
-    for keyword_filter in keyword_filters[1:]:
-        final_filter |= keyword_filter
+    logger.debug("Performing SQL filtering for keywords: %s", keywords)
 
-    db_query = db_query.filter(final_filter)
+    with span("search", "sql_filter"):
+        lexical_scores = lexical_search(db, keywords)
 
-    filtered_terms = db_query.all()
+    logger.info(f"Filtered {len(lexical_scores)} terms using expanded SQL filtering")
+    return lexical_scores
 
-    logger.info(f"Filtered {len(filtered_terms)} terms using expanded SQL filtering")
-    return filtered_terms
+def cosine_scores(query_embeddings, candidate_embeddings: np.ndarray) -> np.ndarray:
+    """
+    Vectorized cosine similarity of one query vector against a matrix of candidates.
+    """
+    query_vec = np.asarray(query_embeddings, dtype=np.float32)
+    candidate_norms = np.linalg.norm(candidate_embeddings, axis=1) * np.linalg.norm(query_vec)
+    # Guard against zero vectors instead of producing NaNs
+    candidate_norms[candidate_norms == 0] = 1.0
+    return (candidate_embeddings @ query_vec) / candidate_norms
 
-def rerank_results(results: list, query_embeddings: list, sql_boost: float = 0.95):
+def rerank_results(results: list, query_embeddings: list, lexical_weight: float = LEXICAL_WEIGHT):
     """
     Reranks the RAG results with hybrid scoring:
-    - SQL-filtered results get a boost
-    - Cosine score for Pinecone results
+    - Cosine score against the query for every candidate
+    - Blended with the candidate's lexical score: (1 - lexical_weight) * cosine + lexical_weight * lexical
     """
-    logger.info("Starting reranking with SQL & Exact Match Boosting...")
+    logger.info("Starting hybrid reranking...")
     if not results:
         logger.warning("No results to rerank.")
         return []
 
-    reranked_results = []
-    for result in results:
-        term = result['term']
-        definition = result['definition']
-
-        candidate_text = f"{term}"
-        candidate_text_embeddings = generate_embedding(candidate_text)
-
-        # cosine similarity
-        cos_score = np.dot(query_embeddings, candidate_text_embeddings) / (
-            np.linalg.norm(query_embeddings) * np.linalg.norm(candidate_text_embeddings)
+    # Vector matches already carry a cosine score, SQL-only matches need one.
+    # Their vectors come from the local term vector store, anything missing or stale
+    # is embedded in a single request (through the embedding cache) and all candidates are scored in one shot.
+    unscored_positions = [i for i, result in enumerate(results) if 'cos_score' not in result]
+    unscored_scores = {}
+    if unscored_positions:
+        candidate_embeddings, found = term_vector_store.lookup(
+            [results[i]['id'] for i in unscored_positions],
+            [results[i].get('updated_at') for i in unscored_positions]
         )
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            logger.info(f"{len(missing)} SQL candidates missing from the term vector store, embedding them")
+            missing_results = [results[unscored_positions[i]] for i in missing]
+            missing_texts = [
+                glossary_text(result['term'], result['definition'], result['simplified_explanation'])
+                for result in missing_results
+            ]
+            # Served from the embedding cache on later searches, keyed by the glossary text so edits
+            # miss it. The store itself is only written by the embedding job.
+            missing_embeddings = generate_embeddings(missing_texts)
+            if len(missing_embeddings) == len(missing_texts):
+                candidate_embeddings[missing] = missing_embeddings
+            else:
+                logger.warning("Could not embed missing SQL candidates, scoring them as 0")
 
-        base_score = cos_score
-        # SQL boost
-        if result.get('from_sql', False):
-            base_score *= sql_boost
-        else:
-            base_score = result.get('cos_score', 1)
+        cos_scores = cosine_scores(query_embeddings, candidate_embeddings)
+        unscored_scores = dict(zip(unscored_positions, cos_scores.tolist()))
+
+    reranked_results = []
+    for i, result in enumerate(results):
+        cos_score = result['cos_score'] if 'cos_score' in result else unscored_scores.get(i, 0.0)
+        base_score = (1 - lexical_weight) * cos_score + lexical_weight * result.get('lexical_score', 0.0)
         
         reranked_results.append({
             "term": result['term'],
@@ -84,79 +112,431 @@ def rerank_results(results: list, query_embeddings: list, sql_boost: float = 0.9
 
     # Sort results by score
     reranked_results.sort(key=lambda x: x['score'], reverse=True)
-    logger.info("Reranking completed with OpenAI embeddings.")
+    logger.info("Reranking completed.")
     return reranked_results
 
-def retrieve_glossary_rag(query: str, top_k: int = 5):
+def plan_retrieval(filtered_ids: list, top_k: int, filters_all_ids: bool = True,
+                   max_filter_ids: int = HYBRID_FILTER_MAX_IDS) -> dict:
+    """
+    Decides how SQL candidates and vector search are combined:
+    - Few SQL candidates (<= top_k): keep them all, the vector search only adds semantic neighbours
+    - More than top_k: also run a vector search restricted to the SQL candidates and keep
+      only the top_k closest of them instead of hydrating and reranking every keyword hit
+    - Too many to pass as an id filter: keep them all and let the reranker sort them out
+    - Index that can't filter on every vector id (`filters_all_ids`): the restricted search could
+      miss candidates, so they are all kept and the extra round-trip is skipped
+    """
+    restrict = filters_all_ids and top_k < len(filtered_ids) <= max_filter_ids
+    if len(filtered_ids) > max_filter_ids:
+        logger.warning(f"{len(filtered_ids)} SQL candidates exceed the id filter limit of {max_filter_ids}, not restricting vector search")
+    return {
+        "restrict_ids": filtered_ids if restrict else None,
+        "keep_sql_ids": [] if restrict else filtered_ids,
+    }
+
+def merge_candidates(plan: dict, restricted_matches: list, matches: list) -> dict:
+    """
+    Merges SQL and vector candidates keyed by id, SQL matches win over pure vector matches.
+    """
+    candidates = {term_id: {"from_sql": True} for term_id in plan['keep_sql_ids']}
+
+    if plan['restrict_ids'] and not restricted_matches:
+        # Vectors upserted before the id metadata existed can't be filtered on
+        logger.warning("Restricted vector search returned nothing, keeping all SQL candidates")
+        restricted_matches = [{"id": term_id} for term_id in plan['restrict_ids']]
+    for match in restricted_matches:
+        candidates[match['id']] = {"from_sql": True}
+        if 'score' in match:
+            candidates[match['id']]['cos_score'] = match['score']
+
+    for match in matches:
+        candidate = candidates.setdefault(match['id'], {"from_sql": False})
+        candidate.setdefault('cos_score', match['score'])
+    return candidates
+
+def hydration_statement(candidates: dict):
+    """Single query fetching every candidate row."""
+    return select(GlossaryTerm).where(
+        GlossaryTerm.id.in_([uuid.UUID(term_id) for term_id in candidates]),
+        GlossaryTerm.deleted_at == None
+    )
+
+def hydrate_candidates(db: Session, candidates) -> list:
+    """
+    Candidate rows from the in-memory glossary snapshot, only ids it doesn't have yet are read from the database.
+    All of them are while the snapshot lags behind the glossary version.
+    """
+    glossary_snapshot.check_version(db)
+    glossary_terms, missing = glossary_snapshot.get_many(candidates)
+    if missing:
+        glossary_terms += db.execute(hydration_statement(missing)).scalars().all()
+        HYDRATED_TERMS.inc(len(missing), source="database")
+    return glossary_terms
+
+async def hydrate_candidates_async(db: AsyncSession, candidates) -> list:
+    await glossary_snapshot.check_version_async(db)
+    glossary_terms, missing = glossary_snapshot.get_many(candidates)
+    if missing:
+        glossary_terms += (await db.execute(hydration_statement(missing))).scalars().all()
+        HYDRATED_TERMS.inc(len(missing), source="database")
+    return glossary_terms
+
+def build_results(glossary_terms: list, candidates: dict, lexical_scores: dict) -> list:
+    results = []
+    for term in glossary_terms:
+        candidate = candidates[str(term.id)]
+        result = {
+            "id": str(term.id),
+            "updated_at": term.updated_at,
+            "term": term.term,
+            "definition": term.definition,
+            "simplified_explanation": term.simplified_explanation,
+            "contextual_example": term.contextual_examples,
+            "from_sql": candidate['from_sql'],  # Flag for lexical matches
+            "lexical_score": lexical_scores.get(str(term.id), 0.0)
+        }
+        if 'cos_score' in candidate:
+            result["cos_score"] = candidate['cos_score']
+        results.append(result)
+    return results
+
+def retrieve_glossary_rag(query: str, top_k: int = 5, db: Session = None, use_cache: bool = RESULT_CACHE_ENABLED):
+    """
+    Cached hybrid RAG retrieval, see `compute_glossary_rag` for the pipeline.
+    All queries share one session, `db` or a pooled one held for the duration of the call.
+    """
+    if db is None:
+        with db_session() as db:
+            return retrieve_glossary_rag(query, top_k, db, use_cache)
+
+    with trace("search"):
+        if not use_cache:
+            return compute_glossary_rag(query, top_k, db)
+        try:
+            key = result_cache.key(query, top_k, result_cache.version(db))
+        except Exception as e:
+            logger.error(f"Result cache unavailable: {str(e)}")
+            return compute_glossary_rag(query, top_k, db)
+        return result_cache.get_or_compute(key, lambda: compute_glossary_rag(query, top_k, db))
+
+def compute_glossary_rag(query: str, top_k: int, db: Session):
     """
     Optimized Hybrid RAG retrieval:
     - SQL filtering with query expansion
-    - Pinecone vector search with filtered IDs
+    - Vector search, restricted to the SQL candidates when there are more of them than top_k
+    - Single hydration of the merged candidates, from the glossary snapshot
     - LLM-based reranking
     """
     logger.info(f"Performing RAG retrieval for query: {query}")
     
     try:
         # SQL Filtering with Query Expansion
-        filtered_terms = filter_sql(query)
-        filtered_ids = [str(term.id) for term in filtered_terms]
-        logger.info(f"Filtered ids to search in Pinecone: {filtered_ids}")
-        if not filtered_terms:
+        lexical_scores = filter_sql(query, db)
+        if not lexical_scores:
             logger.warning("No matching terms found in SQL filtering.")
+        index = get_vector_index()
+        plan = plan_retrieval(list(lexical_scores), top_k, index.filters_all_ids)
         
-        # Pinecone Vector Retrieval (with filtered IDs)
-        query_embedding = generate_embedding(query)
+        with span("search", "embed"):
+            query_embedding = generate_embedding(query)
 
-        index = get_glossary_index()
-        logger.info(f"Searching pincone for top {top_k} similar vectors...")
+        restricted_matches = []
+        if plan['restrict_ids']:
+            logger.info(f"Searching vector index for top {top_k} of {len(plan['restrict_ids'])} SQL candidates...")
+            with span("search", "vector_search_restricted"):
+                restricted_matches = index.query(query_embedding, top_k, ids=plan['restrict_ids'])
 
-        search_results = index.query(
-            vector=query_embedding,
-            top_k=top_k,
-            include_values=False,
-            include_scores=True
-        )
+        logger.info(f"Searching vector index for top {top_k} similar vectors...")
+        with span("search", "vector_search"):
+            matches = index.query(query_embedding, top_k)
+        logger.info(f"Found {len(matches)} matching terms in vector index")
+        candidates = merge_candidates(plan, restricted_matches, matches)
 
-        logger.info(f"Found {len(search_results['matches'])} matching terms in pincone")
-        pincone_ids = [match['id'] for match in search_results['matches']]
-        pincone_scores = [match['score'] for match in search_results['matches']]
-        pinecone_id_score = defaultdict(float)
-        for i, id in enumerate(pincone_ids):
-            pinecone_id_score[id] = pincone_scores[i]
-
-        db = next(get_db())
-        glossary_terms = db.query(GlossaryTerm).filter(GlossaryTerm.id.in_(pincone_ids)).all()
-
-        results = []
-        # Combine SQL + Pinecone Results
-        # Add SQL terms to results with `from_sql=True`
-        for term in filtered_terms:
-            results.append({
-                "term": term.term,
-                "definition": term.definition,
-                "simplified_explanation": term.simplified_explanation,
-                "contextual_example": term.contextual_examples,
-                "from_sql": True  # Flag for SQL-boosted terms
-            })
-        
-        # Add Pinecone terms with `from_sql=False`
-        for i, term in enumerate(glossary_terms):
-            # Prevent duplicates (SQL + Pinecone)
-            if not any(res['term'] == term.term for res in results):
-                results.append({
-                    "term": term.term,
-                    "definition": term.definition,
-                    "simplified_explanation": term.simplified_explanation,
-                    "contextual_example": term.contextual_examples,
-                    "from_sql": False,  # Non-SQL terms
-                    "cos_score": pinecone_id_score[str(term.id)]
-                })
+        with span("search", "hydrate"):
+            glossary_terms = hydrate_candidates(db, candidates)
+            results = build_results(glossary_terms, candidates, lexical_scores)
 
         # Reranking
         logger.info("Reranking results...")
-        reranked_results = rerank_results(results, query_embedding)
+        with span("search", "rerank"):
+            reranked_results = rerank_results(results, query_embedding)
         logger.info(f"RAG retrieval with reranking completed")
         return reranked_results
     except Exception as e:
         logger.error(f"Error in retrieval service: {str(e)}")
-        return []
\ No newline at end of file
+        return []
+
+async def filter_sql_async(query: str, db: AsyncSession):
+    """Async `filter_sql`."""
+    with span("search", "query_analysis"):
+        keywords = keyword_extraction(query)
+
+    if not keywords:
+        logger.warning("No valid keywords found in user query")
+        return {}
+
+    logger.debug("Performing SQL filtering for keywords: %s", keywords)
+    with span("search", "sql_filter"):
+        lexical_scores = await lexical_search_async(db, keywords)
+    logger.info(f"Filtered {len(lexical_scores)} terms using expanded SQL filtering")
+    return lexical_scores
+
+async def retrieve_glossary_rag_async(query: str, db: AsyncSession, top_k: int = 5, use_cache: bool = RESULT_CACHE_ENABLED):
+    """Non-blocking, cached `retrieve_glossary_rag`."""
+    with trace("search"):
+        if not use_cache:
+            return await compute_glossary_rag_async(query, db, top_k)
+        try:
+            key = result_cache.key(query, top_k, await result_cache.version_async())
+        except Exception as e:
+            logger.error(f"Result cache unavailable: {str(e)}")
+            return await compute_glossary_rag_async(query, db, top_k)
+        return await result_cache.get_or_compute_async(key, lambda session: compute_glossary_rag_async(query, session, top_k))
+
+async def compute_glossary_rag_async(query: str, db: AsyncSession, top_k: int = 5):
+    """
+    Non-blocking `compute_glossary_rag`:
+    - SQL filtering runs concurrently with query embedding + unfiltered vector search
+    - The restricted vector search (if planned) and hydration run once both are done
+    - Reranking runs in a worker thread, it may have to embed missing candidates
+    """
+    logger.info(f"Performing async RAG retrieval for query: {query}")
+
+    try:
+        index = get_vector_index()
+
+        async def embed_and_search():
+            with span("search", "embed"):
+                query_embedding = await generate_embedding_async(query)
+            if not query_embedding:
+                return query_embedding, []
+            logger.info(f"Searching vector index for top {top_k} similar vectors...")
+            with span("search", "vector_search"):
+                return query_embedding, await index.query_async(query_embedding, top_k)
+
+        lexical_scores, (query_embedding, matches) = await asyncio.gather(
+            filter_sql_async(query, db),
+            embed_and_search()
+        )
+        if not query_embedding:
+            logger.error("Query embedding failed, aborting retrieval")
+            return []
+        logger.info(f"Found {len(matches)} matching terms in vector index")
+        if not lexical_scores:
+            logger.warning("No matching terms found in SQL filtering.")
+
+        plan = plan_retrieval(list(lexical_scores), top_k, index.filters_all_ids)
+        restricted_matches = []
+        if plan['restrict_ids']:
+            logger.info(f"Searching vector index for top {top_k} of {len(plan['restrict_ids'])} SQL candidates...")
+            with span("search", "vector_search_restricted"):
+                restricted_matches = await index.query_async(query_embedding, top_k, ids=plan['restrict_ids'])
+        candidates = merge_candidates(plan, restricted_matches, matches)
+
+        with span("search", "hydrate"):
+            glossary_terms = await hydrate_candidates_async(db, candidates)
+            results = build_results(glossary_terms, candidates, lexical_scores)
+
+        logger.info("Reranking results...")
+        with span("search", "rerank"):
+            reranked_results = await asyncio.to_thread(rerank_results, results, query_embedding)
+        logger.info(f"Async RAG retrieval with reranking completed")
+        return reranked_results
+    except Exception as e:
+        logger.error(f"Error in async retrieval service: {str(e)}")
+        return []
+
+def score_unscored_candidates(batch_results: list, query_matrix: np.ndarray):
+    """
+    Sets `cos_score` on the SQL-only candidates of every query of a batch, with one term vector
+    store lookup and at most one embedding request for all of them.
+    """
+    unscored = {}
+    for results in batch_results:
+        for result in results:
+            if 'cos_score' not in result:
+                unscored.setdefault(result['id'], result)
+    if not unscored:
+        return
+
+    term_ids = list(unscored)
+    vectors, found = term_vector_store.lookup(term_ids, [unscored[term_id].get('updated_at') for term_id in term_ids])
+    missing = np.flatnonzero(~found)
+    if len(missing):
+        logger.info(f"{len(missing)} SQL candidates missing from the term vector store, embedding them")
+        missing_texts = [
+            glossary_text(unscored[term_ids[i]]['term'], unscored[term_ids[i]]['definition'], unscored[term_ids[i]]['simplified_explanation'])
+            for i in missing
+        ]
+        missing_embeddings = generate_embeddings(missing_texts)
+        if len(missing_embeddings) == len(missing_texts):
+            vectors[missing] = missing_embeddings
+        else:
+            logger.warning("Could not embed missing SQL candidates, scoring them as 0")
+
+    positions = {term_id: position for position, term_id in enumerate(term_ids)}
+    for query_position, results in enumerate(batch_results):
+        pending = [result for result in results if 'cos_score' not in result]
+        if pending:
+            scores = cosine_scores(query_matrix[query_position], vectors[[positions[result['id']] for result in pending]])
+            for result, score in zip(pending, scores.tolist()):
+                result['cos_score'] = score
+
+def rerank_batch(glossary_terms: list, batch_candidates: list, batch_lexical_scores: list, query_matrix: np.ndarray) -> list:
+    terms_by_id = {str(term.id): term for term in glossary_terms}
+    batch_results = [
+        build_results([terms_by_id[term_id] for term_id in candidates if term_id in terms_by_id], candidates, lexical_scores)
+        for candidates, lexical_scores in zip(batch_candidates, batch_lexical_scores)
+    ]
+    score_unscored_candidates(batch_results, query_matrix)
+    return [rerank_results(results, query_matrix[i]) for i, results in enumerate(batch_results)]
+
+def plan_batch(batch_lexical_scores: list, top_k: int, filters_all_ids: bool = True) -> tuple:
+    """Retrieval plans of a batch, and the positions of the queries needing a restricted vector search."""
+    plans = [plan_retrieval(list(lexical_scores), top_k, filters_all_ids) for lexical_scores in batch_lexical_scores]
+    return plans, [i for i, plan in enumerate(plans) if plan['restrict_ids']]
+
+def compute_glossary_rag_batch(queries: list, top_k: int, db: Session) -> list:
+    """
+    Batch form of `compute_glossary_rag`, one reranked result list per query:
+    - Keyword extraction for all queries at once, all lexical searches in one round-trip
+    - One embedding request for all queries, vector searches batched (a single matrix product
+      on the local index)
+    - One hydration for the candidates of every query
+    """
+    logger.info(f"Performing batch RAG retrieval for {len(queries)} queries")
+    try:
+        keyword_lists = [list(analysis.keywords) for analysis in get_query_analyzer().analyze_many(queries)]
+        batch_lexical_scores = lexical_search_many(db, keyword_lists)
+
+        query_matrix = generate_embeddings(queries)
+        if len(query_matrix) != len(queries):
+            logger.error("Batch query embedding failed, aborting retrieval")
+            return [[] for _ in queries]
+
+        index = get_vector_index()
+        matches = index.query_many(query_matrix, top_k)
+        plans, restricted_positions = plan_batch(batch_lexical_scores, top_k, index.filters_all_ids)
+        restricted = index.query_many(
+            query_matrix[restricted_positions], top_k, ids=[plans[i]['restrict_ids'] for i in restricted_positions]
+        ) if restricted_positions else []
+        restricted_matches = dict(zip(restricted_positions, restricted))
+        batch_candidates = [
+            merge_candidates(plan, restricted_matches.get(i, []), matches[i])
+            for i, plan in enumerate(plans)
+        ]
+
+        all_candidates = {term_id for candidates in batch_candidates for term_id in candidates}
+        glossary_terms = hydrate_candidates(db, all_candidates)
+        return rerank_batch(glossary_terms, batch_candidates, batch_lexical_scores, query_matrix)
+    except Exception as e:
+        logger.error(f"Error in batch retrieval service: {str(e)}")
+        return [[] for _ in queries]
+
+async def compute_glossary_rag_batch_async(queries: list, db: AsyncSession, top_k: int) -> list:
+    """Non-blocking `compute_glossary_rag_batch`, lexical search runs concurrently with embedding + vector search."""
+    logger.info(f"Performing async batch RAG retrieval for {len(queries)} queries")
+    try:
+        keyword_lists = [list(analysis.keywords) for analysis in get_query_analyzer().analyze_many(queries)]
+        index = get_vector_index()
+
+        async def embed_and_search():
+            query_matrix = await asyncio.to_thread(generate_embeddings, queries)
+            if len(query_matrix) != len(queries):
+                return query_matrix, []
+            return query_matrix, await index.query_many_async(query_matrix, top_k)
+
+        batch_lexical_scores, (query_matrix, matches) = await asyncio.gather(
+            lexical_search_many_async(db, keyword_lists),
+            embed_and_search()
+        )
+        if len(query_matrix) != len(queries):
+            logger.error("Batch query embedding failed, aborting retrieval")
+            return [[] for _ in queries]
+
+        plans, restricted_positions = plan_batch(batch_lexical_scores, top_k, index.filters_all_ids)
+        restricted = await index.query_many_async(
+            query_matrix[restricted_positions], top_k, ids=[plans[i]['restrict_ids'] for i in restricted_positions]
+        ) if restricted_positions else []
+        restricted_matches = dict(zip(restricted_positions, restricted))
+        batch_candidates = [
+            merge_candidates(plan, restricted_matches.get(i, []), matches[i])
+            for i, plan in enumerate(plans)
+        ]
+
+        all_candidates = {term_id for candidates in batch_candidates for term_id in candidates}
+        glossary_terms = await hydrate_candidates_async(db, all_candidates)
+        return await asyncio.to_thread(rerank_batch, glossary_terms, batch_candidates, batch_lexical_scores, query_matrix)
+    except Exception as e:
+        logger.error(f"Error in async batch retrieval service: {str(e)}")
+        return [[] for _ in queries]
+
+def distinct_queries(queries: list) -> dict:
+    """{normalized query: first original spelling}, duplicates of a batch are computed once."""
+    distinct = {}
+    for query in queries:
+        distinct.setdefault(normalize_text(query), query)
+    return distinct
+
+def retrieve_glossary_rag_batch(queries: list, top_k: int = 5, db: Session = None, use_cache: bool = RESULT_CACHE_ENABLED) -> list:
+    """
+    Batch `retrieve_glossary_rag`: one result list per query, in input order.
+    Cached and duplicate queries are served without recomputation, the rest go through
+    `compute_glossary_rag_batch` together.
+    """
+    if db is None:
+        with db_session() as db:
+            return retrieve_glossary_rag_batch(queries, top_k, db, use_cache)
+
+    distinct = distinct_queries(queries)
+    normalized = list(distinct)
+    keys = []
+    results = {}
+    if use_cache:
+        try:
+            version = result_cache.version(db)
+        except Exception as e:
+            logger.error(f"Result cache unavailable: {str(e)}")
+            use_cache = False
+    if use_cache:
+        keys = [result_cache.key(distinct[text], top_k, version) for text in normalized]
+        results = {text: cached for text, cached in zip(normalized, result_cache.get_many(keys)) if cached is not None}
+
+    pending = [i for i, text in enumerate(normalized) if text not in results]
+    if pending:
+        with trace("search_batch"):
+            computed = compute_glossary_rag_batch([distinct[normalized[i]] for i in pending], top_k, db)
+        results.update({normalized[i]: query_results for i, query_results in zip(pending, computed)})
+        if use_cache:
+            result_cache.put_many([keys[i] for i in pending], computed)
+
+    logger.info(f"Batch retrieval of {len(queries)} queries: {len(pending)} computed, {len(normalized) - len(pending)} cached")
+    return [results[normalize_text(query)] for query in queries]
+
+async def retrieve_glossary_rag_batch_async(queries: list, db: AsyncSession, top_k: int = 5, use_cache: bool = RESULT_CACHE_ENABLED) -> list:
+    """Non-blocking `retrieve_glossary_rag_batch`."""
+    distinct = distinct_queries(queries)
+    normalized = list(distinct)
+    keys = []
+    results = {}
+    if use_cache:
+        try:
+            version = await result_cache.version_async()
+        except Exception as e:
+            logger.error(f"Result cache unavailable: {str(e)}")
+            use_cache = False
+    if use_cache:
+        keys = [result_cache.key(distinct[text], top_k, version) for text in normalized]
+        cached = await result_cache.get_many_async(keys)
+        results = {text: query_results for text, query_results in zip(normalized, cached) if query_results is not None}
+
+    pending = [i for i, text in enumerate(normalized) if text not in results]
+    if pending:
+        with trace("search_batch"):
+            computed = await compute_glossary_rag_batch_async([distinct[normalized[i]] for i in pending], db, top_k)
+        results.update({normalized[i]: query_results for i, query_results in zip(pending, computed)})
+        if use_cache:
+            await result_cache.put_many_async([keys[i] for i in pending], computed)
+
+    logger.info(f"Batch retrieval of {len(queries)} queries: {len(pending)} computed, {len(normalized) - len(pending)} cached")
+    return [results[normalize_text(query)] for query in queries]
@@ -0,0 +1,296 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from sqlalchemy import func, select
+from core import database
+from core.logger import logger
+from models.glossary import GlossaryTerm
+from services.embedding_cache import normalize_text
+from services.glossary_snapshot import format_version, glossary_snapshot
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 2048))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", 600))
+# How long a glossary version read from the database is trusted, bounds staleness after writes
+# made by other processes (embedding jobs, manual edits)
+RESULT_CACHE_VERSION_TTL = float(os.getenv("RESULT_CACHE_VERSION_TTL", 5))
+# Shared backend for multi-worker deployments (redis://...), in-process when unset
+RESULT_CACHE_URL = os.getenv("RESULT_CACHE_URL")
+
+VERSION_KEY = "glossary:results:version"
+
+
+class InMemoryResultCacheBackend:
+    """Per-process LRU with a TTL per entry."""
+
+    remote = False
+
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() > expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def version(self) -> int:
+        return self._version
+
+    def bump_version(self):
+        with self._lock:
+            self._version += 1
+            # Old entries can never be hit again, free them right away
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisResultCacheBackend:
+    """Redis backed cache shared by all workers, requires the `redis` package."""
+
+    remote = True
+
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str):
+        raw = self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value, ttl: float):
+        self.client.set(key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def version(self) -> int:
+        return int(self.client.get(VERSION_KEY) or 0)
+
+    def bump_version(self):
+        # Entries of older versions are left to expire with their TTL
+        self.client.incr(VERSION_KEY)
+
+    def size(self) -> int:
+        return self.client.dbsize()
+
+
+class ResultCache:
+    """
+    Cache of `retrieve_glossary_rag` results keyed on (glossary version, top_k, normalized query):
+    - The version combines the backend's counter, bumped by `invalidate()` after glossary or
+      vector writes, with the glossary table's (count, max updated_at, max embedded_at), so writes
+      made elsewhere are picked up within RESULT_CACHE_VERSION_TTL seconds
+    - The same read is handed to the glossary snapshot, which hydrates results only while it matches
+      that version: a result is never cached under a version newer than the rows it was built from
+    - Concurrent misses for the same key are coalesced, only the first one computes
+    - Empty results aren't cached, they're also what a failed retrieval returns
+    """
+
+    _version_statement = select(
+        func.count(GlossaryTerm.id), func.max(GlossaryTerm.updated_at), func.max(GlossaryTerm.embedded_at)
+    ).where(GlossaryTerm.deleted_at == None)
+
+    def __init__(self, backend, ttl: float = RESULT_CACHE_TTL, version_ttl: float = RESULT_CACHE_VERSION_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.version_ttl = version_ttl
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = 0.0
+        self._version_lock = threading.Lock()
+        self._version_task = None
+        self._inflight = {}
+        self._inflight_async = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key(query: str, top_k: int, version: str) -> str:
+        digest = hashlib.sha256(normalize_text(query).encode("utf-8")).hexdigest()
+        return f"glossary:results:{version}:{top_k}:{digest}"
+
+    def _make_version(self, db_version: tuple) -> str:
+        count, updated_at, embedded_at = db_version
+        glossary_snapshot.observe_version(format_version(count, updated_at))
+        return hashlib.sha1(f"{self.backend.version()}|{count}|{updated_at}|{embedded_at}".encode()).hexdigest()[:16]
+
+    def _version_is_fresh(self) -> bool:
+        return self._version is not None and time.monotonic() - self._version_checked_at <= self.version_ttl
+
+    def version(self, db) -> str:
+        """Current cache version, re-read at most every `version_ttl` seconds by one caller at a time."""
+        if self._version_is_fresh():
+            return self._version
+        with self._version_lock:
+            if not self._version_is_fresh():
+                self._version = self._make_version(tuple(db.execute(self._version_statement).one()))
+                self._version_checked_at = time.monotonic()
+            return self._version
+
+    async def _refresh_version_async(self) -> str:
+        # Own session: the task outlives the request that started it if that request is cancelled
+        async with database.AsyncSessionLocal() as db:
+            db_version = tuple((await db.execute(self._version_statement)).one())
+        self._version = await self._call(self._make_version, db_version)
+        self._version_checked_at = time.monotonic()
+        return self._version
+
+    async def version_async(self) -> str:
+        """Async `version`, concurrent refreshes share one query."""
+        if self._version_is_fresh():
+            return self._version
+        if self._version_task is None:
+            self._version_task = asyncio.ensure_future(self._refresh_version_async())
+            self._version_task.add_done_callback(lambda _: setattr(self, "_version_task", None))
+        return await asyncio.shield(self._version_task)
+
+    def invalidate(self):
+        """Drops every cached result, call after writing glossary rows or vectors."""
+        try:
+            self.backend.bump_version()
+        except Exception as e:
+            logger.error(f"Result cache invalidation failed: {str(e)}")
+        self._version = None
+        logger.info("Result cache invalidated")
+
+    async def _call(self, func, *args):
+        # Remote backends do network I/O, keep it off the event loop
+        if self.backend.remote:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    def get(self, key: str):
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            logger.error(f"Result cache read failed: {str(e)}")
+            return None
+
+    def put(self, key: str, results: list):
+        if not results:
+            return
+        try:
+            self.backend.set(key, results, self.ttl)
+        except Exception as e:
+            logger.error(f"Result cache write failed: {str(e)}")
+
+    def get_many(self, keys: list) -> list:
+        """Cached results aligned with `keys`, None for misses. Used by batch searches."""
+        results = [self.get(key) for key in keys]
+        hits = sum(cached is not None for cached in results)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return results
+
+    def put_many(self, keys: list, results_list: list):
+        for key, results in zip(keys, results_list):
+            self.put(key, results)
+
+    async def get_many_async(self, keys: list) -> list:
+        return await self._call(self.get_many, keys)
+
+    async def put_many_async(self, keys: list, results_list: list):
+        await self._call(self.put_many, keys, results_list)
+
+    def get_or_compute(self, key: str, compute) -> list:
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            self.coalesced += 1
+            return future.result()
+
+        self.misses += 1
+        try:
+            results = compute()
+            self.put(key, results)
+            future.set_result(results)
+            return results
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def _compute_async(self, key: str, compute) -> list:
+        # Own session, not the leader request's: it is closed if that request is cancelled
+        # while the shared computation and its followers still need one
+        async with database.AsyncSessionLocal() as db:
+            results = await compute(db)
+        await self._call(self.put, key, results)
+        return results
+
+    async def get_or_compute_async(self, key: str, compute) -> list:
+        """`get_or_compute` for coroutines, `compute` is a coroutine function taking an `AsyncSession`."""
+        cached = await self._call(self.get, key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        task = self._inflight_async.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._compute_async(key, compute))
+            self._inflight_async[key] = task
+            task.add_done_callback(lambda _: self._inflight_async.pop(key, None))
+        else:
+            self.coalesced += 1
+        # A cancelled request must not cancel the computation other requests are waiting on
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "backend": "redis" if self.backend.remote else "memory",
+            "size": self.backend.size() if not self.backend.remote else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "version": self._version,
+        }
+
+
+def create_result_cache() -> ResultCache:
+    backend = None
+    if RESULT_CACHE_URL:
+        try:
+            backend = RedisResultCacheBackend(RESULT_CACHE_URL)
+            logger.info("Result cache using shared redis backend")
+        except Exception as e:
+            logger.error(f"Result cache redis backend unavailable, falling back to in-process: {str(e)}")
+    return ResultCache(backend or InMemoryResultCacheBackend())
+
+
+result_cache = create_result_cache()
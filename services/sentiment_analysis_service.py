@@ -1,32 +1,243 @@
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
 from core.logger import logger
+from utils.nlp_preprocessors import split_sentences
+
+# Worker processes of `score_texts`, and texts per task sent to a worker
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", os.cpu_count() or 1))
+SENTIMENT_CHUNK_SIZE = int(os.getenv("SENTIMENT_CHUNK_SIZE", 256))
+# Optional "word<TAB>valence" file, merged over the finance lexicon below
+SENTIMENT_LEXICON_FILE = os.getenv("SENTIMENT_LEXICON_FILE")
+# Articles per committed chunk when backfilling scores (python -m services.sentiment_analysis_service --backfill)
+SENTIMENT_BACKFILL_CHUNK_SIZE = int(os.getenv("SENTIMENT_BACKFILL_CHUNK_SIZE", 2000))
+
+# VADER was built on social media text: it misses market vocabulary ("bullish", "downgrade")
+# and has nothing for words like "surge". Valences use VADER's -4..4 scale
+FINANCE_LEXICON = {
+    **dict.fromkeys(["bullish", "outperform", "outperforms", "outperformed", "upgrade", "upgrades", "upgraded"], 2.0),
+    **dict.fromkeys(["bearish", "underperform", "underperforms", "underperformed", "downgrade", "downgrades", "downgraded"], -2.0),
+    **dict.fromkeys(["surge", "surges", "surged", "surging", "soar", "soars", "soared", "soaring"], 2.0),
+    **dict.fromkeys(["rally", "rallies", "rallied", "rebound", "rebounds", "rebounded", "tailwind", "tailwinds"], 1.5),
+    **dict.fromkeys(["plunge", "plunges", "plunged", "plunging", "tumble", "tumbles", "tumbled", "slump", "slumps", "slumped"], -2.0),
+    **dict.fromkeys(["selloff", "sell-off", "headwind", "headwinds", "writedown", "writedowns", "shortfall"], -1.5),
+    **dict.fromkeys(["bankruptcy", "bankrupt", "insolvency", "insolvent", "delisted", "delisting"], -2.8),
+    **dict.fromkeys(["layoff", "layoffs", "downsizing", "recession", "stagflation"], -2.0),
+    **dict.fromkeys(["profitable", "dividend", "dividends", "buyback", "buybacks"], 1.2),
+    "default": -1.8,
+    "defaults": -1.8,
+    "defaulted": -2.2,
+    "volatile": -0.8,
+    "volatility": -0.5,
+}
+
+SENTIMENT_LABELS = ("positive", "neutral", "negative")
+
+
+class SentimentScores(NamedTuple):
+    label: str
+    # VADER's normalized score in [-1, 1], the label thresholds it at +-0.05
+    compound: float
+    # Shares of the text that are positive / neutral / negative, they sum to 1
+    positive: float
+    neutral: float
+    negative: float
+
+
+NEUTRAL_SCORES = SentimentScores("neutral", 0.0, 0.0, 1.0, 0.0)
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+
+def load_lexicon_file(path: str) -> dict:
+    lexicon = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                word, valence = line.rsplit(None, 1)
+                lexicon[word.lower()] = float(valence)
+    return lexicon
+
+
+def create_analyzer():
+    """VADER with the finance lexicon (and SENTIMENT_LEXICON_FILE) merged into its word table, once."""
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+    analyzer = SentimentIntensityAnalyzer()
+    lexicon = dict(FINANCE_LEXICON)
+    if SENTIMENT_LEXICON_FILE:
+        try:
+            lexicon.update(load_lexicon_file(SENTIMENT_LEXICON_FILE))
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load sentiment lexicon {SENTIMENT_LEXICON_FILE}: {str(e)}")
+    analyzer.lexicon.update(lexicon)
+    return analyzer
+
+
+def get_analyzer():
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = create_analyzer()
+    return _analyzer
+
+
+def label_for(compound: float) -> str:
+    if compound >= 0.05:
+        return 'positive'
+    elif compound <= -0.05:
+        return 'negative'
+    return 'neutral'
+
+
+def score_text(text: str) -> SentimentScores:
+    """Label, compound and per-class scores of one text."""
+    try:
+        if not text or text.strip() == "":
+            return NEUTRAL_SCORES
+        scores = get_analyzer().polarity_scores(text)
+        return SentimentScores(label_for(scores["compound"]), scores["compound"], scores["pos"], scores["neu"], scores["neg"])
+    except Exception as e:
+        logger.error(f"Error during sentiment analysis: {str(e)}")
+        return NEUTRAL_SCORES
 
-analyzer = SentimentIntensityAnalyzer()
 
 def analyze_sentiment(text: str):
     """
     Analyzes sentiment for a given text using VADER.
     Returns 'positive', 'neutral', or 'negative'.
     """
-    try:
-        if not text or text.strip() == "":
-            return "neutral"
-        
-        scores = analyzer.polarity_scores(text)
-        compound_score = scores["compound"]
-
-        if compound_score >= 0.05:
-            return 'positive'
-        elif compound_score <= -0.05:
-            return 'negative'
-        else:
-            return 'neutral'
-    
-    except Exception as e:
-        logger.error(f"Error during sentiment analysis: {str(e)}")
-        return 'neutral'
-    
+    return score_text(text).label
+
+
+def _score_chunk(texts: list) -> list:
+    # Runs in the worker processes, plain tuples pickle faster than NamedTuples
+    return [tuple(score_text(text)) for text in texts]
+
+
+def create_sentiment_pool(workers: int = SENTIMENT_WORKERS) -> ProcessPoolExecutor:
+    """Process pool for `score_texts`, each worker compiles the lexicon once when it starts."""
+    return ProcessPoolExecutor(max_workers=workers, initializer=get_analyzer)
+
+
+def score_texts(texts: list, executor: ProcessPoolExecutor = None, workers: int = SENTIMENT_WORKERS,
+                chunk_size: int = SENTIMENT_CHUNK_SIZE) -> list:
+    """
+    `score_text` over many texts, aligned with `texts`:
+    - VADER is pure Python, so the work is spread over processes in chunks of `chunk_size` texts
+    - Pass `executor` to reuse a pool across calls (backfills), otherwise one is started for the call
+    - Batches that fit in one chunk, or `workers=1`, are scored in-process
+    - Repeated texts (syndicated copies, boilerplate sentences) are scored once
+    """
+    unique = list(dict.fromkeys(texts))
+    if not unique:
+        return []
+    if executor is None and (workers <= 1 or len(unique) <= chunk_size):
+        scored = dict(zip(unique, map(score_text, unique)))
+        return [scored[text] for text in texts]
+
+    chunks = [unique[start:start + chunk_size] for start in range(0, len(unique), chunk_size)]
+    if executor is None:
+        with create_sentiment_pool(min(workers, len(chunks))) as pool:
+            results = list(pool.map(_score_chunk, chunks))
+    else:
+        results = list(executor.map(_score_chunk, chunks))
+    scored = dict(zip(unique, (SentimentScores(*scores) for chunk in results for scores in chunk)))
+    return [scored[text] for text in texts]
+
+
+def score_sentences(text: str) -> list:
+    """(sentence, SentimentScores) for every sentence of `text`."""
+    sentences = split_sentences(text or "")
+    return list(zip(sentences, score_texts(sentences)))
+
+
+def score_columns(scores: SentimentScores) -> dict:
+    """news_articles columns holding the scores."""
+    return {
+        "sentiment": scores.label,
+        "sentiment_compound": scores.compound,
+        "sentiment_positive": scores.positive,
+        "sentiment_neutral": scores.neutral,
+        "sentiment_negative": scores.negative,
+    }
+
+
+def _update_scores_statement():
+    from models.news import NewsArticle
+
+    return update(NewsArticle.__table__) \
+        .where(NewsArticle.__table__.c.id == bindparam("b_id")) \
+        .values({
+            column: bindparam(f"b_{column}")
+            for column in ("sentiment", "sentiment_compound", "sentiment_positive", "sentiment_neutral", "sentiment_negative")
+        })
+
+
+def backfill_sentiment(chunk_size: int = SENTIMENT_BACKFILL_CHUNK_SIZE, workers: int = SENTIMENT_WORKERS,
+                       rescore: bool = False, db: Session = None) -> int:
+    """
+    Scores stored articles in keyset chunks by id across a process pool, one commit per chunk:
+    - By default only articles without scores, `rescore` redoes all of them (e.g. after a lexicon change)
+    - The daily sentiment rollups are rebuilt at the end, labels may have changed
+    Returns the number of articles scored.
+    """
+    from core.database import db_session
+    from models.news import NewsArticle
+    from services.news_query_service import rebuild_sentiment_rollups
+
+    if db is None:
+        with db_session() as db:
+            return backfill_sentiment(chunk_size, workers, rescore, db)
+
+    statement = _update_scores_statement()
+    start = time.perf_counter()
+    last_id = None
+    scored = 0
+    with create_sentiment_pool(workers) as pool:
+        while True:
+            query = select(NewsArticle.id, NewsArticle.summary).where(NewsArticle.deleted_at == None)
+            if not rescore:
+                query = query.where(NewsArticle.sentiment_compound == None)
+            if last_id is not None:
+                query = query.where(NewsArticle.id > last_id)
+            chunk = db.execute(query.order_by(NewsArticle.id).limit(chunk_size)).all()
+            if not chunk:
+                break
+
+            scores = score_texts([summary or "" for _, summary in chunk], executor=pool)
+            db.execute(statement, [
+                {"b_id": article_id, **{f"b_{column}": value for column, value in score_columns(article_scores).items()}}
+                for (article_id, _), article_scores in zip(chunk, scores)
+            ])
+            db.commit()
+
+            last_id = chunk[-1][0]
+            scored += len(chunk)
+            elapsed = time.perf_counter() - start
+            logger.info(f"Scored {scored} articles so far ({scored / elapsed:.0f} articles/s)")
+
+    if scored:
+        rebuild_sentiment_rollups(db)
+    logger.info(f"Sentiment backfill done: {scored} articles in {time.perf_counter() - start:.1f}s")
+    return scored
+
 if __name__ == '__main__':
-    text = """Gold prices reached a record high of USD 3,128.06 per ounce amid tariff concerns and economic uncertainty. Investor sentiment is shifting towards safe-haven assets like gold due to fears of a recession and anticipated Federal Reserve rate cuts."""
-    sentiment = analyze_sentiment(text)
-    print(sentiment)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="News sentiment scoring")
+    parser.add_argument("--backfill", action="store_true", help="score stored articles that have no scores yet")
+    parser.add_argument("--rescore", action="store_true", help="with --backfill, rescore every article")
+    parser.add_argument("--workers", type=int, default=SENTIMENT_WORKERS)
+    args = parser.parse_args()
+    if args.backfill:
+        backfill_sentiment(workers=args.workers, rescore=args.rescore)
+    else:
+        text = """Gold prices reached a record high of USD 3,128.06 per ounce amid tariff concerns and economic uncertainty. Investor sentiment is shifting towards safe-haven assets like gold due to fears of a recession and anticipated Federal Reserve rate cuts."""
+        print(score_text(text))
\ No newline at end of file
@@ -1,28 +1,254 @@
 import os
-from openai import OpenAI
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
 from core.logger import logger
+from core.metrics import external_call
+from services.embedding_service import get_openai_client
+from services.summary_cache import content_key, summary_cache
+from utils.pipeline import TokenBudgetLimiter
+from utils.minhash import similarity
+from utils.nlp_preprocessors import split_sentences
 
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Primary summarizer: openai (chat completion) or textrank (local, extractive, no network)
+SUMMARY_BACKEND = os.getenv("SUMMARY_BACKEND", "openai")
+# Used when the primary backend fails: textrank or none
+SUMMARY_FALLBACK = os.getenv("SUMMARY_FALLBACK", "textrank")
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-3.5-turbo")
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", 512))
+SUMMARY_SENTENCES = int(os.getenv("SUMMARY_SENTENCES", 3))
+# Parallel requests of `summarize_many`, the aggregator's summarize stage has its own workers
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", 8))
+# OpenAI account limits the summarizer paces itself to, shared by all its threads
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", 90000))
+OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", 3500))
 
-def generate_summary(content: str, model: str = 'gpt-3.5-turbo', max_token: int = 512):
-    logger.info(f"Generating summary using {model}...")
+SYSTEM_PROMPT = "You are a financial news summarizer."
+USER_PROMPT = "Summarize the following article in concise financial terms:\n\n{content}"
+WORD_PATTERN = re.compile(r"\w+")
+# TextRank cost is quadratic in sentences, articles are capped at 3000 chars upstream anyway
+TEXTRANK_MAX_SENTENCES = 80
 
-    try:
-        response = openai_client.chat.completions.create(
-            model=model,
-            max_tokens=max_token,
-            messages=[
-                {"role": "system", "content": "You are a financial news summarizer."},
-                {"role": "user", "content":  f"Summarize the following article in concise financial terms:\n\n{content}"}
-            ]
-        )
+openai_rate_limiter = TokenBudgetLimiter(OPENAI_TOKENS_PER_MINUTE, OPENAI_REQUESTS_PER_MINUTE)
 
-        summary = response.choices[0].message.content.strip()
-        logger.info("Summary generated")
+
+def estimate_tokens(text: str) -> int:
+    """Rough count for budgeting, ~4 characters per token for English."""
+    return len(text) // 4 + 1
+
+
+class OpenAISummaryBackend:
+    """Abstractive summaries from a chat model, paced by the shared token budget."""
+
+    def __init__(self, model: str = SUMMARY_MODEL, max_tokens: int = SUMMARY_MAX_TOKENS,
+                 limiter: TokenBudgetLimiter = openai_rate_limiter):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.limiter = limiter
+        self.name = f"openai:{model}"
+
+    def summarize(self, content: str) -> str:
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": USER_PROMPT.format(content=content)},
+        ]
+        estimated = estimate_tokens(SYSTEM_PROMPT + messages[1]["content"]) + self.max_tokens
+        self.limiter.acquire(estimated)
+
+        with external_call("openai", "chat"):
+            response = get_openai_client().chat.completions.create(
+                model=self.model,
+                max_tokens=self.max_tokens,
+                messages=messages
+            )
+        usage = getattr(response, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            self.limiter.settle(estimated, usage.total_tokens)
+
+        summary = (response.choices[0].message.content or "").strip()
+        if not summary:
+            raise ValueError(f"{self.model} returned an empty summary")
         return summary
-    except Exception as e:
-        logger.error(f"Error generating summary: {str(e)}")
-        return ""
+
+
+class TextRankSummaryBackend:
+    """
+    Extractive summaries on CPU, no network (TextRank, Mihalcea & Tarau):
+    - Sentences are graph nodes, edges weigh their word overlap normalized by log lengths
+    - PageRank over the graph, the top `sentences` are returned in article order
+    """
+
+    def __init__(self, sentences: int = SUMMARY_SENTENCES, damping: float = 0.85, iterations: int = 50):
+        self.sentences = sentences
+        self.damping = damping
+        self.iterations = iterations
+        self.name = f"textrank:{sentences}"
+        self._stop_words = None
+
+    def stop_words(self) -> frozenset:
+        if self._stop_words is None:
+            from utils.nlp_preprocessors import load_nlp_resources
+            try:
+                self._stop_words = load_nlp_resources()
+            except LookupError as e:
+                logger.warning(f"TextRank running without stopwords: {str(e)}")
+                self._stop_words = frozenset()
+        return self._stop_words
+
+    def summarize(self, content: str) -> str:
+        sentences = split_sentences(content)[:TEXTRANK_MAX_SENTENCES]
+        if len(sentences) <= self.sentences:
+            return " ".join(sentences)
+
+        stop_words = self.stop_words()
+        words = [{word for word in WORD_PATTERN.findall(sentence.lower()) if word not in stop_words} for sentence in sentences]
+        vocabulary = {word: i for i, word in enumerate(set().union(*words))}
+        incidence = np.zeros((len(sentences), len(vocabulary)), dtype=np.float32)
+        for row, sentence_words in enumerate(words):
+            incidence[row, [vocabulary[word] for word in sentence_words]] = 1.0
+
+        overlap = incidence @ incidence.T
+        log_lengths = np.log(np.maximum(incidence.sum(axis=1), 1.0) + 1.0)
+        weights = overlap / (log_lengths[:, None] + log_lengths[None, :])
+        np.fill_diagonal(weights, 0.0)
+
+        # Row-normalized transition matrix, sentences without any overlap jump uniformly
+        out_weight = weights.sum(axis=1, keepdims=True)
+        transitions = np.where(out_weight > 0, weights / np.where(out_weight > 0, out_weight, 1.0), 1.0 / len(sentences))
+        scores = np.full(len(sentences), 1.0 / len(sentences), dtype=np.float32)
+        for _ in range(self.iterations):
+            updated = (1 - self.damping) / len(sentences) + self.damping * (transitions.T @ scores)
+            if np.abs(updated - scores).sum() < 1e-6:
+                scores = updated
+                break
+            scores = updated
+
+        top = sorted(np.argsort(-scores, kind="stable")[:self.sentences])
+        return " ".join(sentences[i] for i in top)
+
+
+BACKENDS = {
+    "openai": OpenAISummaryBackend,
+    "textrank": TextRankSummaryBackend,
+}
+
+
+class SummaryEngine:
+    """
+    Summarization front end used by the news aggregator:
+    - Content-hash and near-duplicate cache (services/summary_cache.py) in front of the backend
+    - Concurrent requests for the same or a near-duplicate article are coalesced, only the first
+      reaches the backend
+    - A failing primary backend falls back to `fallback`; fallback summaries aren't cached,
+      the primary gets another chance next time
+    """
+
+    def __init__(self, backend, fallback=None, cache=summary_cache):
+        self.backend = backend
+        self.fallback = fallback
+        self.cache = cache
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.backend_calls = 0
+        self.fallbacks = 0
+        self.coalesced = 0
+
+    def summarize(self, content: str) -> str:
+        key = content_key(content, self.backend.name)
+        signature = self.cache.signature(content)
+        cached = self.cache.get(content, self.backend.name, key, signature)
+        if cached is not None:
+            logger.info("Summary cache hit")
+            return cached
+
+        with self._lock:
+            future = self._find_inflight(key, signature)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = (future, signature)
+        if not leader:
+            self.coalesced += 1
+            return future.result()
+
+        try:
+            summary = self._generate(content, key, signature)
+            future.set_result(summary)
+            return summary
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _find_inflight(self, key: str, signature):
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return inflight[0]
+        if signature is None:
+            return None
+        # At most one request per worker thread is in flight, a linear scan is enough
+        for future, other in self._inflight.values():
+            if other is not None and similarity(signature, other) >= self.cache.threshold:
+                return future
+        return None
+
+    def _generate(self, content: str, key: str, signature) -> str:
+        logger.info(f"Generating summary using {self.backend.name}...")
+        try:
+            self.backend_calls += 1
+            summary = self.backend.summarize(content)
+            self.cache.put(content, self.backend.name, summary, key, signature)
+            logger.info("Summary generated")
+            return summary
+        except Exception as e:
+            logger.error(f"Error generating summary with {self.backend.name}: {str(e)}")
+        if self.fallback is None:
+            return ""
+        try:
+            self.fallbacks += 1
+            return self.fallback.summarize(content)
+        except Exception as e:
+            logger.error(f"Fallback summarizer {self.fallback.name} failed: {str(e)}")
+            return ""
+
+    def summarize_many(self, contents: list, concurrency: int = SUMMARY_CONCURRENCY) -> list:
+        """Summaries aligned with `contents`, up to `concurrency` backend requests in flight."""
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(self.summarize, contents))
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "fallback": self.fallback.name if self.fallback else None,
+            "backend_calls": self.backend_calls,
+            "fallbacks": self.fallbacks,
+            "coalesced": self.coalesced,
+            "cache": self.cache.stats(),
+        }
+
+
+def create_summary_engine(backend: str = SUMMARY_BACKEND, fallback: str = SUMMARY_FALLBACK) -> SummaryEngine:
+    fallback_backend = BACKENDS[fallback]() if fallback in BACKENDS and fallback != backend else None
+    return SummaryEngine(BACKENDS[backend](), fallback_backend)
+
+
+_summary_engine = None
+_summary_engine_lock = threading.Lock()
+
+def get_summary_engine() -> SummaryEngine:
+    global _summary_engine
+    if _summary_engine is None:
+        with _summary_engine_lock:
+            if _summary_engine is None:
+                _summary_engine = create_summary_engine()
+    return _summary_engine
+
+def generate_summary(content: str) -> str:
+    """Summary of an article's content, "" when no backend could produce one."""
+    return get_summary_engine().summarize(content)
     
 if __name__ == '__main__':
     summary = generate_summary("""
@@ -0,0 +1,212 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+import numpy as np
+from core.logger import logger
+from services.embedding_cache import normalize_text
+from utils.minhash import bands, minhash, shingles, similarity
+
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", 5000))
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", 7 * 24 * 60 * 60))
+# SQLite file keeping summaries across runs of the aggregator, in-process only when unset
+SUMMARY_CACHE_DB = os.getenv("SUMMARY_CACHE_DB")
+# Estimated Jaccard similarity of word 3-shingles from which two articles count as the same story
+SUMMARY_NEAR_DUP_THRESHOLD = float(os.getenv("SUMMARY_NEAR_DUP_THRESHOLD", 0.8))
+# Shorter texts have too few shingles for a meaningful signature, they only get exact hits
+SUMMARY_NEAR_DUP_MIN_SHINGLES = 20
+
+
+def content_key(content: str, namespace: str) -> str:
+    """Key on (backend, normalized content), so case and whitespace changes still hit."""
+    return hashlib.sha256(f"{namespace}\x00{normalize_text(content)}".encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Summaries keyed by article content:
+    - Exact hits on the normalized content hash
+    - Near-duplicate hits through a MinHash LSH index: syndicated copies of a wire story (different
+      boilerplate, small edits) above SUMMARY_NEAR_DUP_THRESHOLD similarity reuse its summary
+    - In-process LRU with a TTL, optionally written through to SQLite and reloaded on start
+    """
+
+    def __init__(self, max_size: int = SUMMARY_CACHE_SIZE, ttl: float = SUMMARY_CACHE_TTL,
+                 db_path: str = SUMMARY_CACHE_DB, threshold: float = SUMMARY_NEAR_DUP_THRESHOLD):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        # key -> (namespace, MinHash signature or None, summary, created_at)
+        self._entries = OrderedDict()
+        self._bands = defaultdict(set)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._db = None
+
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, namespace TEXT NOT NULL, "
+                    "signature BLOB, summary TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._load()
+                logger.info(f"Summary cache disk tier enabled at {db_path}, {len(self._entries)} summaries loaded")
+            except sqlite3.Error as e:
+                logger.error(f"Failed to open summary cache db {db_path}: {str(e)}")
+                self._db = None
+
+    def _load(self):
+        rows = self._db.execute(
+            "SELECT key, namespace, signature, summary, created_at FROM summaries WHERE created_at >= ? "
+            "ORDER BY created_at DESC LIMIT ?",
+            (time.time() - self.ttl, self.max_size)
+        ).fetchall()
+        for key, namespace, signature, summary, created_at in reversed(rows):
+            self._put_memory(key, (namespace, self._signature_from_blob(signature), summary, created_at))
+
+    @staticmethod
+    def _signature_from_blob(blob):
+        return np.frombuffer(blob, dtype=np.uint64) if blob is not None else None
+
+    def _band_keys(self, namespace: str, signature: np.ndarray) -> list:
+        return [(namespace, band) for band in bands(signature)]
+
+    def _put_memory(self, key: str, entry: tuple):
+        self._remove_memory(key)
+        self._entries[key] = entry
+        namespace, signature = entry[0], entry[1]
+        if signature is not None:
+            for band_key in self._band_keys(namespace, signature):
+                self._bands[band_key].add(key)
+        while len(self._entries) > self.max_size:
+            self._remove_memory(next(iter(self._entries)))
+
+    def _remove_memory(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None or entry[1] is None:
+            return
+        for band_key in self._band_keys(entry[0], entry[1]):
+            keys = self._bands.get(band_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._bands[band_key]
+
+    def _live(self, key: str, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[3] > self.ttl:
+            self._remove_memory(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _nearest(self, namespace: str, signature: np.ndarray, now: float):
+        candidates = set()
+        for band_key in self._band_keys(namespace, signature):
+            candidates.update(self._bands.get(band_key, ()))
+        best, best_similarity = None, self.threshold
+        for key in candidates:
+            score = similarity(signature, self._entries[key][1])
+            if score >= best_similarity and self._live(key, now) is not None:
+                best, best_similarity = key, score
+        return best
+
+    @staticmethod
+    def signature(content: str):
+        """MinHash signature of the content, None when it's too short for near-duplicate matching."""
+        features = shingles(content)
+        return minhash(features) if len(features) >= SUMMARY_NEAR_DUP_MIN_SHINGLES else None
+
+    def get(self, content: str, namespace: str, key: str = None, signature=None):
+        """Cached summary of `content` or of a near-duplicate of it, None on a miss."""
+        now = time.time()
+        key = key or content_key(content, namespace)
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is not None:
+                self.hits += 1
+                return entry[2]
+
+            disk_entry = self._get_disk(key, now)
+            if disk_entry is not None:
+                self._put_memory(key, disk_entry)
+                self.hits += 1
+                return disk_entry[2]
+
+            signature = signature if signature is not None else self.signature(content)
+            if signature is not None:
+                near_key = self._nearest(namespace, signature, now)
+                if near_key is not None:
+                    self.near_hits += 1
+                    return self._entries[near_key][2]
+
+            self.misses += 1
+            return None
+
+    def put(self, content: str, namespace: str, summary: str, key: str = None, signature=None):
+        if not summary:
+            return
+        key = key or content_key(content, namespace)
+        signature = signature if signature is not None else self.signature(content)
+        entry = (namespace, signature, summary, time.time())
+        with self._lock:
+            self._put_memory(key, entry)
+            self._put_disk(key, entry)
+
+    def _get_disk(self, key: str, now: float):
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT namespace, signature, summary, created_at FROM summaries WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Summary cache disk read failed: {str(e)}")
+            return None
+        if row is None:
+            return None
+        namespace, signature, summary, created_at = row
+        return namespace, self._signature_from_blob(signature), summary, created_at
+
+    def _put_disk(self, key: str, entry: tuple):
+        if self._db is None:
+            return
+        namespace, signature, summary, created_at = entry
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries (key, namespace, signature, summary, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, namespace, signature.tobytes() if signature is not None else None, summary, created_at)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Summary cache disk write failed: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bands.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "near_duplicate_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+                "disk_tier": self._db is not None,
+            }
+
+
+summary_cache = SummaryCache()
@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+from datetime import datetime
+import numpy as np
+from core.logger import logger
+from services.embedding_service import EMBEDDING_DIM
+from utils.file_lock import file_lock
+
+TERM_VECTOR_STORE_DIR = os.getenv("TERM_VECTOR_STORE_DIR", "vector_store")
+
+MATRIX_FILE = "glossary_vectors.f32"
+INDEX_FILE = "glossary_vectors.json"
+LOCK_FILE = "glossary_vectors.lock"
+
+
+class TermVectorStore:
+    """
+    Local, memory-mapped store of glossary term vectors:
+    - `glossary_vectors.f32` is an append-only float32 matrix (one row per vector)
+    - `glossary_vectors.json` maps term id -> {row, updated_at}
+    - Loaded lazily on first use and reloaded when another process rewrites the index
+    - Updated terms are appended as new rows and the id is repointed, `compact()` drops dead rows
+    - Writers hold a lock file, the embedding jobs and every search worker may append
+    """
+
+    def __init__(self, directory: str = TERM_VECTOR_STORE_DIR, dim: int = EMBEDDING_DIM):
+        self.directory = directory
+        self.dim = dim
+        self.matrix_path = os.path.join(directory, MATRIX_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.lock_path = os.path.join(directory, LOCK_FILE)
+        self._lock = threading.RLock()
+        self._rows = {}
+        self._row_count = 0
+        self._matrix = None
+        self._index_mtime = None
+
+    def _load(self):
+        """(Re)load the id index and memory-map the matrix if the index changed on disk."""
+        try:
+            stat = os.stat(self.index_path)
+        except OSError:
+            return
+
+        mtime = (stat.st_mtime_ns, stat.st_size)
+        if mtime == self._index_mtime:
+            return
+
+        with open(self.index_path) as f:
+            data = json.load(f)
+
+        if data.get("dim") != self.dim:
+            logger.error(f"Term vector store dimension mismatch: {data.get('dim')} != {self.dim}")
+            return
+
+        self._rows = data["rows"]
+        self._row_count = data["row_count"]
+        # The matrix file may already hold rows appended after this index was written,
+        # only map the rows the index knows about
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(self._row_count, self.dim)) \
+            if self._row_count else None
+        self._index_mtime = mtime
+        logger.info(f"Loaded term vector store with {len(self._rows)} terms ({self._row_count} rows)")
+
+    def _save_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        # json.dumps runs the C encoder, json.dump(..., f) streams through the pure Python one
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"dim": self.dim, "row_count": self._row_count, "rows": self._rows}))
+        os.replace(tmp_path, self.index_path)
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._rows)
+
+    def __contains__(self, term_id):
+        with self._lock:
+            self._load()
+            return str(term_id) in self._rows
+
+    @property
+    def version(self):
+        """Changes whenever the on-disk index is rewritten, by this or any other process."""
+        with self._lock:
+            self._load()
+            return self._index_mtime
+
+    def ids(self) -> list:
+        with self._lock:
+            self._load()
+            return list(self._rows.keys())
+
+    def lookup(self, term_ids: list, updated_ats: list = None):
+        """
+        Returns a (len(term_ids), dim) float32 matrix and a boolean mask of the rows that were found.
+        - If `updated_ats` is given, vectors older than the term's `updated_at` are treated as missing
+        """
+        vectors = np.zeros((len(term_ids), self.dim), dtype=np.float32)
+        found = np.zeros(len(term_ids), dtype=bool)
+
+        with self._lock:
+            self._load()
+            if self._matrix is None:
+                return vectors, found
+
+            for i, term_id in enumerate(term_ids):
+                entry = self._rows.get(str(term_id))
+                if entry is None:
+                    continue
+                if updated_ats is not None and updated_ats[i] is not None and \
+                        entry["updated_at"] < updated_ats[i].isoformat():
+                    continue
+                vectors[i] = self._matrix[entry["row"]]
+                found[i] = True
+
+        return vectors, found
+
+    def append(self, term_ids: list, vectors, updated_ats: list = None):
+        """
+        Appends vectors for `term_ids`, repointing ids that already had a row.
+        """
+        if not term_ids:
+            return
+
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(term_ids), self.dim):
+            raise ValueError(f"Expected vectors of shape ({len(term_ids)}, {self.dim}), got {vectors.shape}")
+
+        with self._lock, file_lock(self.lock_path):
+            self._load()
+
+            # Truncate rows that were written without making it into the index (e.g. a crash mid-append)
+            with open(self.matrix_path, "ab") as f:
+                f.truncate(self._row_count * self.dim * 4)
+                f.write(vectors.tobytes())
+
+            now = datetime.utcnow().isoformat()
+            for i, term_id in enumerate(term_ids):
+                updated_at = updated_ats[i].isoformat() if updated_ats is not None and updated_ats[i] else now
+                self._rows[str(term_id)] = {"row": self._row_count + i, "updated_at": updated_at}
+            self._row_count += len(term_ids)
+
+            self._save_index()
+            self._index_mtime = None
+            self._load()
+        logger.info(f"Appended {len(term_ids)} vectors to term vector store")
+
+    def touch(self, term_ids: list, updated_ats: list):
+        """Re-tags the stored vectors of `term_ids` with newer `updated_at`s, for edits that didn't change the embedded text."""
+        with self._lock, file_lock(self.lock_path):
+            self._load()
+            touched = 0
+            for term_id, updated_at in zip(term_ids, updated_ats):
+                entry = self._rows.get(str(term_id))
+                if entry is not None:
+                    entry["updated_at"] = updated_at.isoformat()
+                    touched += 1
+            if touched:
+                self._save_index()
+                self._index_mtime = None
+                self._load()
+        logger.info(f"Refreshed updated_at of {touched} vectors in term vector store")
+
+    def remove(self, term_ids: list):
+        """Drops ids from the index, their rows are reclaimed by `compact()`."""
+        with self._lock, file_lock(self.lock_path):
+            self._load()
+            removed = [self._rows.pop(str(term_id)) for term_id in term_ids if str(term_id) in self._rows]
+            if removed:
+                self._save_index()
+                self._index_mtime = None
+                self._load()
+        logger.info(f"Removed {len(removed)} vectors from term vector store")
+
+    def compact(self):
+        """Rewrites the matrix keeping only rows that are still referenced."""
+        with self._lock, file_lock(self.lock_path):
+            self._load()
+            if self._matrix is None:
+                return
+
+            term_ids = list(self._rows.keys())
+            live_rows = [self._rows[term_id]["row"] for term_id in term_ids]
+            live = np.array(self._matrix[live_rows], dtype=np.float32)
+
+            tmp_path = f"{self.matrix_path}.tmp"
+            live.tofile(tmp_path)
+            # Drop the mapping before replacing the file underneath it
+            self._matrix = None
+            os.replace(tmp_path, self.matrix_path)
+
+            for row, term_id in enumerate(term_ids):
+                self._rows[term_id]["row"] = row
+            self._row_count = len(term_ids)
+            self._save_index()
+            self._index_mtime = None
+            self._load()
+        logger.info(f"Compacted term vector store to {len(term_ids)} rows")
+
+
+term_vector_store = TermVectorStore()
@@ -0,0 +1,314 @@
+import asyncio
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from core.logger import logger
+from core.metrics import external_call
+from services.term_vector_store import term_vector_store
+
+# "pinecone" (default) or "local"
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "pinecone")
+# Local backend search mode: "exact" brute-force or "ivf" (inverted file, approximate)
+LOCAL_INDEX_MODE = os.getenv("LOCAL_INDEX_MODE", "exact")
+# IVF falls back to exact search below this many vectors
+IVF_MIN_VECTORS = int(os.getenv("IVF_MIN_VECTORS", 50000))
+# Number of IVF clusters, defaults to ~sqrt(n) when unset
+IVF_NLIST = int(os.getenv("IVF_NLIST", 0))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", 8))
+IVF_TRAIN_ITERATIONS = 10
+# Concurrent requests used by batch queries against backends without a batch query API
+VECTOR_QUERY_CONCURRENCY = int(os.getenv("VECTOR_QUERY_CONCURRENCY", 8))
+# Set once every Pinecone vector carries the glossary_id metadata (python -m services.embed_glossary --all),
+# until then every SQL candidate is kept for reranking and the id-filtered search is skipped
+PINECONE_ID_METADATA_COMPLETE = os.getenv("PINECONE_ID_METADATA_COMPLETE", "false").lower() == "true"
+
+
+class VectorIndex(ABC):
+    """
+    Interface of the glossary vector index.
+    - `upsert` takes Pinecone style `[(id, values), ...]` tuples
+    - `query` returns `[{"id": ..., "score": ...}, ...]` sorted by descending cosine score,
+      `ids` restricts the search to the given vector ids
+    - `filters_all_ids` is False while some vectors can't be matched by an `ids` restriction
+    """
+
+    filters_all_ids = True
+
+    @abstractmethod
+    def upsert(self, vectors: list):
+        ...
+
+    @abstractmethod
+    def query(self, vector, top_k: int, ids: list = None) -> list:
+        ...
+
+    async def query_async(self, vector, top_k: int, ids: list = None) -> list:
+        """Non-blocking `query`, backends without a native async client run it in a worker thread."""
+        return await asyncio.to_thread(self.query, vector, top_k, ids)
+
+    def query_many(self, vectors, top_k: int, ids: list = None) -> list:
+        """
+        One `query` result list per row of `vectors`. `ids` optionally holds one id restriction
+        per vector (None for unrestricted). Runs up to VECTOR_QUERY_CONCURRENCY queries at once.
+        """
+        ids = ids if ids is not None else [None] * len(vectors)
+        with ThreadPoolExecutor(max_workers=VECTOR_QUERY_CONCURRENCY) as executor:
+            return list(executor.map(lambda args: self.query(args[0], top_k, args[1]), zip(vectors, ids)))
+
+    async def query_many_async(self, vectors, top_k: int, ids: list = None) -> list:
+        """Non-blocking `query_many`."""
+        ids = ids if ids is not None else [None] * len(vectors)
+        semaphore = asyncio.Semaphore(VECTOR_QUERY_CONCURRENCY)
+
+        async def query(vector, vector_ids):
+            async with semaphore:
+                return await self.query_async(vector, top_k, vector_ids)
+
+        return await asyncio.gather(*[query(vector, vector_ids) for vector, vector_ids in zip(vectors, ids)])
+
+    async def close_async(self):
+        """Releases the clients opened by the async methods, nothing to do for backends without any."""
+
+    @abstractmethod
+    def fetch(self, ids: list) -> dict:
+        """Returns {id: values} for the ids present in the index."""
+
+    @abstractmethod
+    def delete(self, ids: list):
+        ...
+
+
+class PineconeVectorIndex(VectorIndex):
+    filters_all_ids = PINECONE_ID_METADATA_COMPLETE
+
+    def __init__(self):
+        from core.pinecone_client import get_glossary_index
+        self.index = get_glossary_index()
+        self._async_client = None
+        self._async_index = None
+        self._async_lock = asyncio.Lock()
+
+    async def _get_async_index(self):
+        # Created lazily inside the running event loop, its HTTP session is bound to that loop.
+        # Concurrent first requests wait for one client instead of each opening their own.
+        if self._async_index is None:
+            async with self._async_lock:
+                if self._async_index is None:
+                    from pinecone import PineconeAsyncio
+                    from core.pinecone_client import PINECONE_API_KEY, PINECONE_INDEX_NAME, get_pinecone_client
+                    description = await asyncio.to_thread(get_pinecone_client().describe_index, PINECONE_INDEX_NAME)
+                    self._async_client = PineconeAsyncio(api_key=PINECONE_API_KEY)
+                    self._async_index = self._async_client.IndexAsyncio(host=description.host)
+        return self._async_index
+
+    async def close_async(self):
+        """Closes the async client's HTTP sessions, called on app shutdown."""
+        async with self._async_lock:
+            if self._async_index is not None:
+                await self._async_index.close()
+                await self._async_client.close()
+                self._async_client, self._async_index = None, None
+
+    def upsert(self, vectors: list):
+        # Pinecone can't filter on vector ids, mirror the id into metadata so queries can
+        with external_call("pinecone", "upsert"):
+            self.index.upsert(vectors=[(id, values, {"glossary_id": id}) for id, values in vectors])
+
+    def query(self, vector, top_k: int, ids: list = None) -> list:
+        with external_call("pinecone", "query"):
+            search_results = self.index.query(
+                vector=list(vector),
+                top_k=top_k,
+                include_values=False,
+                filter={"glossary_id": {"$in": ids}} if ids is not None else None
+            )
+        return [{"id": match['id'], "score": match['score']} for match in search_results['matches']]
+
+    async def query_async(self, vector, top_k: int, ids: list = None) -> list:
+        index = await self._get_async_index()
+        with external_call("pinecone", "query"):
+            search_results = await index.query(
+                vector=list(vector),
+                top_k=top_k,
+                include_values=False,
+                filter={"glossary_id": {"$in": ids}} if ids is not None else None
+            )
+        return [{"id": match.id, "score": match.score} for match in search_results.matches]
+
+    def fetch(self, ids: list) -> dict:
+        with external_call("pinecone", "fetch"):
+            fetched = self.index.fetch(ids=ids).vectors
+        return {id: vector.values for id, vector in fetched.items()}
+
+    def delete(self, ids: list):
+        with external_call("pinecone", "delete"):
+            self.index.delete(ids=ids)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Positions of the `top_k` highest scores, best first, without a full sort."""
+    if top_k >= len(scores):
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, top_k)[:top_k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class LocalVectorIndex(VectorIndex):
+    """
+    In-process vector index over the term vector store:
+    - Rows are L2 normalized once so cosine similarity is a single matrix-vector product
+    - "exact" mode scores every vector, "ivf" mode clusters vectors with k-means and only
+      scores the `nprobe` clusters closest to the query
+    - Upserts and deletes are persisted to the term vector store, changes made by other
+      processes are picked up on the next query
+    """
+
+    def __init__(self, store=term_vector_store, mode: str = LOCAL_INDEX_MODE,
+                 nlist: int = IVF_NLIST, nprobe: int = IVF_NPROBE, ivf_min_vectors: int = IVF_MIN_VECTORS):
+        self.store = store
+        self.mode = mode
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ivf_min_vectors = ivf_min_vectors
+        self._lock = threading.Lock()
+        self._version = None
+        # (ids, id -> row position, normalized matrix, centroids, cluster -> row positions), swapped atomically
+        self._state = ([], {}, np.empty((0, store.dim), dtype=np.float32), None, None)
+
+    def _train_ivf(self, matrix: np.ndarray):
+        nlist = self.nlist or max(1, int(np.sqrt(len(matrix))))
+        rng = np.random.default_rng(0)
+        centroids = matrix[rng.choice(len(matrix), size=nlist, replace=False)]
+        for _ in range(IVF_TRAIN_ITERATIONS):
+            assignments = np.argmax(matrix @ centroids.T, axis=1)
+            for cluster in range(nlist):
+                members = matrix[assignments == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+            centroids = _normalize_rows(centroids)
+        assignments = np.argmax(matrix @ centroids.T, axis=1)
+        lists = [np.flatnonzero(assignments == cluster) for cluster in range(nlist)]
+        return centroids, lists
+
+    def _refresh(self):
+        """Rebuilds the in-memory index when the term vector store changed."""
+        version = self.store.version
+        if version == self._version:
+            return
+
+        with self._lock:
+            if version == self._version:
+                return
+            ids = self.store.ids()
+            vectors, _ = self.store.lookup(ids)
+            matrix = _normalize_rows(vectors)
+
+            centroids, lists = None, None
+            if self.mode == "ivf" and len(matrix) >= self.ivf_min_vectors:
+                logger.info(f"Training IVF index over {len(matrix)} vectors...")
+                centroids, lists = self._train_ivf(matrix)
+
+            positions = {id: position for position, id in enumerate(ids)}
+            self._state = (ids, positions, matrix, centroids, lists)
+            self._version = version
+            logger.info(f"Local vector index loaded with {len(ids)} vectors (mode: {self.mode})")
+
+    def query(self, vector, top_k: int, ids: list = None) -> list:
+        self._refresh()
+        index_ids, positions, matrix, centroids, lists = self._state
+        if not index_ids:
+            return []
+
+        query_vec = np.asarray(vector, dtype=np.float32)
+        query_vec = query_vec / (np.linalg.norm(query_vec) or 1.0)
+
+        if ids is not None:
+            # Restricted search, the candidate set is small so score it exactly
+            candidates = np.array([positions[id] for id in ids if id in positions], dtype=np.int64)
+        elif centroids is None:
+            candidates = None
+        else:
+            probes = _top_k(centroids @ query_vec, min(self.nprobe, len(centroids)))
+            candidates = np.concatenate([lists[cluster] for cluster in probes])
+
+        if candidates is None:
+            scores = matrix @ query_vec
+            return [{"id": index_ids[position], "score": float(scores[position])} for position in _top_k(scores, top_k)]
+
+        scores = matrix[candidates] @ query_vec
+        return [
+            {"id": index_ids[candidates[position]], "score": float(scores[position])}
+            for position in _top_k(scores, top_k)
+        ]
+
+    async def query_async(self, vector, top_k: int, ids: list = None) -> list:
+        # Usually sub-millisecond, but a store change makes the query reload the store and rebuild
+        # the matrix (and retrain IVF), which must not stall the event loop
+        return await asyncio.to_thread(self.query, vector, top_k, ids)
+
+    def query_many(self, vectors, top_k: int, ids: list = None) -> list:
+        """Unrestricted exact searches are scored together as one matrix-matrix product."""
+        self._refresh()
+        index_ids, _, matrix, centroids, _ = self._state
+        if ids is not None or centroids is not None or not index_ids:
+            ids = ids if ids is not None else [None] * len(vectors)
+            return [self.query(vector, top_k, vector_ids) for vector, vector_ids in zip(vectors, ids)]
+
+        queries = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        scores = matrix @ queries.T
+        return [
+            [{"id": index_ids[position], "score": float(scores[position, column])} for position in _top_k(scores[:, column], top_k)]
+            for column in range(len(queries))
+        ]
+
+    async def query_many_async(self, vectors, top_k: int, ids: list = None) -> list:
+        return await asyncio.to_thread(self.query_many, vectors, top_k, ids)
+
+    def upsert(self, vectors: list):
+        if not vectors:
+            return
+        ids = [id for id, _ in vectors]
+        self.store.append(ids, np.array([values for _, values in vectors], dtype=np.float32))
+
+    def fetch(self, ids: list) -> dict:
+        vectors, found = self.store.lookup(ids)
+        return {id: vectors[i].tolist() for i, id in enumerate(ids) if found[i]}
+
+    def delete(self, ids: list):
+        self.store.remove(ids)
+
+
+_vector_index = None
+_vector_index_lock = threading.Lock()
+
+
+def get_vector_index() -> VectorIndex:
+    """Returns the configured vector index, created once per process."""
+    global _vector_index
+    if _vector_index is None:
+        with _vector_index_lock:
+            if _vector_index is None:
+                logger.info(f"Initializing {VECTOR_INDEX_BACKEND} vector index...")
+                if VECTOR_INDEX_BACKEND == "local":
+                    _vector_index = LocalVectorIndex()
+                else:
+                    _vector_index = PineconeVectorIndex()
+    return _vector_index
+
+
+async def close_vector_index():
+    """Closes the async clients of the process's vector index, if it was created."""
+    if _vector_index is None:
+        return
+    try:
+        await _vector_index.close_async()
+    except Exception as e:
+        logger.error(f"Failed to close the vector index clients: {str(e)}")
@@ -0,0 +1,84 @@
+from collections import deque
+
+
+class TokenAutomaton:
+    """
+    Aho–Corasick automaton over token sequences:
+    - Patterns are tuples of tokens, so matches always start and end on word boundaries
+    - `add` / `remove` patterns, then `finalize()` recomputes the failure links
+    - `copy()` gives an independent automaton for copy-on-write updates while readers keep searching
+    - `search(tokens)` yields `(start position, value)` for every occurrence, overlapping ones included
+    """
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.depth = [0]
+        # Values of the patterns ending exactly at a state
+        self.outputs = [set()]
+        # (value, pattern length) of every pattern ending at a state, following failure links
+        self.matches = [()]
+
+    def __len__(self):
+        return len(self.goto)
+
+    def copy(self) -> "TokenAutomaton":
+        automaton = TokenAutomaton()
+        automaton.goto = [dict(transitions) for transitions in self.goto]
+        automaton.fail = list(self.fail)
+        automaton.depth = list(self.depth)
+        automaton.outputs = [set(values) for values in self.outputs]
+        automaton.matches = list(self.matches)
+        return automaton
+
+    def add(self, tokens: tuple, value):
+        state = 0
+        for token in tokens:
+            next_state = self.goto[state].get(token)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.depth.append(self.depth[state] + 1)
+                self.outputs.append(set())
+                self.matches.append(())
+                self.goto[state][token] = next_state
+            state = next_state
+        self.outputs[state].add(value)
+
+    def remove(self, tokens: tuple, value):
+        """Unregisters a pattern, its states stay in place until the automaton is rebuilt."""
+        state = 0
+        for token in tokens:
+            state = self.goto[state].get(token)
+            if state is None:
+                return
+        self.outputs[state].discard(value)
+
+    def finalize(self):
+        """Breadth-first pass computing failure links and the merged match lists."""
+        queue = deque()
+        for child in self.goto[0].values():
+            self.fail[child] = 0
+            queue.append(child)
+
+        while queue:
+            state = queue.popleft()
+            # The failure state is shallower, BFS already completed its match list
+            self.matches[state] = tuple((value, self.depth[state]) for value in self.outputs[state]) + self.matches[self.fail[state]]
+            for token, child in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(token, 0)
+                queue.append(child)
+
+    def search(self, tokens: list):
+        goto, fail, matches = self.goto, self.fail, self.matches
+        state = 0
+        for position, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for value, length in matches[state]:
+                yield position - length + 1, value
@@ -0,0 +1,21 @@
+"""
+Downloads the NLTK data the app needs into NLTK_DATA_DIR.
+Run once at build time (e.g. in the Docker image), the app itself never downloads:
+
+    python -m utils.download_nltk_data
+"""
+import nltk
+from core.logger import logger
+from utils.nlp_preprocessors import NLTK_DATA_DIR, NLTK_PACKAGES
+
+def download_nltk_data(directory: str = NLTK_DATA_DIR) -> bool:
+    ok = True
+    for package in NLTK_PACKAGES:
+        logger.info(f"Downloading NLTK package {package} to {directory}...")
+        if not nltk.download(package, download_dir=directory, quiet=True, raise_on_error=False):
+            logger.error(f"Failed to download NLTK package {package}")
+            ok = False
+    return ok
+
+if __name__ == "__main__":
+    raise SystemExit(0 if download_nltk_data() else 1)
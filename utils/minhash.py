@@ -0,0 +1,45 @@
+import hashlib
+import re
+import numpy as np
+
+MINHASH_PERMUTATIONS = 64
+# LSH banding: signatures agreeing on all rows of any band become candidates. With 16 bands of 4 rows
+# a pair at Jaccard 0.8 is found with probability 1 - (1 - 0.8^4)^16 > 99.9%, at 0.3 with ~12%
+MINHASH_BANDS = 16
+SHINGLE_SIZE = 3
+
+WORD_PATTERN = re.compile(r"\w+")
+# Universal hashing h(x) = (a * x + b) mod p over 32-bit shingle hashes, p > 2^32 and a * x + b < 2^64
+_PRIME = np.uint64(4294967311)
+_rng = np.random.RandomState(42)
+_A = _rng.randint(1, 2 ** 32 - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.randint(0, 2 ** 32 - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    words = WORD_PATTERN.findall(text.casefold())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(features: set) -> np.ndarray:
+    """
+    MinHash signature of a shingle set: the fraction of positions two signatures agree on
+    estimates the Jaccard similarity of the sets (Broder).
+    """
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest(), "little") for feature in features),
+        dtype=np.uint64, count=len(features)
+    )
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+def bands(signature: np.ndarray, n_bands: int = MINHASH_BANDS) -> list:
+    """(band index, band bytes) pairs used as lookup keys of a near-duplicate index."""
+    rows = len(signature) // n_bands
+    return [(i, signature[i * rows:(i + 1) * rows].tobytes()) for i in range(n_bands)]
@@ -1,9 +1,139 @@
+import os
 import re
-from nltk.corpus import stopwords
-import nltk
-nltk.download('punkt_tab')
-from nltk.tokenize import word_tokenize
-from rake_nltk import Rake
+import string
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import NamedTuple
+
+# NLTK data shipped with the app, populated by `python -m utils.download_nltk_data`
+NLTK_DATA_DIR = os.getenv(
+    "NLTK_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nltk_data")
+)
+# NLTK packages needed at runtime: stopwords for filtering/RAKE, punkt_tab for tokenization
+NLTK_PACKAGES = ["punkt_tab", "stopwords"]
+# Distinct normalized queries whose analysis is memoized
+QUERY_ANALYSIS_CACHE_SIZE = int(os.getenv("QUERY_ANALYSIS_CACHE_SIZE", 4096))
+
+# Same token split as nltk's wordpunct_tokenize (used by RAKE): word runs and punctuation runs
+WORDPUNCT_PATTERN = re.compile(r"\w+|[^\w\s]+")
+WORD_PATTERN = re.compile(r"\w+")
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]+")
+# Sentence boundary: terminal punctuation followed by an uppercase / digit start, no NLTK needed
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[\"'“(\[]?[A-Z0-9])")
+
+_stop_words = None
+_nlp_lock = threading.Lock()
+
+def load_nlp_resources() -> frozenset:
+    """
+    Imports NLTK and loads the english stopwords from NLTK_DATA_DIR, once per process.
+    Never downloads anything, raises LookupError when the data isn't bundled.
+    """
+    global _stop_words
+    if _stop_words is None:
+        with _nlp_lock:
+            if _stop_words is None:
+                import nltk
+                if NLTK_DATA_DIR not in nltk.data.path:
+                    nltk.data.path.insert(0, NLTK_DATA_DIR)
+                from nltk.corpus import stopwords
+                _stop_words = frozenset(stopwords.words('english'))
+    return _stop_words
+
+
+def split_sentences(text: str) -> list:
+    """Sentences of a whitespace-normalized text."""
+    return [sentence.strip() for sentence in SENTENCE_PATTERN.split(" ".join(text.split())) if sentence.strip()]
+
+
+class QueryAnalysis(NamedTuple):
+    normalized: str
+    # Lowercased word tokens without stopwords
+    tokens: tuple
+    # RAKE keyword phrases, best first
+    keywords: tuple
+
+
+class QueryAnalyzer:
+    """
+    Reusable, thread-safe query preprocessing:
+    - Stopwords and punctuation are loaded once, tokenization uses precompiled regexes
+    - RAKE keyword extraction without per-query `Rake()` objects or sentence tokenization,
+      punctuation runs (".", "?!", "...") always break phrases
+    - Results are memoized per normalized query (lowercased, whitespace collapsed)
+    """
+
+    def __init__(self, stop_words: frozenset = None, cache_size: int = QUERY_ANALYSIS_CACHE_SIZE):
+        self.stop_words = frozenset(stop_words if stop_words is not None else load_nlp_resources())
+        self.to_ignore = self.stop_words | frozenset(string.punctuation)
+        self._analyze_cached = lru_cache(maxsize=cache_size)(self._analyze)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def _phrases(self, text: str) -> list:
+        phrases = []
+        phrase = []
+        for token in WORDPUNCT_PATTERN.findall(text):
+            if token in self.to_ignore or PUNCTUATION_PATTERN.fullmatch(token):
+                if phrase:
+                    phrases.append(tuple(phrase))
+                    phrase = []
+            else:
+                phrase.append(token)
+        if phrase:
+            phrases.append(tuple(phrase))
+        return phrases
+
+    def _rake(self, text: str) -> tuple:
+        """RAKE with the degree / frequency word score, ranked like rake_nltk."""
+        phrases = self._phrases(text)
+        frequency = Counter(word for phrase in phrases for word in phrase)
+        degree = defaultdict(int)
+        for phrase in phrases:
+            for word in phrase:
+                degree[word] += len(phrase)
+
+        ranked = sorted(
+            ((sum(degree[word] / frequency[word] for word in phrase), " ".join(phrase)) for phrase in phrases),
+            reverse=True
+        )
+        return tuple(phrase for _, phrase in ranked)
+
+    def _analyze(self, normalized: str) -> QueryAnalysis:
+        tokens = tuple(word for word in WORD_PATTERN.findall(normalized) if word not in self.stop_words)
+        return QueryAnalysis(normalized, tokens, self._rake(normalized))
+
+    def analyze(self, query: str) -> QueryAnalysis:
+        return self._analyze_cached(self.normalize(query))
+
+    def analyze_many(self, queries: list) -> list:
+        """Analyses for a batch of queries (evals, log replay), each distinct query is analyzed once."""
+        normalized = [self.normalize(query) for query in queries]
+        analyses = {text: self._analyze_cached(text) for text in dict.fromkeys(normalized)}
+        return [analyses[text] for text in normalized]
+
+    def cache_info(self):
+        return self._analyze_cached.cache_info()
+
+    def clear_cache(self):
+        self._analyze_cached.cache_clear()
+
+
+_query_analyzer = None
+
+def get_query_analyzer() -> QueryAnalyzer:
+    """Process-wide analyzer, created on first use."""
+    global _query_analyzer
+    if _query_analyzer is None:
+        stop_words = load_nlp_resources()
+        with _nlp_lock:
+            if _query_analyzer is None:
+                _query_analyzer = QueryAnalyzer(stop_words)
+    return _query_analyzer
 
 def preprocess_user_query(query: str):
     """
@@ -12,21 +142,11 @@ def preprocess_user_query(query: str):
     - Remove stopwords
     - Return a cleaned list of keywords
     """
-    stop_words = set(stopwords.words('english'))
-
-    # tokenize & remove sepcial chars the query
-    words = word_tokenize(query.lower())
-    words = [re.sub(r'\W+', '', word) for word in words]
-    keywords = [word for word in words if word not in stop_words and word != '']
-
-    return keywords
+    return list(get_query_analyzer().analyze(query).tokens)
 
 
 def keyword_extraction(query: str):
-    rake = Rake()
-    rake.extract_keywords_from_text(query)
-    keywords = rake.get_ranked_phrases()
-    return keywords
+    return list(get_query_analyzer().analyze(query).keywords)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,196 @@
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+from core.logger import logger
+from core.metrics import STAGE_ERRORS, STAGE_SECONDS
+
+_STOP = object()
+
+
+class Stage:
+    """
+    One step of a `Pipeline`:
+    - `func(item)` returns the item for the next stage, or None to drop it
+    - With `fan_out=True`, `func` returns an iterable and every element is forwarded
+    - `workers` threads run `func` concurrently, `initializer` runs once in each of them
+    """
+
+    def __init__(self, name: str, func, workers: int = 1, fan_out: bool = False, initializer=None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.fan_out = fan_out
+        self.initializer = initializer
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+
+
+class Pipeline:
+    """
+    Runs items through stages connected by bounded queues.
+    - A full queue blocks the upstream stage (backpressure), so slow stages throttle fast ones
+      instead of buffering everything in memory
+    - A failing item is logged and dropped, the rest of the batch keeps flowing
+    - Per-item stage durations and failures go to the `fin_stage_*` metrics under `name`
+    """
+
+    def __init__(self, stages: list, queue_size: int = 32, name: str = "pipeline"):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.name = name
+
+    def _worker(self, stage: Stage, inbox: queue.Queue, outbox: queue.Queue, lock: threading.Lock):
+        if stage.initializer:
+            stage.initializer()
+
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                return
+
+            start = time.perf_counter()
+            try:
+                output = stage.func(item)
+                outputs = (output or []) if stage.fan_out else ([output] if output is not None else [])
+                for out in outputs:
+                    outbox.put(out)
+                with lock:
+                    stage.processed += 1
+            except Exception as e:
+                logger.error(f"Pipeline stage {stage.name} failed: {str(e)}")
+                STAGE_ERRORS.inc(pipeline=self.name, stage=stage.name)
+                with lock:
+                    stage.failed += 1
+            finally:
+                elapsed = time.perf_counter() - start
+                STAGE_SECONDS.observe(elapsed, pipeline=self.name, stage=stage.name)
+                with lock:
+                    stage.busy_seconds += elapsed
+
+    def run(self, items) -> list:
+        """Feeds `items` to the first stage and returns whatever comes out of the last one."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        # The last queue is drained concurrently below, it must not apply backpressure
+        queues[-1] = queue.Queue()
+        lock = threading.Lock()
+
+        stage_threads = []
+        for i, stage in enumerate(self.stages):
+            threads = [
+                threading.Thread(
+                    target=self._worker,
+                    args=(stage, queues[i], queues[i + 1], lock),
+                    name=f"pipeline-{stage.name}-{n}",
+                    daemon=True
+                )
+                for n in range(stage.workers)
+            ]
+            for thread in threads:
+                thread.start()
+            stage_threads.append(threads)
+
+        def feed():
+            try:
+                for item in items:
+                    queues[0].put(item)
+            except Exception as e:
+                logger.error(f"Pipeline input failed: {str(e)}")
+            # Close stages in order: once every worker of a stage exited, stop the next one
+            for i, threads in enumerate(stage_threads):
+                for _ in threads:
+                    queues[i].put(_STOP)
+                for thread in threads:
+                    thread.join()
+            queues[-1].put(_STOP)
+
+        start = time.perf_counter()
+        threading.Thread(target=feed, name="pipeline-feeder", daemon=True).start()
+
+        results = []
+        while True:
+            item = queues[-1].get()
+            if item is _STOP:
+                break
+            results.append(item)
+
+        elapsed = time.perf_counter() - start
+        for stage in self.stages:
+            logger.info(
+                f"Stage {stage.name}: {stage.processed} ok, {stage.failed} failed, "
+                f"{stage.workers} workers, {stage.busy_seconds:.1f}s busy"
+            )
+        logger.info(f"Pipeline finished in {elapsed:.1f}s with {len(results)} results")
+        return results
+
+
+class DomainRateLimiter:
+    """
+    Token bucket per domain: at most `rate` requests per second to any one host,
+    with bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str):
+        """Blocks until a request to `url`'s domain is allowed."""
+        domain = urlparse(url).netloc
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, updated_at = self._buckets.get(domain, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+                if tokens >= 1:
+                    self._buckets[domain] = (tokens - 1, now)
+                    return
+                self._buckets[domain] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            time.sleep(wait)
+
+
+class TokenBudgetLimiter:
+    """
+    Token buckets over an API's per-minute budgets (tokens and requests), shared by all threads:
+    - `acquire(tokens)` blocks until both budgets allow a call estimated at `tokens`
+    - `settle(estimated, actual)` gives back (or takes) the difference once the real usage is known
+    """
+
+    def __init__(self, tokens_per_minute: int, requests_per_minute: int):
+        self.token_capacity = float(tokens_per_minute)
+        self.request_capacity = float(requests_per_minute)
+        self._tokens = self.token_capacity
+        self._requests = self.request_capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._tokens = min(self.token_capacity, self._tokens + elapsed * self.token_capacity / 60)
+        self._requests = min(self.request_capacity, self._requests + elapsed * self.request_capacity / 60)
+        self._updated_at = now
+
+    def acquire(self, tokens: int):
+        tokens = min(tokens, self.token_capacity)
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens and self._requests >= 1:
+                    self._tokens -= tokens
+                    self._requests -= 1
+                    return
+                wait = max(
+                    (tokens - self._tokens) * 60 / self.token_capacity,
+                    (1 - self._requests) * 60 / self.request_capacity,
+                )
+                self.waited_seconds += wait
+            time.sleep(wait)
+
+    def settle(self, estimated: int, actual: int):
+        with self._lock:
+            self._tokens = min(self.token_capacity, self._tokens + estimated - actual)